@@ -0,0 +1,234 @@
+"""
+Analisis del historial de ventas con arreglos de NumPy.
+
+cargar_ventas() lee la tabla ventas por bloques y arma una columna (arreglo)
+por campo, sin crear un objeto Venta por fila. Las funciones de abajo agrupan,
+suman y calculan percentiles sobre esas columnas de forma vectorizada.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from archivo import origen
+from db_connection import DB_BACKEND
+from paginacion import iterar_bloques
+
+
+# (nombre, expresion SQL, dtype). Los DECIMAL van sin CAST (AS DOUBLE recien
+# existe en MySQL 8.0.17): las filas crudas traen su texto y _bloque_crudo() lo
+# parsea sin crear un Decimal por valor. La fecha llega como segundos (hora
+# local de la sesion) en lugar de un datetime por fila.
+COLUMNAS_VENTA = [
+    ("id", "v.id", np.int64),
+    ("cliente_id", "v.cliente_id", np.int64),
+    ("juego_id", "v.juego_id", np.int64),
+    ("cantidad", "v.cantidad", np.int64),
+    ("precio_total", "v.precio_total", np.float64),
+    ("fecha", "TIMESTAMPDIFF(SECOND, '1970-01-01', v.fecha_venta)", "datetime64[s]"),
+]
+
+COLUMNAS_JUEGO = [
+    ("precio_venta", "j.precio_venta", np.float64),
+    ("precio_ludoteca_hora", "j.precio_ludoteca_hora", np.float64),
+]
+
+
+class TablaVentas:
+    """Ventas en formato columnar: tabla["cantidad"] es un arreglo con una posicion por venta."""
+
+    def __init__(self, columnas):
+        self.columnas = columnas
+
+    def __len__(self):
+        return len(self.columnas["id"])
+
+    def __getitem__(self, nombre):
+        return self.columnas[nombre]
+
+    def filtrar(self, mascara):
+        """Nueva tabla con las filas donde mascara (arreglo booleano) es True."""
+        return TablaVentas({k: v[mascara] for k, v in self.columnas.items()})
+
+    @property
+    def precio_unitario(self):
+        return self.columnas["precio_total"] / self.columnas["cantidad"]
+
+
+def _bloque_crudo(filas, ncols):
+    """Matriz float64 a partir de filas de bytes (cursor raw=True), todas sin NULL."""
+    texto = b",".join(b",".join(fila) for fila in filas).decode("ascii")
+    return np.fromstring(texto, dtype=np.float64, sep=",").reshape(-1, ncols)
+
+
+def cargar_ventas(desde=None, hasta=None, con_juego=False, tam_bloque=50000, incluir_archivo=False):
+    """
+    Lee las ventas entre dos fechas (fecha_venta >= desde y < hasta) en bloques
+    de tam_bloque filas y retorna una TablaVentas. Con con_juego=True agrega los
+    precios actuales del juego (JOIN con juegos_mesa); con incluir_archivo=True
+    tambien lee las ventas archivadas.
+    """
+    columnas = COLUMNAS_VENTA + (COLUMNAS_JUEGO if con_juego else [])
+    query = f"SELECT {', '.join(c[1] for c in columnas)} FROM {origen('ventas', incluir_archivo, 'v')}"
+    if con_juego:
+        query += " JOIN juegos_mesa j ON j.id = v.juego_id"
+    condiciones, params = [], []
+    if desde:
+        condiciones.append("v.fecha_venta >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append("v.fecha_venta < %s")
+        params.append(hasta)
+    if condiciones:
+        query += " WHERE " + " AND ".join(condiciones)
+
+    # Cada bloque se convierte de una vez en una matriz (filas x columnas). Con
+    # MySQL las filas llegan crudas (bytes) y numpy parsea el texto directamente,
+    # sin crear un int/float/Decimal de Python por celda.
+    crudo = DB_BACKEND == "mysql"
+    bloques = [
+        _bloque_crudo(filas, len(columnas)) if crudo else np.array(filas, dtype=np.float64)
+        for filas in iterar_bloques(query, tuple(params), tam_bloque, crudo=crudo)
+    ]
+    matriz = np.vstack(bloques) if bloques else np.empty((0, len(columnas)))
+
+    return TablaVentas(
+        {
+            nombre: matriz[:, i].astype(np.int64).astype(dtype)
+            if dtype == "datetime64[s]"
+            else matriz[:, i].astype(dtype)
+            for i, (nombre, _, dtype) in enumerate(columnas)
+        }
+    )
+
+
+# --- Operaciones vectorizadas ---
+
+
+def sumar_por(claves, valores=None):
+    """
+    Agrupa por claves y suma valores (o cuenta filas si valores es None).
+    Retorna (claves_unicas, totales) ordenados por clave.
+    """
+    unicas, indice = np.unique(claves, return_inverse=True)
+    return unicas, np.bincount(indice, weights=valores, minlength=len(unicas))
+
+
+def percentiles(valores, ps=(50, 90, 95, 99)):
+    """{p: valor} de los percentiles pedidos; vacio si no hay datos."""
+    if len(valores) == 0:
+        return {}
+    return dict(zip(ps, np.percentile(valores, ps).tolist()))
+
+
+def por_periodo(fechas, unidad="D"):
+    """Trunca las fechas al periodo: 'h' hora, 'D' dia, 'W' semana, 'M' mes, 'Y' año."""
+    return fechas.astype(f"datetime64[{unidad}]")
+
+
+def ingresos_por_periodo(tabla, unidad="D"):
+    """(periodos, ingresos) sumando precio_total por periodo."""
+    return sumar_por(por_periodo(tabla["fecha"], unidad), tabla["precio_total"])
+
+
+def ingresos_por_hora_del_dia(tabla):
+    """Arreglo de 24 posiciones con los ingresos por hora del dia (0 a 23)."""
+    fechas = tabla["fecha"]
+    horas = (fechas.astype("datetime64[h]") - fechas.astype("datetime64[D]")).astype(np.int64)
+    return np.bincount(horas, weights=tabla["precio_total"], minlength=24)
+
+
+def tamanos_canasta(tabla):
+    """
+    Unidades por canasta. Una canasta son las lineas del mismo cliente con la
+    misma fecha_venta (un carrito se inserta en una sola sentencia).
+    """
+    segundos = tabla["fecha"].astype(np.int64)
+    clave = (tabla["cliente_id"] << 34) | segundos
+    _, unidades = sumar_por(clave, tabla["cantidad"])
+    return unidades.astype(np.int64)
+
+
+def distribucion_canastas(tabla):
+    """{"canastas", "promedio", "percentiles", "histograma"} del tamaño de las canastas."""
+    tamanos = tamanos_canasta(tabla)
+    return {
+        "canastas": len(tamanos),
+        "promedio": float(tamanos.mean()) if len(tamanos) else 0.0,
+        "percentiles": percentiles(tamanos),
+        # histograma[n] = canastas con n unidades
+        "histograma": np.bincount(tamanos).tolist() if len(tamanos) else [],
+    }
+
+
+def elasticidad_precio(tabla, unidad="D", min_periodos=5):
+    """
+    Elasticidad precio de la demanda por juego: pendiente de log(unidades) contra
+    log(precio unitario promedio) por periodo, con minimos cuadrados calculados
+    a la vez para todos los juegos. Retorna {juego_id: elasticidad}; los juegos
+    con menos de min_periodos o sin variacion de precio quedan fuera.
+    """
+    if len(tabla) == 0:
+        return {}
+    periodos = por_periodo(tabla["fecha"], unidad).astype(np.int64)
+    juegos, juego_idx = np.unique(tabla["juego_id"], return_inverse=True)
+
+    # 1. Unidades y precio promedio por (juego, periodo)
+    clave = juego_idx.astype(np.int64) * (periodos.max() - periodos.min() + 1) + (
+        periodos - periodos.min()
+    )
+    grupos, grupo_idx = np.unique(clave, return_inverse=True)
+    unidades = np.bincount(grupo_idx, weights=tabla["cantidad"])
+    ingresos = np.bincount(grupo_idx, weights=tabla["precio_total"])
+    precio = ingresos / unidades
+    juego_de_grupo = juego_idx[np.unique(grupo_idx, return_index=True)[1]]
+
+    # 2. Regresion lineal por juego con sumas agrupadas
+    x, y = np.log(precio), np.log(unidades)
+    n = np.bincount(juego_de_grupo, minlength=len(juegos))
+    sx = np.bincount(juego_de_grupo, weights=x, minlength=len(juegos))
+    sy = np.bincount(juego_de_grupo, weights=y, minlength=len(juegos))
+    sxx = np.bincount(juego_de_grupo, weights=x * x, minlength=len(juegos))
+    sxy = np.bincount(juego_de_grupo, weights=x * y, minlength=len(juegos))
+    denominador = n * sxx - sx * sx
+    validos = (n >= min_periodos) & (denominador > 1e-12)
+    pendiente = np.divide(
+        n * sxy - sx * sy, denominador, out=np.zeros_like(sx), where=validos
+    )
+    return {int(j): float(e) for j, e in zip(juegos[validos], pendiente[validos])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumen analítico del historial de ventas.")
+    parser.add_argument("--desde", help="Fecha inicial (AAAA-MM-DD)")
+    parser.add_argument("--hasta", help="Fecha final, excluida (AAAA-MM-DD)")
+    parser.add_argument("--bloque", type=int, default=50000, help="Filas por lectura")
+    parser.add_argument("--archivo", action="store_true", help="Incluir las ventas archivadas")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    tabla = cargar_ventas(args.desde, args.hasta, tam_bloque=args.bloque, incluir_archivo=args.archivo)
+    carga = time.perf_counter() - inicio
+    print(f"Ventas cargadas: {len(tabla)} en {carga:.2f}s")
+    if not len(tabla):
+        return 0
+
+    inicio = time.perf_counter()
+    por_hora = ingresos_por_hora_del_dia(tabla)
+    canastas = distribucion_canastas(tabla)
+    elasticidades = elasticidad_precio(tabla)
+    print(f"Ingresos totales: ${tabla['precio_total'].sum():.2f}")
+    print("Ingresos por hora:")
+    for hora in np.flatnonzero(por_hora):
+        print(f"  {hora:02d}h ${por_hora[hora]:10.2f}")
+    print(f"Canastas: {canastas['canastas']} (promedio {canastas['promedio']:.2f} unidades)")
+    print(f"Percentiles de canasta: {canastas['percentiles']}")
+    print(f"Juegos con elasticidad estimada: {len(elasticidades)}")
+    print(f"Análisis en {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+Archivo del historial frio de ventas y de la ludoteca.
+
+    python archivo.py archivar --meses 24 --volcar archivo/
+    python archivo.py listar
+
+Las ventas y las sesiones finalizadas (con sus participantes) anteriores al
+corte se mueven, un mes por transaccion, a tablas con la misma estructura
+(ventas_archivo_2023_05, ludoteca_sesiones_archivo_2023_05, ...) que quedan
+registradas en archivo_meses. Asi las consultas de todos los dias solo
+recorren las filas recientes. Las lecturas que necesitan el historial completo
+lo piden con incluir_archivo=True y leen la union de la tabla con sus archivos
+(ver origen()).
+
+Los resumenes diarios (resumenes.py) no cambian al archivar: las filas siguen
+contando, solo cambian de tabla, y reconstruir() tambien lee los archivos.
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import date
+
+from db_connection import get_conn
+
+
+# Meses que se mantienen en las tablas activas (sin contar el mes en curso)
+MESES_ACTIVOS = int(os.getenv("ARCHIVO_MESES", 24))
+
+_SESIONES_DEL_MES = "hora_inicio >= %s AND hora_inicio < %s AND hora_fin IS NOT NULL"
+
+# (tabla, filas de un mes [desde, hasta)) en el orden en que se mueven: los
+# participantes antes que su sesion. Las sesiones activas no se archivan.
+MOVIMIENTOS = (
+    ("ventas", "fecha_venta >= %s AND fecha_venta < %s"),
+    ("ludoteca_participantes", f"sesion_id IN (SELECT id FROM ludoteca_sesiones WHERE {_SESIONES_DEL_MES})"),
+    ("ludoteca_sesiones", _SESIONES_DEL_MES),
+)
+
+# Tabla -> tipo de exportar.py con el que se vuelca su mes
+VOLCADOS = {"ventas": "ventas", "ludoteca_participantes": "sesiones", "ludoteca_sesiones": "sesiones"}
+
+
+def _mes_siguiente(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _primer_dia(valor):
+    """Primer dia del mes de una fecha (date, datetime o texto 'AAAA-MM-DD...')."""
+    anio, mes = (int(x) for x in str(valor)[:7].split("-"))
+    return date(anio, mes, 1)
+
+
+def corte_por_defecto(meses=None, hoy=None):
+    """Primer dia del mes que esta `meses` meses (ARCHIVO_MESES) antes del mes en curso."""
+    meses = MESES_ACTIVOS if meses is None else meses
+    hoy = hoy or date.today()
+    total = hoy.year * 12 + hoy.month - 1 - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nombre_archivo(tabla, mes):
+    return f"{tabla}_archivo_{mes:%Y_%m}"
+
+
+def tablas_archivo(tabla):
+    """Tablas de archivo registradas para `tabla`, de la mas antigua a la mas reciente."""
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT tabla_archivo FROM archivo_meses WHERE tabla = %s ORDER BY mes", (tabla,))
+        nombres = [r[0] for r in cur.fetchall()]
+    finally:
+        cur.close()
+        conn.close()
+    for nombre in nombres:
+        # Los nombres se pegan en el SQL: solo se aceptan los que crea este modulo
+        if not re.fullmatch(rf"{tabla}_archivo_\d{{4}}_\d{{2}}", nombre):
+            raise Exception(f"Tabla de archivo inválida en archivo_meses: '{nombre}'.")
+    return nombres
+
+
+def origen(tabla, incluir_archivo=False, alias=None):
+    """
+    Texto para el FROM de una consulta sobre `tabla`: la tabla sola o, con
+    incluir_archivo=True, la union con sus tablas de archivo. `alias` es el
+    nombre con que la consulta se refiere a ella (por defecto, el de la tabla).
+    """
+    alias = alias or tabla
+    archivos = tablas_archivo(tabla) if incluir_archivo else []
+    if not archivos:
+        return tabla if alias == tabla else f"{tabla} {alias}"
+    union = " UNION ALL ".join(f"SELECT * FROM {t}" for t in [tabla] + archivos)
+    return f"({union}) {alias}"
+
+
+def _contar(mes, hasta):
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        conteos = {}
+        for tabla, filtro in MOVIMIENTOS:
+            cur.execute(f"SELECT COUNT(*) FROM {tabla} WHERE {filtro}", (mes, hasta))
+            conteos[tabla] = cur.fetchone()[0]
+        return conteos
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _volcar(carpeta, mes, hasta, tablas):
+    """
+    Exporta el mes ya archivado (tablas de archivo + lo que siga activo) a CSV
+    comprimido y retorna tabla -> ruta. Cada archivo se escribe con otro nombre
+    y se renombra al terminar: una ruta final siempre es un volcado completo.
+    """
+    import exportar
+
+    os.makedirs(carpeta, exist_ok=True)
+    rutas = {}
+    for tipo in sorted({VOLCADOS[t] for t in tablas}):
+        ruta = os.path.join(carpeta, f"{tipo}_{mes:%Y_%m}.csv.gz")
+        temporal = ruta + ".parcial"
+        try:
+            exportar.exportar(
+                tipo, temporal, formato="csv", desde=mes, hasta=hasta, comprimir=True, incluir_archivo=True
+            )
+            os.replace(temporal, ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        rutas[tipo] = ruta
+    return {t: rutas[VOLCADOS[t]] for t in tablas}
+
+
+def _registradas(cur, mes):
+    cur.execute("SELECT tabla FROM archivo_meses WHERE mes = %s", (mes,))
+    return {r[0] for r in cur.fetchall()}
+
+
+def archivar_mes(mes, volcar_en=None):
+    """
+    Mueve las filas del mes que empieza en `mes` a sus tablas de archivo, en
+    una transaccion. Si el movimiento falla, las tablas de archivo que no
+    estaban registradas y quedaron vacias se eliminan. Con volcar_en, el
+    volcado se escribe despues de confirmar el movimiento.
+    Retorna {tabla: filas movidas}.
+    """
+    hasta = _mes_siguiente(mes)
+    conteos = _contar(mes, hasta)
+    tablas = [t for t, _ in MOVIMIENTOS if conteos[t]]
+    if not tablas:
+        return {}
+
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        nuevas = [t for t in tablas if t not in _registradas(cur, mes)]
+        # CREATE TABLE confirma la transaccion en MySQL: las tablas se crean antes de mover filas
+        for tabla in tablas:
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {nombre_archivo(tabla, mes)} LIKE {tabla}")
+        conn.commit()
+
+        try:
+            movidas = {}
+            for tabla, filtro in MOVIMIENTOS:
+                if tabla not in tablas:
+                    continue
+                destino = nombre_archivo(tabla, mes)
+                cur.execute(f"INSERT INTO {destino} SELECT * FROM {tabla} WHERE {filtro}", (mes, hasta))
+                copiadas = cur.rowcount
+                cur.execute(f"DELETE FROM {tabla} WHERE {filtro}", (mes, hasta))
+                if cur.rowcount != copiadas:
+                    raise Exception(f"{tabla}: se copiaron {copiadas} filas y se borraron {cur.rowcount}")
+                cur.execute(
+                    """
+                    INSERT INTO archivo_meses (tabla, mes, tabla_archivo, filas)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE filas = filas + VALUES(filas)
+                    """,
+                    (tabla, mes, destino, copiadas),
+                )
+                movidas[tabla] = copiadas
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            # No dejar tablas vacias sin registrar que la proxima corrida reuse sin saberlo
+            for tabla in nuevas:
+                destino = nombre_archivo(tabla, mes)
+                cur.execute(f"SELECT COUNT(*) FROM {destino}")
+                if cur.fetchone()[0] == 0:
+                    cur.execute(f"DROP TABLE {destino}")
+            conn.commit()
+            raise Exception(f"Error al archivar {mes:%Y-%m}: {e}")
+
+        if volcar_en:
+            try:
+                volcados = _volcar(volcar_en, mes, hasta, tablas)
+            except Exception as e:
+                raise Exception(f"{mes:%Y-%m} quedó archivado, pero falló el volcado: {e}")
+            cur.executemany(
+                "UPDATE archivo_meses SET volcado = %s WHERE tabla = %s AND mes = %s",
+                [(ruta, tabla, mes) for tabla, ruta in volcados.items()],
+            )
+            conn.commit()
+        return movidas
+    finally:
+        cur.close()
+        conn.close()
+
+
+def archivar(antes_de=None, volcar_en=None):
+    """
+    Archiva, mes a mes, las filas anteriores a `antes_de` (redondeado al primer
+    dia de su mes; por defecto corte_por_defecto()). Con volcar_en, cada mes
+    archivado se exporta ademas a <volcar_en>/ventas_AAAA_MM.csv.gz y
+    sesiones_AAAA_MM.csv.gz.
+    Retorna [{mes, ventas, ludoteca_sesiones, ludoteca_participantes}, ...].
+    """
+    corte = _primer_dia(antes_de) if antes_de else corte_por_defecto()
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT MIN(fecha_venta) FROM ventas WHERE fecha_venta < %s", (corte,))
+        primeras = [cur.fetchone()[0]]
+        cur.execute(
+            "SELECT MIN(hora_inicio) FROM ludoteca_sesiones WHERE hora_inicio < %s AND hora_fin IS NOT NULL",
+            (corte,),
+        )
+        primeras.append(cur.fetchone()[0])
+    finally:
+        cur.close()
+        conn.close()
+
+    primeras = [_primer_dia(f) for f in primeras if f is not None]
+    reporte = []
+    mes = min(primeras) if primeras else corte
+    while mes < corte:
+        movidas = archivar_mes(mes, volcar_en)
+        if movidas:
+            reporte.append({"mes": f"{mes:%Y-%m}", **{t: movidas.get(t, 0) for t, _ in MOVIMIENTOS}})
+        mes = _mes_siguiente(mes)
+    return reporte
+
+
+def listar():
+    """Meses archivados: [{tabla, mes, tabla_archivo, filas, volcado, archivado_en}, ...]."""
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT tabla, mes, tabla_archivo, filas, volcado, archivado_en FROM archivo_meses ORDER BY mes, tabla"
+        )
+        columnas = ("tabla", "mes", "tabla_archivo", "filas", "volcado", "archivado_en")
+        return [dict(zip(columnas, r)) for r in cur.fetchall()]
+    finally:
+        cur.close()
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archivo del historial de ventas y ludoteca.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_archivar = sub.add_parser("archivar", help="Mueve los meses anteriores al corte a tablas de archivo")
+    p_archivar.add_argument("--antes-de", help="Corte (AAAA-MM-DD; se usa el primer día de ese mes)")
+    p_archivar.add_argument("--meses", type=int, help=f"Meses que quedan activos (por defecto {MESES_ACTIVOS})")
+    p_archivar.add_argument("--volcar", help="Carpeta donde exportar cada mes a .csv.gz una vez archivado")
+    sub.add_parser("listar", help="Muestra los meses archivados")
+    args = parser.parse_args(argv)
+
+    if args.comando == "archivar":
+        antes_de = args.antes_de or (corte_por_defecto(args.meses) if args.meses is not None else None)
+        reporte = archivar(antes_de, args.volcar)
+        for mes in reporte:
+            print(
+                f"{mes['mes']}  ventas {mes['ventas']:8d}  sesiones {mes['ludoteca_sesiones']:8d}  "
+                f"participantes {mes['ludoteca_participantes']:8d}"
+            )
+        print(f"Meses archivados: {len(reporte)}")
+        return 0
+
+    for fila in listar():
+        print(f"{fila['mes']:%Y-%m}  {fila['tabla']:24s} {fila['filas']:8d}  {fila['volcado'] or ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
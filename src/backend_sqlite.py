@@ -0,0 +1,365 @@
+"""
+Backend embebido de SQLite (DB_BACKEND=sqlite).
+
+Expone una conexion con la misma interfaz que usan los modelos con MySQL
+(cursor(), execute con %s, commit, rollback, lastrowid, rowcount...) y traduce
+al vuelo el SQL de MySQL que usan los modelos, asi estos no cambian segun la
+base. La base corre en modo WAL: lectores y un escritor a la vez, sin servidor.
+"""
+
+import re
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+
+# Version del esquema que crea crear_tablas(); las migraciones hasta esta
+# version quedan registradas como aplicadas. Al agregar una migracion se
+# debe reflejar tambien en ESQUEMA.
+VERSION_ESQUEMA = 5
+
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(" "))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()[:10]))
+
+AHORA = "datetime('now', 'localtime')"
+
+_SEGUNDOS_POR_UNIDAD = {"SECOND": 1, "MINUTE": 60, "HOUR": 3600, "DAY": 86400}
+
+
+# --- Traduccion de SQL ---
+
+
+def _reemplazar_llamadas(sql, nombre, armar):
+    """Reemplaza cada NOMBRE(a, b, ...) por armar(a, b, ...), respetando parentesis y comillas."""
+    patron = re.compile(rf"\b{nombre}\s*\(", re.IGNORECASE)
+    while True:
+        m = patron.search(sql)
+        if not m:
+            return sql
+        i = inicio = m.end()
+        nivel, comilla, args = 1, None, []
+        while nivel:
+            c = sql[i]
+            if comilla:
+                if c == comilla:
+                    comilla = None
+            elif c in "'\"":
+                comilla = c
+            elif c == "(":
+                nivel += 1
+            elif c == ")":
+                nivel -= 1
+                if nivel == 0:
+                    args.append(sql[inicio:i].strip())
+            elif c == "," and nivel == 1:
+                args.append(sql[inicio:i].strip())
+                inicio = i + 1
+            i += 1
+        sql = sql[: m.start()] + armar(*args) + sql[i:]
+
+
+def _timestampdiff(unidad, desde, hasta):
+    segundos = f"(CAST(strftime('%s', {hasta}) AS INTEGER) - CAST(strftime('%s', {desde}) AS INTEGER))"
+    factor = _SEGUNDOS_POR_UNIDAD[unidad.upper()]
+    return segundos if factor == 1 else f"({segundos} / {factor})"
+
+
+@lru_cache(maxsize=1024)
+def traducir(sql):
+    """
+    Convierte una sentencia del dialecto de MySQL que usan los modelos al de
+    SQLite. Retorna (sql, bloquear); bloquear indica un SELECT ... FOR UPDATE,
+    que aqui se resuelve tomando el lock de escritura (BEGIN IMMEDIATE).
+    """
+    sql = sql.strip().rstrip(";").replace("%s", "?")
+
+    if re.fullmatch(r"SELECT\s+NOW\(\)", sql, re.IGNORECASE):
+        # Sin columna de origen el tipo se indica en el alias para recibir un datetime
+        return f'SELECT {AHORA} AS "ahora [TIMESTAMP]"', False
+
+    bloquear = False
+    if re.search(r"\s+FOR\s+UPDATE$", sql, re.IGNORECASE):
+        sql = re.sub(r"\s+FOR\s+UPDATE$", "", sql, flags=re.IGNORECASE)
+        bloquear = True
+
+    sql = re.sub(r"\)\s*ENGINE\s*=\s*\w+", ")", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+
+    m = re.search(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", sql, re.IGNORECASE)
+    if m:
+        cola = re.sub(r"\bVALUES\s*\(\s*(\w+)\s*\)", r"excluded.\1", sql[m.end():], flags=re.IGNORECASE)
+        sql = sql[: m.start()] + "ON CONFLICT DO UPDATE SET" + cola
+
+    sql = re.sub(r"\bNOW\(\)", AHORA, sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bCURDATE\(\)", "date('now', 'localtime')", sql, flags=re.IGNORECASE)
+    sql = _reemplazar_llamadas(sql, "TIMESTAMPDIFF", _timestampdiff)
+    return sql, bloquear
+
+
+_CREAR_COMO = re.compile(
+    r"CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+LIKE\s+(\w+)\s*;?", re.IGNORECASE
+)
+_REFERENCIA = re.compile(
+    r"\s+REFERENCES\s+\w+\s*\([^)]*\)(?:\s+ON\s+(?:DELETE|UPDATE)\s+(?:SET\s+NULL|NO\s+ACTION|\w+))*",
+    re.IGNORECASE,
+)
+
+
+def _crear_como(conn, nueva, origen):
+    """
+    CREATE TABLE IF NOT EXISTS nueva LIKE origen, que SQLite no tiene: copia la
+    definicion y los indices de origen. Como en MySQL, sin las claves foraneas.
+    """
+    filas = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL ORDER BY type DESC",
+        (origen,),
+    ).fetchall()
+    if not filas:
+        raise sqlite3.OperationalError(f"no such table: {origen}")
+    for tipo, nombre, sql in filas:
+        if tipo == "table":
+            sql = re.sub(
+                rf"^CREATE\s+TABLE\s+\"?{origen}\"?", f"CREATE TABLE IF NOT EXISTS {nueva}", sql, flags=re.IGNORECASE
+            )
+            sql = _REFERENCIA.sub("", sql)
+        else:
+            sql = re.sub(
+                rf"^CREATE\s+(UNIQUE\s+)?INDEX\s+\"?{nombre}\"?\s+ON\s+\"?{origen}\"?",
+                rf"CREATE \1INDEX IF NOT EXISTS {nueva}_{nombre} ON {nueva}",
+                sql,
+                flags=re.IGNORECASE,
+            )
+        conn.execute(sql)
+
+
+# --- Conexion y cursor ---
+
+
+class CursorSQLite:
+    """Cursor con la interfaz de mysql-connector sobre un cursor de sqlite3."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cur = conn.cursor()
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, sql, params=()):
+        m = _CREAR_COMO.fullmatch(sql.strip())
+        if m:
+            _crear_como(self._conn, m.group(1), m.group(2))
+            self.rowcount = 0
+            return
+        sql, bloquear = traducir(sql)
+        if bloquear and not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+        self._cur.execute(sql, tuple(params or ()))
+        self.rowcount = self._cur.rowcount
+        self.lastrowid = self._cur.lastrowid
+
+    def executemany(self, sql, seq_params):
+        # Como en MySQL: lastrowid es el id de la primera fila insertada y rowcount el total
+        sql, bloquear = traducir(sql)
+        if bloquear and not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+        primero, total = None, 0
+        for params in seq_params:
+            self._cur.execute(sql, tuple(params))
+            if primero is None:
+                primero = self._cur.lastrowid
+            total += max(self._cur.rowcount, 0)
+        self.rowcount = total
+        self.lastrowid = primero
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchmany(self, size=1):
+        return self._cur.fetchmany(size)
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+
+class ConexionSQLite:
+    """Conexion a un archivo SQLite en modo WAL con la interfaz de mysql-connector."""
+
+    def __init__(self, ruta, timeout=10):
+        self.ruta = ruta
+        # El pool presta la conexion a un hilo a la vez, pero no siempre al mismo
+        self._conn = sqlite3.connect(
+            ruta,
+            timeout=timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    def cursor(self, *args, **kwargs):
+        return CursorSQLite(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def is_connected(self):
+        try:
+            self.ping()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def ejecutar_script(self, script):
+        self._conn.executescript(script)
+
+    def close(self):
+        self._conn.close()
+
+
+def conectar(ruta):
+    return ConexionSQLite(ruta)
+
+
+# --- Esquema ---
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre VARCHAR(255) NOT NULL UNIQUE COLLATE NOCASE,
+    role VARCHAR(50) NOT NULL DEFAULT 'cliente',
+    password VARCHAR(255) NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS juegos_mesa (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    titulo VARCHAR(255) NOT NULL UNIQUE COLLATE NOCASE,
+    fabricante VARCHAR(255) NULL,
+    stock INT NOT NULL DEFAULT 0 CHECK (stock >= 0),
+    precio_venta DECIMAL(10, 2) NOT NULL,
+    precio_ludoteca_hora DECIMAL(10, 2) NOT NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS ventas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id INT NOT NULL REFERENCES usuarios(id) ON DELETE RESTRICT,
+    juego_id INT NOT NULL REFERENCES juegos_mesa(id) ON DELETE RESTRICT,
+    cantidad INT NOT NULL CHECK (cantidad > 0),
+    precio_total DECIMAL(10, 2) NOT NULL,
+    fecha_venta TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_ventas_cliente_fecha ON ventas (cliente_id, fecha_venta, id);
+
+CREATE TABLE IF NOT EXISTS ludoteca_sesiones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    juego_id INT NOT NULL REFERENCES juegos_mesa(id) ON DELETE RESTRICT,
+    vendedor_id INT NOT NULL REFERENCES usuarios(id) ON DELETE RESTRICT,
+    hora_inicio TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    hora_fin TIMESTAMP NULL,
+    duracion_horas DECIMAL(5, 2) NULL,
+    precio_total DECIMAL(10, 2) NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sesiones_hora_fin ON ludoteca_sesiones (hora_fin);
+
+CREATE TABLE IF NOT EXISTS ludoteca_participantes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sesion_id INT NOT NULL REFERENCES ludoteca_sesiones(id) ON DELETE CASCADE,
+    usuario_id INT NOT NULL REFERENCES usuarios(id) ON DELETE RESTRICT
+);
+CREATE INDEX IF NOT EXISTS idx_participantes_sesion ON ludoteca_participantes (sesion_id, usuario_id);
+
+CREATE TABLE IF NOT EXISTS catalogo_version (
+    id TINYINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO catalogo_version (id, version) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS resumen_ventas_juego (
+    fecha DATE NOT NULL,
+    juego_id INT NOT NULL,
+    ventas INT NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, juego_id)
+);
+CREATE INDEX IF NOT EXISTS idx_resumen_ventas_juego ON resumen_ventas_juego (juego_id, fecha);
+
+CREATE TABLE IF NOT EXISTS resumen_ventas_cliente (
+    fecha DATE NOT NULL,
+    cliente_id INT NOT NULL,
+    ventas INT NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, cliente_id)
+);
+CREATE INDEX IF NOT EXISTS idx_resumen_ventas_cliente ON resumen_ventas_cliente (cliente_id, fecha);
+
+CREATE TABLE IF NOT EXISTS resumen_ludoteca_juego (
+    fecha DATE NOT NULL,
+    juego_id INT NOT NULL,
+    sesiones INT NOT NULL DEFAULT 0,
+    horas DECIMAL(10, 2) NOT NULL DEFAULT 0,
+    ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, juego_id)
+);
+CREATE INDEX IF NOT EXISTS idx_resumen_ludoteca_juego ON resumen_ludoteca_juego (juego_id, fecha);
+
+CREATE TABLE IF NOT EXISTS archivo_meses (
+    tabla VARCHAR(64) NOT NULL,
+    mes DATE NOT NULL,
+    tabla_archivo VARCHAR(64) NOT NULL,
+    filas INT NOT NULL DEFAULT 0,
+    volcado VARCHAR(500) NULL,
+    archivado_en TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    PRIMARY KEY (tabla, mes)
+);
+
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    nombre VARCHAR(255) NOT NULL,
+    aplicada_en TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+"""
+
+
+def crear_tablas(connection):
+    """
+    Equivalente de mysql_env.crear_tablas() para SQLite: crea el esquema
+    completo (con los indices y restricciones de las migraciones) y registra
+    esas migraciones como aplicadas.
+    """
+    import migrar
+
+    connection.ejecutar_script(ESQUEMA)
+    cursor = connection.cursor()
+    cursor.executemany(
+        "INSERT OR IGNORE INTO schema_version (version, nombre) VALUES (%s, %s)",
+        [(v, n) for v, n, _ in migrar.listar_migraciones() if v <= VERSION_ESQUEMA],
+    )
+    connection.commit()
+    cursor.close()
+    print("Tablas creadas exitosamente.")
@@ -0,0 +1,373 @@
+"""
+Microbenchmarks de los caminos mas usados de los modelos y de Tienda.
+
+    python bench_tienda.py correr --salida base.json
+    python bench_tienda.py correr --salida nuevo.json
+    python bench_tienda.py comparar base.json nuevo.json --umbral 0.10
+    python bench_tienda.py sentencias --salida sentencias.json
+    python bench_tienda.py memoria --filas 100000
+
+Usa la BD configurada en el .env (DB_NAME): conviene apuntarla a una base de
+prueba, porque se crean juegos, usuarios, ventas y sesiones con prefijo
+"Bench". Al terminar se borran (salvo con --conservar).
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import sentencias
+from db_connection import DB_BACKEND, create_connection, close_connection, get_conn
+from mysql_env import crear_tablas
+from cache_catalogo import cache_juegos, marcar_cambio_catalogo
+from juego_mesa import JuegoMesa
+from tienda import Tienda
+from usuario import Usuario
+from venta import Venta
+
+
+PREFIJO = "Bench"
+PASSWORD = "bench-password"
+# Unicos usuarios que crea el benchmark (limpiar() borra solo estos)
+USUARIOS = {"cliente": f"{PREFIJO}Cliente", "vendedor": f"{PREFIJO}Vendedor"}
+TAMANOS_LISTADO = (100, 1000, 10000)
+
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) por rango mas cercano de una lista ya ordenada."""
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def medir(fn, repeticiones, calentamiento=3):
+    """Ejecuta fn repeticiones veces y retorna ops/s y latencias (ms)."""
+    for _ in range(calentamiento):
+        fn()
+    tiempos = []
+    inicio_total = time.perf_counter()
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    total = time.perf_counter() - inicio_total
+    tiempos.sort()
+    return {
+        "repeticiones": repeticiones,
+        "ops_por_seg": round(repeticiones / total, 2) if total else 0.0,
+        "media_ms": round(sum(tiempos) / len(tiempos), 3),
+        "p50_ms": round(percentil(tiempos, 50), 3),
+        "p95_ms": round(percentil(tiempos, 95), 3),
+        "p99_ms": round(percentil(tiempos, 99), 3),
+    }
+
+
+# --- Datos de prueba ---
+
+
+def _usuario(nombre, role):
+    usuario = Usuario.buscar_por_nombre(nombre)
+    return usuario or Usuario.crear(nombre, role, PASSWORD)
+
+
+def _asegurar_juegos(cantidad):
+    """Deja al menos `cantidad` juegos Bench en el catalogo (con stock de sobra)."""
+    filas = (
+        {
+            "titulo": f"{PREFIJO} {i:06d}",
+            "fabricante": PREFIJO,
+            "stock": 1_000_000,
+            "precio_venta": 10 + i % 50,
+            "precio_ludoteca_hora": 1 + i % 5,
+        }
+        for i in range(cantidad)
+    )
+    JuegoMesa.importar_lote(filas, tam_lote=1000)
+
+
+def limpiar():
+    """
+    Borra todo lo creado por el benchmark, incluidas sus filas de resumen: los
+    juegos "Bench NNNNNN" de fabricante Bench y los usuarios de USUARIOS (por
+    nombre exacto, para no tocar clientes reales cuyo nombre empiece igual).
+    """
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT id FROM juegos_mesa WHERE titulo LIKE %s AND fabricante = %s", (PREFIJO + " %", PREFIJO)
+        )
+        juegos = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT id FROM usuarios WHERE nombre IN (%s, %s)", tuple(USUARIOS.values()))
+        usuarios = [r[0] for r in cur.fetchall()]
+        if juegos:
+            marcadores = ", ".join(["%s"] * len(juegos))
+            for tabla in ("ventas", "ludoteca_sesiones", "resumen_ventas_juego", "resumen_ludoteca_juego"):
+                cur.execute(f"DELETE FROM {tabla} WHERE juego_id IN ({marcadores})", tuple(juegos))
+            cur.execute(f"DELETE FROM juegos_mesa WHERE id IN ({marcadores})", tuple(juegos))
+            marcar_cambio_catalogo(cur)
+        if usuarios:
+            marcadores = ", ".join(["%s"] * len(usuarios))
+            cur.execute(f"DELETE FROM resumen_ventas_cliente WHERE cliente_id IN ({marcadores})", tuple(usuarios))
+            cur.execute(f"DELETE FROM usuarios WHERE id IN ({marcadores})", tuple(usuarios))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    cache_juegos.limpiar()
+
+
+# --- Benchmarks ---
+
+
+def correr(repeticiones=200, tamanos=TAMANOS_LISTADO):
+    tienda = Tienda()
+    cliente = _usuario(USUARIOS["cliente"], "cliente")
+    vendedor = _usuario(USUARIOS["vendedor"], "vendedor")
+    _asegurar_juegos(100)
+    juego = JuegoMesa.buscar_por_titulo(f"{PREFIJO} 000000")
+    titulos = [f"{PREFIJO} {i:06d}" for i in range(100)]
+
+    resultados = {}
+
+    resultados["venta_crear"] = medir(
+        lambda: Venta.crear(cliente.id, juego.id, 1), repeticiones
+    )
+    resultados["tienda_realizar_venta"] = medir(
+        lambda: tienda.realizar_venta(cliente.id, juego.titulo, 1), repeticiones
+    )
+
+    siguiente = iter(range(10**9))
+    resultados["juego_buscar_por_titulo"] = medir(
+        lambda: JuegoMesa.buscar_por_titulo(titulos[next(siguiente) % len(titulos)]),
+        repeticiones,
+    )
+
+    def buscar_sin_cache():
+        cache_juegos.limpiar()
+        JuegoMesa.buscar_por_titulo(titulos[next(siguiente) % len(titulos)])
+
+    resultados["juego_buscar_por_titulo_sin_cache"] = medir(buscar_sin_cache, repeticiones)
+
+    for tamano in sorted(tamanos):
+        _asegurar_juegos(tamano)
+        # Los listados grandes son lentos: menos repeticiones para no eternizar la corrida
+        reps = max(5, min(repeticiones, 200_000 // tamano))
+        resultados[f"juego_listar_todos_{tamano}"] = medir(JuegoMesa.listar_todos, reps)
+
+    # Sugerencias mientras se escribe sobre el catalogo mas grande (indice en memoria)
+    consultas = ["b", "bench 00", "bench 0012", "bnech 001"]
+    resultados["tienda_sugerir_juegos"] = medir(
+        lambda: tienda.sugerir_juegos(consultas[next(siguiente) % len(consultas)]), repeticiones
+    )
+
+    # Cada login cuesta un PBKDF2 completo: se limita la cantidad
+    resultados["usuario_autenticar"] = medir(
+        lambda: Usuario.autenticar(cliente.nombre, PASSWORD), min(repeticiones, 50), calentamiento=1
+    )
+
+    def ciclo_ludoteca():
+        sesion = tienda.iniciar_sesion_juego(juego.titulo, vendedor.id)
+        tienda.finalizar_sesion_juego(sesion.id)
+
+    resultados["ludoteca_iniciar_finalizar"] = medir(ciclo_ludoteca, repeticiones)
+    return resultados
+
+
+def correr_sentencias(repeticiones=500):
+    """
+    Latencia por llamada de las consultas calientes con y sin sentencias
+    preparadas (sentencias.PREPARADAS). buscar_por_id se mide sin cache para
+    que cada llamada llegue a la BD.
+    """
+    cliente = _usuario(USUARIOS["cliente"], "cliente")
+    _asegurar_juegos(100)
+    juego = JuegoMesa.buscar_por_titulo(f"{PREFIJO} 000000")
+    titulos = [f"{PREFIJO} {i:06d}" for i in range(100)]
+    siguiente = iter(range(10**9))
+
+    def buscar_por_id():
+        cache_juegos.limpiar()
+        JuegoMesa.buscar_por_id(juego.id)
+
+    def buscar_por_titulo():
+        cache_juegos.limpiar()
+        JuegoMesa.buscar_por_titulo(titulos[next(siguiente) % len(titulos)])
+
+    casos = {
+        "juego_buscar_por_id": buscar_por_id,
+        "juego_buscar_por_titulo": buscar_por_titulo,
+        "venta_crear": lambda: Venta.crear(cliente.id, juego.id, 1),
+    }
+    resultados = {}
+    original = sentencias.PREPARADAS
+    try:
+        for preparadas in (False, True):
+            sentencias.PREPARADAS = preparadas
+            sufijo = "preparada" if preparadas else "texto"
+            for nombre, fn in casos.items():
+                resultados[f"{nombre}_{sufijo}"] = medir(fn, repeticiones)
+    finally:
+        sentencias.PREPARADAS = original
+    return resultados
+
+
+def _con_dict(modelo):
+    """Copia del modelo con __dict__ por instancia (como eran antes de __slots__)."""
+    return type(f"{modelo.__name__}ConDict", (), {"__init__": modelo.__init__})
+
+
+def _bytes_por_fila(construir, filas):
+    """Bytes asignados por fila al construir una representacion de cada fila."""
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        resultado = [construir(r) for r in filas]
+        despues = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del resultado
+    return round((despues - antes) / len(filas), 1)
+
+
+def medir_memoria(cantidad=100_000):
+    """
+    Bytes por fila de un listado de ventas y de juegos como tuplas crudas
+    (bloques_*), con objetos __slots__ y con objetos con __dict__. Los valores de
+    las columnas se crean antes de medir: solo cuenta el contenedor de cada fila
+    (mas la lista que los guarda).
+    """
+    inicio = datetime(2024, 1, 1)
+    ventas = [
+        (i, i % 1000, i % 300, 1 + i % 3, 10.0 + i % 50, inicio + timedelta(seconds=i))
+        for i in range(cantidad)
+    ]
+    juegos = [(i, f"{PREFIJO} {i:06d}", PREFIJO, i % 100, 10.0 + i % 50, 1.0 + i % 5) for i in range(cantidad)]
+
+    resultados = {}
+    for nombre, modelo, filas in (("venta", Venta, ventas), ("juego", JuegoMesa, juegos)):
+        con_dict = _con_dict(modelo)
+        resultados[nombre] = {
+            "tupla": _bytes_por_fila(lambda r: (*r,), filas),
+            "slots": _bytes_por_fila(lambda r: modelo(*r), filas),
+            "dict": _bytes_por_fila(lambda r: con_dict(*r), filas),
+        }
+    return resultados
+
+
+# --- Comparacion ---
+
+
+def comparar(base, nuevo, umbral=0.10):
+    """
+    Compara dos corridas. Retorna [(nombre, metrica, antes, despues, cambio, regresion)].
+    Hay regresion si p50/p95 suben o ops/s baja mas que `umbral` (fraccion).
+    """
+    filas = []
+    for nombre, antes in base["resultados"].items():
+        despues = nuevo["resultados"].get(nombre)
+        if despues is None:
+            continue
+        for metrica, mayor_es_mejor in (("ops_por_seg", True), ("p50_ms", False), ("p95_ms", False)):
+            a, d = antes[metrica], despues[metrica]
+            cambio = (d - a) / a if a else 0.0
+            regresion = (-cambio if mayor_es_mejor else cambio) > umbral
+            filas.append((nombre, metrica, a, d, cambio, regresion))
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de la tienda.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_correr = sub.add_parser("correr", help="Corre los benchmarks y guarda el JSON")
+    p_correr.add_argument("--salida", default="bench_tienda.json", help="Archivo JSON de resultados")
+    p_correr.add_argument("--repeticiones", type=int, default=200)
+    p_correr.add_argument(
+        "--tamanos", type=int, nargs="+", default=list(TAMANOS_LISTADO),
+        help="Tamaños del catálogo para listar_todos",
+    )
+    p_correr.add_argument("--conservar", action="store_true", help="No borrar los datos Bench")
+
+    p_sentencias = sub.add_parser(
+        "sentencias", help="Compara consultas calientes con y sin sentencias preparadas"
+    )
+    p_sentencias.add_argument("--salida", default="bench_sentencias.json", help="Archivo JSON de resultados")
+    p_sentencias.add_argument("--repeticiones", type=int, default=500)
+    p_sentencias.add_argument("--conservar", action="store_true", help="No borrar los datos Bench")
+
+    p_memoria = sub.add_parser("memoria", help="Bytes por fila de los listados (sin BD)")
+    p_memoria.add_argument("--filas", type=int, default=100_000)
+
+    p_comparar = sub.add_parser("comparar", help="Compara dos corridas y marca regresiones")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("nuevo")
+    p_comparar.add_argument("--umbral", type=float, default=0.10, help="Cambio tolerado (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    if args.comando == "comparar":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.nuevo, encoding="utf-8") as f:
+            nuevo = json.load(f)
+        regresiones = 0
+        for nombre, metrica, a, d, cambio, regresion in comparar(base, nuevo, args.umbral):
+            marca = "REGRESION" if regresion else ""
+            regresiones += regresion
+            print(f"{nombre:40s} {metrica:12s} {a:12.3f} -> {d:12.3f} {cambio:+8.1%} {marca}")
+        print(f"Regresiones: {regresiones}")
+        return 1 if regresiones else 0
+
+    if args.comando == "memoria":
+        for nombre, r in medir_memoria(args.filas).items():
+            print(
+                f"{nombre:10s} tupla {r['tupla']:8.1f}  slots {r['slots']:8.1f}  "
+                f"dict {r['dict']:8.1f} bytes/fila"
+            )
+        return 0
+
+    connection = create_connection()
+    if not connection:
+        return 1
+    crear_tablas(connection)
+    close_connection(connection)
+
+    try:
+        if args.comando == "sentencias":
+            resultados = correr_sentencias(args.repeticiones)
+        else:
+            resultados = correr(args.repeticiones, args.tamanos)
+    finally:
+        if not args.conservar:
+            limpiar()
+
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "maquina": platform.platform(),
+        "backend": DB_BACKEND,
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(salida, f, indent=2)
+
+    for nombre, r in resultados.items():
+        print(
+            f"{nombre:40s} {r['ops_por_seg']:10.1f} ops/s  "
+            f"p50 {r['p50_ms']:8.3f}  p95 {r['p95_ms']:8.3f}  p99 {r['p99_ms']:8.3f} ms"
+        )
+    print(f"Resultados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
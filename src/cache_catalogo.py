@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from db_connection import al_confirmar, en_transaccion, escrita_en_transaccion, get_conn, marcar_escritas
+
+
+CACHE_TTL = float(os.getenv("CACHE_CATALOGO_TTL", 30))
+CACHE_MAX = int(os.getenv("CACHE_CATALOGO_MAX", 1000))
+CACHE_INTERVALO_VERSION = float(os.getenv("CACHE_CATALOGO_INTERVALO_VERSION", 2))
+
+
+class CacheCatalogo:
+    """
+    Cache LRU en memoria de filas de juegos_mesa, indexada por id y por titulo.
+
+    Cada entrada vence a los `ttl` segundos. Las escrituras locales invalidan su
+    entrada al instante; para los cambios hechos desde otras terminales se lee
+    la fila catalogo_version como mucho cada `intervalo_version` segundos y, si
+    cambio, se vacia la cache completa.
+    """
+
+    def __init__(
+        self,
+        ttl=CACHE_TTL,
+        max_items=CACHE_MAX,
+        intervalo_version=CACHE_INTERVALO_VERSION,
+    ):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.intervalo_version = intervalo_version
+
+        self._por_id = OrderedDict()  # id -> (fila, vence)
+        self._id_por_titulo = {}  # titulo en minusculas -> id
+        self._lock = threading.Lock()
+        self._generacion = 0
+        self._version = None
+        self._proxima_verificacion = 0.0
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def generacion(self):
+        """
+        Numero que cambia con cada invalidacion. Se toma antes de leer la BD y se
+        pasa a guardar(), asi una lectura vieja no pisa una invalidacion reciente.
+        """
+        return self._generacion
+
+    def obtener_por_id(self, juego_id):
+        """Retorna la fila cacheada del juego o None."""
+        self._verificar_version()
+        with self._lock:
+            return self._obtener(juego_id)
+
+    def obtener_por_titulo(self, titulo):
+        """Retorna la fila cacheada del juego con ese titulo o None."""
+        self._verificar_version()
+        with self._lock:
+            juego_id = self._id_por_titulo.get(titulo.lower())
+            if juego_id is None:
+                self.fallos += 1
+                return None
+            return self._obtener(juego_id)
+
+    def _obtener(self, juego_id):
+        entrada = self._por_id.get(juego_id)
+        if entrada is None:
+            self.fallos += 1
+            return None
+        fila, vence = entrada
+        if vence < time.monotonic():
+            self._quitar(juego_id)
+            self.fallos += 1
+            return None
+        self._por_id.move_to_end(juego_id)
+        self.aciertos += 1
+        return fila
+
+    def guardar(self, fila, generacion):
+        """
+        Guarda la fila (id, titulo, ...) si no hubo invalidaciones desde `generacion`.
+        No guarda un juego que la transaccion en curso ya escribio: la fila tiene
+        cambios sin confirmar que un rollback desharia. El resto de lo leido dentro
+        de la transaccion es lo confirmado y se guarda como siempre.
+        """
+        if self.max_items <= 0 or escrita_en_transaccion("juegos_mesa", fila[0]):
+            return
+        with self._lock:
+            if generacion != self._generacion:
+                return
+            self._quitar(fila[0])
+            self._por_id[fila[0]] = (fila, time.monotonic() + self.ttl)
+            self._id_por_titulo[fila[1].lower()] = fila[0]
+            while len(self._por_id) > self.max_items:
+                self._quitar(next(iter(self._por_id)))
+
+    def invalidar(self, *ids):
+        """Quita de la cache los juegos indicados."""
+        self._invalidar(ids)
+        marcar_escritas("juegos_mesa", ids)
+        if en_transaccion():
+            # Se repite al confirmar, por si otro hilo releyo la fila vieja mientras tanto
+            al_confirmar(lambda: self._invalidar(ids))
+
+    def _invalidar(self, ids):
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            for juego_id in ids:
+                self._quitar(juego_id)
+
+    def limpiar(self):
+        """Vacia la cache completa."""
+        self._limpiar()
+        marcar_escritas("juegos_mesa")
+        if en_transaccion():
+            al_confirmar(self._limpiar)
+
+    def _limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            self._por_id.clear()
+            self._id_por_titulo.clear()
+
+    def _quitar(self, juego_id):
+        entrada = self._por_id.pop(juego_id, None)
+        if entrada is not None:
+            titulo = entrada[0][1].lower()
+            if self._id_por_titulo.get(titulo) == juego_id:
+                del self._id_por_titulo[titulo]
+
+    def _verificar_version(self):
+        """Compara la version del catalogo en la BD, como mucho cada intervalo_version segundos."""
+        ahora = time.monotonic()
+        if ahora < self._proxima_verificacion:
+            return
+        self._proxima_verificacion = ahora + self.intervalo_version
+
+        version = leer_version_catalogo()
+        if version is None or version != self._version:
+            self._limpiar()
+        self._version = version
+
+    def estadisticas(self):
+        """Contadores para dimensionar la cache."""
+        consultas = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0,
+            "invalidaciones": self.invalidaciones,
+            "entradas": len(self._por_id),
+            "max_items": self.max_items,
+            "ttl": self.ttl,
+        }
+
+
+cache_juegos = CacheCatalogo()
+
+
+def leer_version_catalogo():
+    """Version actual del catalogo en la BD, o None si no se pudo leer."""
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT version FROM catalogo_version WHERE id = 1")
+        r = cur.fetchone()
+        return r[0] if r else None
+    except Exception:
+        # Sin version confiable no se arriesga a servir datos viejos
+        return None
+    finally:
+        cur.close()
+        conn.close()
+
+
+def marcar_cambio_catalogo(cur):
+    """
+    Incrementa la version del catalogo dentro de la transaccion del cursor,
+    para que las demas terminales vacien su cache en la proxima verificacion.
+    """
+    cur.execute("UPDATE catalogo_version SET version = version + 1 WHERE id = 1")
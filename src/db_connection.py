@@ -1,13 +1,19 @@
 from dotenv import load_dotenv
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
-import mysql.connector
-from mysql.connector import Error
-from mysql.connector import pooling
+import instrumentacion
 
 
 load_dotenv()
 
+# "mysql" (servidor) o "sqlite" (archivo local embebido, ver backend_sqlite.py)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "juegosmesa.db")
+
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "localhost"),
     "port": int(os.getenv("DB_PORT", 3307)),
@@ -16,28 +22,387 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD", "123456789"),
     "autocommit": False,
     "charset": "utf8mb4",
+    # Por defecto se usa la extension en C del conector si esta instalada
+    "use_pure": os.getenv("DB_USE_PURE", "0").lower() in ("1", "true", "si"),
 }
 
 POOL_NAME = os.getenv("POOL_NAME", "bib_pool")
 POOL_SIZE = int(os.getenv("POOL_SIZE", 5))
+# Conexiones extra permitidas por encima de POOL_SIZE en picos (se cierran al devolverse)
+POOL_MAX_OVERFLOW = int(os.getenv("POOL_MAX_OVERFLOW", 0))
+# Segundos que get_conn() espera una conexion libre antes de fallar
+POOL_TIMEOUT = float(os.getenv("POOL_TIMEOUT", 10))
+# Segundos de vida tras los cuales una conexion se cierra y se abre de nuevo
+POOL_RECYCLE = float(os.getenv("POOL_RECYCLE", 1800))
+# Segundos de inactividad tras los cuales se hace ping antes de prestar la conexion
+POOL_PING_INACTIVA = float(os.getenv("POOL_PING_INACTIVA", 30))
+
+
+class _ConexionPool:
+    """
+    Conexion prestada por el pool. Se comporta como la conexion de MySQL,
+    pero close() la devuelve al pool en lugar de cerrarla.
+    """
+
+    def __init__(self, pool, conn, creada):
+        self._pool = pool
+        self._conn = conn
+        self._creada = creada
+
+    def cursor(self, *args, **kwargs):
+        cur = self._conn.cursor(*args, **kwargs)
+        if instrumentacion.activa:
+            return instrumentacion.CursorInstrumentado(cur)
+        return cur
+
+    def conexion_cruda(self):
+        """Conexion fisica del conector (para guardar sentencias preparadas por conexion)."""
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.devolver(conn, self._creada)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones que espera (con limite de tiempo) cuando no hay una libre,
+    valida o recicla las conexiones viejas y registra metricas para dimensionarlo.
+    """
+
+    def __init__(
+        self,
+        crear,
+        tamano=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        timeout=POOL_TIMEOUT,
+        reciclar=POOL_RECYCLE,
+        ping_inactiva=POOL_PING_INACTIVA,
+    ):
+        self._crear = crear
+        self.tamano = tamano
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.reciclar = reciclar
+        self.ping_inactiva = ping_inactiva
+
+        self._libres = deque()  # (conn, creada, devuelta)
+        self._cond = threading.Condition()
+        self._abiertas = 0
+        self._en_uso = 0
+
+        self._stats = {
+            "prestamos": 0,
+            "esperas": 0,
+            "espera_total_ms": 0.0,
+            "espera_max_ms": 0.0,
+            "agotamientos": 0,
+            "pico_en_uso": 0,
+            "overflow_abiertas": 0,
+            "recicladas": 0,
+            "descartadas": 0,
+        }
+
+    def obtener(self):
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        entrada = None
+        with self._cond:
+            espero = False
+            while True:
+                if self._libres:
+                    # LIFO: se reusa la conexion mas reciente, que sigue "caliente"
+                    entrada = self._libres.pop()
+                    break
+                if self._abiertas < self.tamano + self.max_overflow:
+                    if self._abiertas >= self.tamano:
+                        self._stats["overflow_abiertas"] += 1
+                    self._abiertas += 1
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._stats["agotamientos"] += 1
+                    raise Exception(
+                        f"Pool de conexiones agotado: {self._en_uso} en uso tras esperar {self.timeout}s."
+                    )
+                if not espero:
+                    espero = True
+                    self._stats["esperas"] += 1
+                self._cond.wait(restante)
+
+            self._en_uso += 1
+            self._stats["prestamos"] += 1
+            self._stats["pico_en_uso"] = max(self._stats["pico_en_uso"], self._en_uso)
+            espera_ms = (time.monotonic() - inicio) * 1000
+            self._stats["espera_total_ms"] += espera_ms
+            self._stats["espera_max_ms"] = max(self._stats["espera_max_ms"], espera_ms)
+
+        try:
+            if entrada is None:
+                conn, creada = self._crear(), time.monotonic()
+            else:
+                conn, creada = self._validar(*entrada)
+        except Exception:
+            with self._cond:
+                self._abiertas -= 1
+                self._en_uso -= 1
+                self._cond.notify()
+            raise
+        return _ConexionPool(self, conn, creada)
+
+    def _validar(self, conn, creada, devuelta):
+        """
+        Recicla la conexion si es muy vieja y le hace ping si estuvo inactiva.
+        Corre fuera del lock (el ping va a la red): las metricas se suman con el lock.
+        """
+        ahora = time.monotonic()
+        if ahora - creada > self.reciclar:
+            with self._cond:
+                self._stats["recicladas"] += 1
+            self._cerrar(conn)
+            return self._crear(), time.monotonic()
+        if ahora - devuelta > self.ping_inactiva:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats["descartadas"] += 1
+                self._cerrar(conn)
+                return self._crear(), time.monotonic()
+        return conn, creada
+
+    def devolver(self, conn, creada):
+        sana = True
+        try:
+            # No dejar transacciones abiertas al siguiente que use la conexion
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            sana = False
+
+        with self._cond:
+            self._en_uso -= 1
+            guardar = sana and len(self._libres) < self.tamano
+            if guardar:
+                self._libres.append((conn, creada, time.monotonic()))
+            else:
+                self._abiertas -= 1
+                if not sana:
+                    self._stats["descartadas"] += 1
+            self._cond.notify()
+        if not guardar:
+            self._cerrar(conn)
+
+    def cerrar_todas(self):
+        """Cierra las conexiones libres (las prestadas se cierran al devolverse)."""
+        with self._cond:
+            libres = list(self._libres)
+            self._libres.clear()
+            self._abiertas -= len(libres)
+            self.tamano = 0
+        for conn, _, _ in libres:
+            self._cerrar(conn)
+
+    @staticmethod
+    def _cerrar(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def estadisticas(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                tamano=self.tamano,
+                max_overflow=self.max_overflow,
+                abiertas=self._abiertas,
+                en_uso=self._en_uso,
+                libres=len(self._libres),
+            )
+        prestamos = stats["prestamos"]
+        stats["espera_promedio_ms"] = (
+            round(stats["espera_total_ms"] / prestamos, 3) if prestamos else 0.0
+        )
+        return stats
+
+
+def conectar():
+    """Abre una conexion nueva con el backend configurado en DB_BACKEND."""
+    if DB_BACKEND == "sqlite":
+        import backend_sqlite
+
+        return backend_sqlite.conectar(SQLITE_PATH)
+    if DB_BACKEND == "mysql":
+        # Import diferido: con SQLite no hace falta tener instalado mysql-connector
+        import mysql.connector
+
+        return mysql.connector.connect(**DB_CONFIG)
+    raise Exception(f"DB_BACKEND desconocido: '{DB_BACKEND}' (use mysql o sqlite).")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool():
+    """Crea el pool en el primer uso, asi importar los modelos no requiere la BD activa."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexiones(conectar)
+    return _pool
 
-pool = pooling.MySQLConnectionPool(
-    pool_name=POOL_NAME, pool_size=POOL_SIZE, **DB_CONFIG
-)
+
+_local = threading.local()
+
+
+class _ConexionCompartida:
+    """
+    Conexion de la transaccion en curso del hilo. Los modelos la usan igual que
+    una del pool, pero commit() y close() no hacen nada: el commit unico lo hace
+    transaccion() al salir. Un rollback() de un modelo marca la transaccion para
+    deshacerse completa.
+    """
+
+    def __init__(self, tx):
+        self._tx = tx
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self._tx.solo_rollback = True
+
+    def close(self):
+        pass
+
+    def conexion_cruda(self):
+        return self._tx.conn.conexion_cruda()
+
+    def __getattr__(self, nombre):
+        return getattr(self._tx.conn, nombre)
+
+
+class Transaccion:
+    """Estado de una unidad de trabajo: la conexion compartida y los callbacks post-commit."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.solo_rollback = False
+        self._al_confirmar = []
+        # (tabla, id) escritos en la transaccion; (tabla, None) si se toco toda la tabla
+        self.escritas = set()
+
+    def al_confirmar(self, fn):
+        """Registra fn para ejecutarse solo si la transaccion se confirma."""
+        self._al_confirmar.append(fn)
+
+
+@contextmanager
+def transaccion():
+    """
+    Unidad de trabajo: dentro del bloque todas las llamadas a get_conn() del hilo
+    reciben la misma conexion y los modelos comparten un solo commit. Si el
+    bloque lanza una excepcion (o un modelo hizo rollback) se deshace todo.
+    Los bloques anidados se suman a la transaccion exterior.
+    """
+    actual = getattr(_local, "tx", None)
+    if actual is not None:
+        yield actual
+        return
+
+    tx = Transaccion(obtener_pool().obtener())
+    _local.tx = tx
+    try:
+        yield tx
+        if tx.solo_rollback:
+            raise Exception("La transacción se deshizo porque una operación interna falló.")
+        tx.conn.commit()
+    except BaseException:
+        tx.conn.rollback()
+        raise
+    finally:
+        _local.tx = None
+        tx.conn.close()
+
+    for fn in tx._al_confirmar:
+        fn()
+
+
+def en_transaccion():
+    return getattr(_local, "tx", None) is not None
+
+
+def marcar_escritas(tabla, ids=None):
+    """
+    Anota en la transaccion en curso las filas de `tabla` que escribio (None:
+    toda la tabla). Sin transaccion no hace nada: la escritura ya se confirmo.
+    """
+    tx = getattr(_local, "tx", None)
+    if tx is None:
+        return
+    if ids is None:
+        tx.escritas.add((tabla, None))
+    else:
+        tx.escritas.update((tabla, i) for i in ids)
+
+
+def escrita_en_transaccion(tabla, id_):
+    """True si la transaccion en curso escribio esa fila (o toda la tabla) y aun no se confirmo."""
+    tx = getattr(_local, "tx", None)
+    return tx is not None and ((tabla, id_) in tx.escritas or (tabla, None) in tx.escritas)
+
+
+def al_confirmar(fn):
+    """Ejecuta fn al confirmar la transaccion en curso, o de inmediato si no hay una."""
+    tx = getattr(_local, "tx", None)
+    if tx is None:
+        fn()
+    else:
+        tx.al_confirmar(fn)
 
 
 def get_conn():
-    return pool.get_connection()
+    tx = getattr(_local, "tx", None)
+    if tx is not None:
+        return _ConexionCompartida(tx)
+    return obtener_pool().obtener()
+
+
+def pool_stats():
+    """Metricas del pool (prestamos, esperas, agotamientos, pico de uso...)."""
+    if _pool is None:
+        return {}
+    return _pool.estadisticas()
+
+
+def stats(orden="total_ms", limite=None):
+    """
+    Metricas del pool y, si la instrumentacion esta activa (DB_INSTRUMENTAR=1),
+    el resumen por sentencia: llamadas, tiempos, percentiles, filas y llamadores.
+    """
+    return {
+        "pool": pool_stats(),
+        "instrumentacion_activa": instrumentacion.activa,
+        "consultas": instrumentacion.estadisticas(orden, limite),
+    }
 
 
 def create_connection():
+    nombre = "MySQL" if DB_BACKEND == "mysql" else f"SQLite ({SQLITE_PATH})"
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = conectar()
         if connection.is_connected():
-            print("Conexión exitosa a MySQL")
+            print(f"Conexión exitosa a {nombre}")
             return connection
-    except Error as e:
-        print(f"Error al conectar a MySQL: {e}")
+    except Exception as e:
+        print(f"Error al conectar a {nombre}: {e}")
         return None
 
 
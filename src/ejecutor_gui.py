@@ -0,0 +1,193 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Tarea:
+    """Una llamada enviada al ejecutor. Se puede cancelar y puede reportar progreso."""
+
+    def __init__(self, ejecutor, clave, descripcion):
+        self._ejecutor = ejecutor
+        self.clave = clave
+        self.descripcion = descripcion
+        self.cancelada = False
+        self.cancelable = True
+        self.silenciosa = False
+        self.future = None
+
+    def reportar(self, mensaje):
+        """Se puede llamar desde el hilo de fondo; el mensaje llega a Tk por la cola."""
+        self._ejecutor._cola.put(("progreso", self, mensaje))
+
+
+class EjecutorTk:
+    """
+    Ejecuta las llamadas a la BD en hilos de fondo para no congelar el mainloop.
+
+    Los resultados vuelven por una cola que se revisa con root.after(), asi los
+    callbacks siempre corren en el hilo de Tk. Cada tarea tiene una clave: no
+    se aceptan dos tareas con la misma clave a la vez (evita dobles envios).
+    """
+
+    def __init__(self, root, max_hilos=2, intervalo_ms=50, al_cambiar_estado=None):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        # al_cambiar_estado(ocupado, mensaje) para barra de progreso / cursor
+        self.al_cambiar_estado = al_cambiar_estado
+
+        self._hilos = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="bd")
+        self._cola = queue.Queue()
+        self._en_curso = {}
+        self._callbacks = {}
+        self._sondeando = False
+
+    def enviar(
+        self,
+        clave,
+        fn,
+        *args,
+        al_terminar=None,
+        al_error=None,
+        al_progreso=None,
+        descripcion="Procesando...",
+        reemplazar=False,
+        con_tarea=False,
+        cancelable=True,
+        silenciosa=False,
+        **kwargs,
+    ):
+        """
+        Envia fn(*args, **kwargs) a un hilo de fondo. Retorna la Tarea, o None si
+        ya habia una con la misma clave en curso. Con reemplazar=True la anterior
+        se cancela (util para listados: gana el ultimo pedido). Con con_tarea=True
+        fn recibe la Tarea como primer argumento para reportar progreso o revisar
+        si fue cancelada. Las escrituras se envian con cancelable=False: una vez
+        enviadas no se descarta su resultado. Las tareas silenciosas (sugerencias
+        mientras se escribe) no muestran la barra de progreso.
+        """
+        if clave in self._en_curso:
+            if not reemplazar:
+                return None
+            self.cancelar(clave)
+
+        tarea = Tarea(self, clave, descripcion)
+        tarea.cancelable = cancelable
+        tarea.silenciosa = silenciosa
+        if con_tarea:
+            args = (tarea,) + args
+        self._en_curso[clave] = tarea
+        self._callbacks[tarea] = (al_terminar, al_error, al_progreso)
+        tarea.future = self._hilos.submit(self._correr, tarea, fn, args, kwargs)
+
+        self._notificar()
+        if not self._sondeando:
+            self._sondeando = True
+            self.root.after(self.intervalo_ms, self._sondear)
+        return tarea
+
+    def _correr(self, tarea, fn, args, kwargs):
+        # Corre en el hilo de fondo: no tocar widgets de Tk aqui
+        if tarea.cancelada:
+            return
+        try:
+            resultado = fn(*args, **kwargs)
+        except Exception as e:
+            self._cola.put(("error", tarea, e))
+        else:
+            self._cola.put(("ok", tarea, resultado))
+
+    def _sondear(self):
+        while True:
+            try:
+                tipo, tarea, valor = self._cola.get_nowait()
+            except queue.Empty:
+                break
+
+            al_terminar, al_error, al_progreso = self._callbacks.get(tarea, (None, None, None))
+            if tipo == "progreso":
+                if not tarea.cancelada:
+                    if al_progreso:
+                        al_progreso(valor)
+                    self._notificar(valor)
+                continue
+
+            self._callbacks.pop(tarea, None)
+            if self._en_curso.get(tarea.clave) is tarea:
+                del self._en_curso[tarea.clave]
+            if tarea.cancelada:
+                continue
+            if tipo == "ok" and al_terminar:
+                al_terminar(valor)
+            elif tipo == "error" and al_error:
+                al_error(valor)
+
+        self._notificar()
+        if self._en_curso or self._callbacks:
+            self.root.after(self.intervalo_ms, self._sondear)
+        else:
+            self._sondeando = False
+
+    def cancelar(self, clave=None):
+        """
+        Cancela la tarea con esa clave (o todas). Si aun no empezo no se ejecuta;
+        si ya esta en la BD se deja terminar pero su resultado se descarta.
+        """
+        claves = [clave] if clave is not None else list(self._en_curso)
+        for c in claves:
+            tarea = self._en_curso.get(c)
+            if tarea is None or not tarea.cancelable:
+                continue
+            del self._en_curso[c]
+            tarea.cancelada = True
+            if tarea.future.cancel():
+                # Nunca va a llegar un resultado por la cola
+                self._callbacks.pop(tarea, None)
+        self._notificar()
+
+    def ocupado(self, clave=None):
+        if clave is None:
+            return bool(self._en_curso)
+        return clave in self._en_curso
+
+    def esperar(self, fn, *args, **kwargs):
+        """
+        Ejecuta fn en segundo plano y espera su resultado sin bloquear el mainloop
+        (la ventana se sigue redibujando). Pensado para flujos secuenciales como el
+        login. Relanza la excepcion de fn si fallo.
+        """
+        listo = threading.Event()
+        salida = {}
+
+        def correr():
+            try:
+                salida["resultado"] = fn(*args, **kwargs)
+            except Exception as e:
+                salida["error"] = e
+            finally:
+                listo.set()
+
+        self._hilos.submit(correr)
+        self._notificar(True)
+        while not listo.is_set():
+            self.root.update()
+            listo.wait(self.intervalo_ms / 1000)
+        self._notificar()
+
+        if "error" in salida:
+            raise salida["error"]
+        return salida.get("resultado")
+
+    def _notificar(self, mensaje=None):
+        if self.al_cambiar_estado is None:
+            return
+        if mensaje is True:
+            self.al_cambiar_estado(True, "Procesando...")
+        elif any(not t.silenciosa for t in self._en_curso.values()):
+            tarea = next(t for t in reversed(self._en_curso.values()) if not t.silenciosa)
+            self.al_cambiar_estado(True, mensaje or tarea.descripcion)
+        else:
+            self.al_cambiar_estado(False, "")
+
+    def cerrar(self):
+        self.cancelar()
+        self._hilos.shutdown(wait=False, cancel_futures=True)
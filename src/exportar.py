@@ -0,0 +1,193 @@
+"""
+Exportacion del historial de ventas y de sesiones de ludoteca a CSV o JSONL.
+
+    python exportar.py ventas --mes 2024-05 --salida ventas_2024_05.csv.gz
+    python exportar.py sesiones --desde 2024-01-01 --hasta 2024-07-01 --formato jsonl
+
+Con --archivo tambien se leen los meses movidos a las tablas de archivo
+(ver archivo.py). Las filas se leen por bloques con un cursor sin buffer (en MySQL el resultado
+queda en el servidor y llega a medida que se consume) y se escriben bloque a
+bloque, asi la memoria usada no depende de cuantas filas se exporten. Con una
+salida terminada en .gz (o --gzip) el archivo se comprime al escribirlo.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from archivo import origen
+from paginacion import iterar_bloques
+
+
+# Alias de cada tabla en las consultas; {tabla} se reemplaza por archivo.origen()
+ALIAS = {"ventas": "v", "ludoteca_sesiones": "s", "ludoteca_participantes": "p"}
+
+# tipo -> (consulta sin WHERE, columna de fecha para filtrar, orden, columnas del archivo)
+EXPORTACIONES = {
+    "ventas": (
+        """
+        SELECT v.id, v.fecha_venta, v.cliente_id, u.nombre, v.juego_id, j.titulo,
+               v.cantidad, v.precio_total
+        FROM {ventas}
+        LEFT JOIN usuarios u ON u.id = v.cliente_id
+        LEFT JOIN juegos_mesa j ON j.id = v.juego_id
+        """,
+        "v.fecha_venta",
+        "v.id",
+        ["id", "fecha_venta", "cliente_id", "cliente", "juego_id", "juego", "cantidad", "precio_total"],
+    ),
+    "sesiones": (
+        """
+        SELECT s.id, s.hora_inicio, s.hora_fin, s.juego_id, j.titulo, s.vendedor_id, u.nombre,
+               (SELECT COUNT(*) FROM {ludoteca_participantes} WHERE p.sesion_id = s.id),
+               s.duracion_horas, s.precio_total
+        FROM {ludoteca_sesiones}
+        LEFT JOIN juegos_mesa j ON j.id = s.juego_id
+        LEFT JOIN usuarios u ON u.id = s.vendedor_id
+        """,
+        "s.hora_inicio",
+        "s.id",
+        [
+            "id", "hora_inicio", "hora_fin", "juego_id", "juego", "vendedor_id", "vendedor",
+            "participantes", "duracion_horas", "precio_total",
+        ],
+    ),
+}
+
+
+def rango_mes(mes):
+    """'AAAA-MM' -> (primer dia del mes, primer dia del mes siguiente)."""
+    anio, numero = (int(x) for x in mes.split("-"))
+    desde = date(anio, numero, 1)
+    hasta = date(anio + numero // 12, numero % 12 + 1, 1)
+    return desde.isoformat(), hasta.isoformat()
+
+
+def _consulta(tipo, desde=None, hasta=None, incluir_archivo=False):
+    try:
+        query, columna_fecha, orden, columnas = EXPORTACIONES[tipo]
+    except KeyError:
+        raise Exception(f"Tipo de exportación desconocido: '{tipo}'.")
+    query = query.format(
+        **{tabla: origen(tabla, incluir_archivo, alias) for tabla, alias in ALIAS.items() if f"{{{tabla}}}" in query}
+    )
+    condiciones, params = [], []
+    if desde:
+        condiciones.append(f"{columna_fecha} >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append(f"{columna_fecha} < %s")
+        params.append(hasta)
+    if condiciones:
+        query += " WHERE " + " AND ".join(condiciones)
+    return f"{query} ORDER BY {orden}", tuple(params), columnas
+
+
+def _texto(valor):
+    """Valor para CSV: fechas como 'AAAA-MM-DD HH:MM:SS', NULL como vacio."""
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=" ")
+    return valor
+
+
+def _json(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=" ")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no exportable: {type(valor).__name__}")
+
+
+def _abrir(salida, comprimir):
+    if salida == "-":
+        return sys.stdout, False
+    if comprimir:
+        return gzip.open(salida, "wt", encoding="utf-8", newline=""), True
+    return open(salida, "w", encoding="utf-8", newline=""), True
+
+
+def exportar(
+    tipo, salida, formato=None, desde=None, hasta=None, comprimir=None, tam_bloque=5000, incluir_archivo=False
+):
+    """
+    Escribe las filas de `tipo` ("ventas" o "sesiones") con fecha >= desde y
+    < hasta en `salida` ("-" para la salida estandar). El formato ("csv" o
+    "jsonl") y la compresion se deducen de la extension si no se indican. Con
+    incluir_archivo=True tambien se exportan las filas archivadas.
+    Retorna {filas, segundos, filas_por_segundo}.
+    """
+    nombre = salida[:-3] if salida.endswith(".gz") else salida
+    formato = formato or ("jsonl" if nombre.endswith(".jsonl") else "csv")
+    if formato not in ("csv", "jsonl"):
+        raise Exception(f"Formato desconocido: '{formato}'.")
+    if comprimir is None:
+        comprimir = salida.endswith(".gz")
+    query, params, columnas = _consulta(tipo, desde, hasta, incluir_archivo)
+
+    inicio = time.perf_counter()
+    filas = 0
+    archivo, cerrar = _abrir(salida, comprimir)
+    try:
+        if formato == "csv":
+            escritor = csv.writer(archivo)
+            escritor.writerow(columnas)
+        for bloque in iterar_bloques(query, params, tam_bloque):
+            if formato == "csv":
+                escritor.writerows([_texto(v) for v in fila] for fila in bloque)
+            else:
+                archivo.write(
+                    "".join(
+                        json.dumps(dict(zip(columnas, fila)), default=_json, ensure_ascii=False) + "\n"
+                        for fila in bloque
+                    )
+                )
+            filas += len(bloque)
+    finally:
+        if cerrar:
+            archivo.close()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "filas": filas,
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": round(filas / segundos, 1) if segundos else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta el historial de ventas o de ludoteca.")
+    parser.add_argument("tipo", choices=sorted(EXPORTACIONES), help="Qué historial exportar")
+    parser.add_argument("--salida", default="-", help="Archivo de salida (.csv, .jsonl, .gz); '-' = pantalla")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], help="Por defecto se deduce de la extensión")
+    parser.add_argument("--gzip", action="store_true", help="Comprimir aunque la salida no termine en .gz")
+    parser.add_argument("--desde", help="Fecha inicial (AAAA-MM-DD)")
+    parser.add_argument("--hasta", help="Fecha final, excluida (AAAA-MM-DD)")
+    parser.add_argument("--mes", help="Un mes completo (AAAA-MM); reemplaza a --desde/--hasta")
+    parser.add_argument("--bloque", type=int, default=5000, help="Filas por lectura")
+    parser.add_argument("--archivo", action="store_true", help="Incluir los meses archivados")
+    args = parser.parse_args(argv)
+
+    desde, hasta = rango_mes(args.mes) if args.mes else (args.desde, args.hasta)
+    reporte = exportar(
+        args.tipo, args.salida, args.formato, desde, hasta,
+        comprimir=args.gzip or None, tam_bloque=args.bloque, incluir_archivo=args.archivo,
+    )
+    print(
+        f"Exportadas {reporte['filas']} filas en {reporte['segundos']}s "
+        f"({reporte['filas_por_segundo']} filas/s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import argparse
+import csv
+import json
+import sys
+
+from juego_mesa import JuegoMesa
+
+
+def leer_csv(ruta):
+    """Genera las filas de un CSV con encabezados (titulo, fabricante, stock, ...)."""
+    with open(ruta, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            yield fila
+
+
+def leer_jsonl(ruta):
+    """Genera las filas de un archivo JSONL (un objeto JSON por linea)."""
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                # Se pasa vacia para que cuente como rechazada en el reporte
+                yield {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Importa el catálogo de un distribuidor (CSV o JSONL)."
+    )
+    parser.add_argument("archivo", help="Ruta del archivo .csv o .jsonl")
+    parser.add_argument(
+        "--formato", choices=["csv", "jsonl"], help="Por defecto se deduce de la extensión"
+    )
+    parser.add_argument("--lote", type=int, default=500, help="Filas por commit")
+    args = parser.parse_args(argv)
+
+    formato = args.formato or ("jsonl" if args.archivo.endswith(".jsonl") else "csv")
+    filas = leer_jsonl(args.archivo) if formato == "jsonl" else leer_csv(args.archivo)
+
+    reporte = JuegoMesa.importar_lote(filas, tam_lote=args.lote)
+
+    print(f"Insertados:   {reporte['insertados']}")
+    print(f"Actualizados: {reporte['actualizados']}")
+    print(f"Rechazados:   {reporte['rechazados']}")
+    print(f"Tiempo: {reporte['segundos']}s ({reporte['filas_por_segundo']} filas/s)")
+    for numero, motivo in reporte["errores"]:
+        print(f"  fila {numero}: {motivo}")
+    return 0 if reporte["rechazados"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import argparse
+import sys
+
+from importar_catalogo import leer_csv, leer_jsonl
+from usuario import PASSWORD_ITERACIONES, Usuario, calibrar_iteraciones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa socios del club y calibra el hash.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_importar = sub.add_parser("importar", help="Importa usuarios desde CSV o JSONL")
+    p_importar.add_argument("archivo", help="Ruta del archivo con columnas nombre, role, password")
+    p_importar.add_argument(
+        "--formato", choices=["csv", "jsonl"], help="Por defecto se deduce de la extensión"
+    )
+    p_importar.add_argument("--lote", type=int, default=500, help="Filas por commit")
+    p_importar.add_argument(
+        "--procesos", type=int, help="Procesos para hashear (por defecto, uno por núcleo)"
+    )
+
+    p_calibrar = sub.add_parser(
+        "calibrar", help="Sugiere PASSWORD_ITERACIONES para una latencia de login"
+    )
+    p_calibrar.add_argument("--objetivo-ms", type=float, default=250, help="Tiempo por hash")
+    args = parser.parse_args(argv)
+
+    if args.comando == "calibrar":
+        iteraciones = calibrar_iteraciones(args.objetivo_ms)
+        print(f"Iteraciones actuales: {PASSWORD_ITERACIONES}")
+        print(f"Sugeridas para ~{args.objetivo_ms:g} ms: {iteraciones}")
+        print(f"Configurar con PASSWORD_ITERACIONES={iteraciones} en el .env")
+        return 0
+
+    formato = args.formato or ("jsonl" if args.archivo.endswith(".jsonl") else "csv")
+    filas = leer_jsonl(args.archivo) if formato == "jsonl" else leer_csv(args.archivo)
+
+    reporte = Usuario.importar_lote(filas, tam_lote=args.lote, procesos=args.procesos)
+
+    print(f"Insertados: {reporte['insertados']}")
+    print(f"Existentes: {reporte['existentes']}")
+    print(f"Rechazados: {reporte['rechazados']}")
+    print(f"Tiempo: {reporte['segundos']}s ({reporte['filas_por_segundo']} filas/s)")
+    for numero, motivo in reporte["errores"]:
+        print(f"  fila {numero}: {motivo}")
+    return 0 if reporte["rechazados"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
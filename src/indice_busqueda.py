@@ -0,0 +1,395 @@
+"""
+Indice en memoria para buscar juegos por titulo y fabricante mientras se escribe.
+
+La busqueda no distingue mayusculas ni acentos ("catan" encuentra "Catán") y
+cada palabra escrita se toma como prefijo ("cat mag" encuentra "Catan: Mazo
+de Magos"). Si hay pocas coincidencias, las palabras que no aparecen en el
+catalogo se corrigen por trigramas a las mas parecidas, para tolerar errores
+de tipeo ("cataan" -> "catan").
+
+El indice se carga completo de la BD en el primer uso. Las escrituras de
+JuegoMesa lo actualizan al confirmarse y los cambios de otras terminales se
+detectan con catalogo_version, igual que la cache del catalogo.
+"""
+
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+from cache_catalogo import CACHE_INTERVALO_VERSION, leer_version_catalogo
+from db_connection import al_confirmar
+from paginacion import iterar_bloques
+
+
+# Similitud minima (Jaccard de trigramas) para corregir una palabra mal escrita
+UMBRAL_SIMILITUD = float(os.getenv("BUSQUEDA_UMBRAL_SIMILITUD", 0.25))
+# Palabras candidatas a revisar por similitud, tomadas de los trigramas menos frecuentes
+MAX_CANDIDATOS_PARECIDOS = int(os.getenv("BUSQUEDA_MAX_CANDIDATOS", 500))
+# Correcciones que se prueban por palabra desconocida y combinaciones en total
+CORRECCIONES_POR_PALABRA = 3
+CORRECCIONES = 4
+
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar(texto):
+    """Minusculas, sin acentos y con cualquier signo reemplazado por un espacio."""
+    texto = texto or ""
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(_PALABRA.findall(texto.casefold()))
+
+
+@lru_cache(maxsize=100_000)
+def trigramas(texto):
+    """Trigramas del texto normalizado, con un espacio de relleno al inicio y al final."""
+    texto = f" {texto} "
+    return frozenset(texto[i : i + 3] for i in range(len(texto) - 2))
+
+
+class _Documento:
+    """Un juego tal como lo guarda el indice."""
+
+    __slots__ = ("id", "titulo", "fabricante", "titulo_norm", "palabras_titulo", "palabras", "orden")
+
+    def __init__(self, juego_id, titulo, fabricante):
+        self.id = juego_id
+        self.titulo = titulo
+        self.fabricante = fabricante
+        self.titulo_norm = normalizar(titulo)
+        self.palabras_titulo = frozenset(self.titulo_norm.split())
+        self.palabras = self.palabras_titulo | frozenset(normalizar(fabricante).split())
+        # Relevancia entre coincidencias del mismo nivel: titulo mas corto primero
+        self.orden = (len(self.titulo_norm), self.titulo_norm, juego_id)
+
+
+class _IndicePalabras:
+    """
+    palabra -> documentos que la contienen, cada lista ordenada por relevancia
+    (_Documento.orden). Las palabras estan en una lista ordenada para resolver
+    prefijos con busqueda binaria y, con trigramas=True, indexadas por trigrama
+    para encontrar las parecidas.
+    """
+
+    def __init__(self, con_trigramas=False):
+        self._con_trigramas = con_trigramas
+        self._por_palabra = {}
+        self._palabras = []
+        self._por_trigrama = {}  # trigrama -> {palabras}
+
+    def construir(self, docs, atributo):
+        por_palabra = {}
+        for doc in docs:
+            for palabra in getattr(doc, atributo):
+                por_palabra.setdefault(palabra, []).append(doc.orden)
+        for ordenes in por_palabra.values():
+            ordenes.sort()
+        self._por_palabra = por_palabra
+        self._palabras = sorted(por_palabra)
+        self._por_trigrama = {}
+        if self._con_trigramas:
+            for palabra in self._palabras:
+                self._indexar_trigramas(palabra)
+
+    def _indexar_trigramas(self, palabra):
+        # Los numeros (ediciones, años) no se corrigen
+        if palabra.isdigit():
+            return
+        for tri in trigramas(palabra):
+            self._por_trigrama.setdefault(tri, set()).add(palabra)
+
+    def agregar(self, palabras, orden):
+        for palabra in palabras:
+            ordenes = self._por_palabra.get(palabra)
+            if ordenes is None:
+                self._por_palabra[palabra] = [orden]
+                insort(self._palabras, palabra)
+                if self._con_trigramas:
+                    self._indexar_trigramas(palabra)
+            else:
+                insort(ordenes, orden)
+
+    def quitar(self, palabras, orden):
+        for palabra in palabras:
+            ordenes = self._por_palabra.get(palabra)
+            if ordenes is None:
+                continue
+            i = bisect_left(ordenes, orden)
+            if i < len(ordenes) and ordenes[i] == orden:
+                del ordenes[i]
+            if not ordenes:
+                del self._por_palabra[palabra]
+                del self._palabras[bisect_left(self._palabras, palabra)]
+                for tri in trigramas(palabra) if self._con_trigramas else ():
+                    palabras_tri = self._por_trigrama.get(tri)
+                    if palabras_tri is not None:
+                        palabras_tri.discard(palabra)
+                        if not palabras_tri:
+                            del self._por_trigrama[tri]
+
+    def _listas(self, prefijo):
+        i = bisect_left(self._palabras, prefijo)
+        listas = []
+        while i < len(self._palabras) and self._palabras[i].startswith(prefijo):
+            listas.append(self._por_palabra[self._palabras[i]])
+            i += 1
+        return listas
+
+    def contar(self, prefijo, exacta=False):
+        """Cantidad (aproximada, con repetidos) de documentos con alguna palabra con ese prefijo."""
+        if exacta:
+            return len(self._por_palabra.get(prefijo, ()))
+        return sum(len(ordenes) for ordenes in self._listas(prefijo))
+
+    def con_prefijo(self, prefijo, exacta=False):
+        """
+        Iterador de los `orden` con alguna palabra que empieza con prefijo (o que
+        es igual, con exacta=True), mas relevantes primero.
+        """
+        if exacta:
+            return iter(self._por_palabra.get(prefijo, ()))
+        return heapq.merge(*self._listas(prefijo))
+
+    def parecidas(self, palabra, cantidad):
+        """
+        Las `cantidad` palabras del indice mas parecidas (Jaccard de trigramas).
+        Los candidatos salen de los trigramas menos frecuentes de la palabra, que
+        son los que mas la distinguen.
+        """
+        tris = trigramas(palabra)
+        conjuntos = sorted((self._por_trigrama[t] for t in tris if t in self._por_trigrama), key=len)
+        candidatos = set()
+        for palabras in conjuntos:
+            if candidatos and len(candidatos) + len(palabras) > MAX_CANDIDATOS_PARECIDOS:
+                break
+            candidatos |= palabras
+
+        similitudes = []
+        for candidata in candidatos:
+            tris_candidata = trigramas(candidata)
+            comunes = len(tris & tris_candidata)
+            similitud = comunes / (len(tris) + len(tris_candidata) - comunes)
+            if similitud >= UMBRAL_SIMILITUD:
+                # A igual similitud, la palabra que aparece en mas juegos
+                similitudes.append((-similitud, -len(self._por_palabra[candidata]), candidata))
+        return [candidata for *_, candidata in heapq.nsmallest(cantidad, similitudes)]
+
+
+class IndiceBusqueda:
+    """
+    Indice de juegos_mesa con dos vistas: los titulos normalizados ordenados
+    (para "empieza con") y las palabras del titulo y de titulo + fabricante
+    (para prefijos por palabra; las de titulo + fabricante tambien por
+    trigramas, para corregir errores de tipeo).
+    Las busquedas recorren todo en orden de relevancia y se detienen al juntar
+    `limite` resultados, asi no dependen del tamaño del catalogo.
+    """
+
+    def __init__(self, intervalo_version=CACHE_INTERVALO_VERSION):
+        self.intervalo_version = intervalo_version
+
+        self._docs = {}  # id -> _Documento
+        self._titulos = []  # [(titulo normalizado, id)] ordenados
+        self._en_titulo = _IndicePalabras()
+        self._en_todo = _IndicePalabras(con_trigramas=True)
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._version = None
+        self._proxima_verificacion = 0.0
+
+    # --- Carga ---
+
+    def cargar(self):
+        """Relee el catalogo completo de la BD y reconstruye el indice."""
+        version = leer_version_catalogo()
+        docs = {}
+        for filas in iterar_bloques("SELECT id, titulo, fabricante FROM juegos_mesa", tam_lote=5000):
+            for juego_id, titulo, fabricante in filas:
+                docs[juego_id] = _Documento(juego_id, titulo, fabricante)
+
+        en_titulo, en_todo = _IndicePalabras(), _IndicePalabras(con_trigramas=True)
+        en_titulo.construir(docs.values(), "palabras_titulo")
+        en_todo.construir(docs.values(), "palabras")
+        titulos = sorted((doc.titulo_norm, doc.id) for doc in docs.values())
+
+        with self._lock:
+            self._docs = docs
+            self._titulos = titulos
+            self._en_titulo = en_titulo
+            self._en_todo = en_todo
+            self._version = version
+            self._cargado = True
+            self._proxima_verificacion = time.monotonic() + self.intervalo_version
+
+    def _asegurar_actualizado(self):
+        """Carga el indice la primera vez y lo recarga si otra terminal cambio el catalogo."""
+        if not self._cargado:
+            self.cargar()
+            return
+        ahora = time.monotonic()
+        if ahora < self._proxima_verificacion:
+            return
+        self._proxima_verificacion = ahora + self.intervalo_version
+        version = leer_version_catalogo()
+        if version is None or version != self._version:
+            self.cargar()
+
+    def cargado(self):
+        return self._cargado
+
+    # --- Cambios (se aplican al confirmar la transaccion en curso) ---
+
+    def guardar(self, juego_id, titulo, fabricante):
+        """Agrega o reemplaza un juego. Cada llamada corresponde a un marcar_cambio_catalogo()."""
+        al_confirmar(lambda: self._guardar(juego_id, titulo, fabricante))
+
+    def quitar(self, juego_id):
+        al_confirmar(lambda: self._quitar(juego_id))
+
+    def invalidar(self):
+        """Fuerza una recarga completa en la proxima busqueda (cargas masivas)."""
+        al_confirmar(self._invalidar)
+
+    def _invalidar(self):
+        with self._lock:
+            self._cargado = False
+
+    def _guardar(self, juego_id, titulo, fabricante):
+        with self._lock:
+            if not self._cargado:
+                return
+            self._sacar(juego_id)
+            doc = self._docs[juego_id] = _Documento(juego_id, titulo, fabricante)
+            insort(self._titulos, (doc.titulo_norm, juego_id))
+            self._en_titulo.agregar(doc.palabras_titulo, doc.orden)
+            self._en_todo.agregar(doc.palabras, doc.orden)
+            self._contar_cambio_propio()
+
+    def _quitar(self, juego_id):
+        with self._lock:
+            if not self._cargado:
+                return
+            self._sacar(juego_id)
+            self._contar_cambio_propio()
+
+    def _contar_cambio_propio(self):
+        # La escritura local ya subio catalogo_version en uno: se sigue de cerca
+        # para no recargar todo por un cambio que el indice ya tiene
+        if self._version is not None:
+            self._version += 1
+
+    def _sacar(self, juego_id):
+        doc = self._docs.pop(juego_id, None)
+        if doc is None:
+            return
+        i = bisect_left(self._titulos, (doc.titulo_norm, juego_id))
+        if i < len(self._titulos) and self._titulos[i] == (doc.titulo_norm, juego_id):
+            del self._titulos[i]
+        self._en_titulo.quitar(doc.palabras_titulo, doc.orden)
+        self._en_todo.quitar(doc.palabras, doc.orden)
+
+    # --- Consultas ---
+
+    def buscar(self, texto, limite=10):
+        """
+        [{id, titulo, fabricante}, ...] ordenados por relevancia: titulos que
+        empiezan con el texto (el igual primero), titulos con todas las palabras,
+        coincidencias que incluyen al fabricante y por ultimo las que salen de
+        corregir palabras mal escritas.
+        """
+        consulta = normalizar(texto)
+        palabras = consulta.split()
+        if not palabras or limite <= 0:
+            return []
+        self._asegurar_actualizado()
+
+        with self._lock:
+            encontrados = []
+            vistos = set()
+
+            def agregar(juego_id):
+                if juego_id not in vistos:
+                    vistos.add(juego_id)
+                    encontrados.append(juego_id)
+                return len(encontrados) >= limite
+
+            i = bisect_left(self._titulos, (consulta,))
+            while i < len(self._titulos) and self._titulos[i][0].startswith(consulta):
+                if agregar(self._titulos[i][1]):
+                    return self._resultado(encontrados)
+                i += 1
+
+            if self._por_palabras(palabras, agregar):
+                return self._resultado(encontrados)
+
+            # Palabras que no son prefijo de ninguna del catalogo: se prueban las parecidas
+            opciones = [
+                self._en_todo.parecidas(p, CORRECCIONES_POR_PALABRA)
+                if len(p) >= 3 and not self._en_todo.contar(p) else [p]
+                for p in palabras
+            ]
+            if any(o != [p] for o, p in zip(opciones, palabras)):
+                # Las combinaciones salen de la mas parecida a la menos; se prueban pocas
+                for corregidas in itertools.islice(itertools.product(*opciones), CORRECCIONES):
+                    # Una correccion ya es una palabra completa del catalogo
+                    exactas = set(corregidas) - set(palabras)
+                    if self._por_palabras(list(corregidas), agregar, exactas):
+                        break
+            return self._resultado(encontrados)
+
+    def _por_palabras(self, palabras, agregar, exactas=()):
+        """
+        Agrega los juegos con todas las palabras como prefijo (las de `exactas`,
+        completas), primero en el titulo y despues contando el fabricante.
+        Retorna True si se llego al limite.
+        """
+        for indice, atributo in ((self._en_titulo, "palabras_titulo"), (self._en_todo, "palabras")):
+            # Se recorren los documentos de la palabra mas selectiva y las demas
+            # se verifican contra las palabras de cada candidato
+            selectiva = min(palabras, key=lambda p: indice.contar(p, p in exactas))
+            resto = list(palabras)
+            resto.remove(selectiva)
+            for _, _, juego_id in indice.con_prefijo(selectiva, selectiva in exactas):
+                doc_palabras = getattr(self._docs[juego_id], atributo)
+                if all(
+                    p in doc_palabras if p in exactas else any(d.startswith(p) for d in doc_palabras)
+                    for p in resto
+                ):
+                    if agregar(juego_id):
+                        return True
+        return False
+
+    def _resultado(self, ids):
+        return [
+            {"id": juego_id, "titulo": self._docs[juego_id].titulo, "fabricante": self._docs[juego_id].fabricante}
+            for juego_id in ids
+        ]
+
+    def ids_con_titulo(self, titulo):
+        """Ids de los juegos cuyo titulo es igual sin contar mayusculas, acentos ni signos."""
+        consulta = normalizar(titulo)
+        if not consulta:
+            return []
+        self._asegurar_actualizado()
+        with self._lock:
+            ids = []
+            i = bisect_left(self._titulos, (consulta,))
+            while i < len(self._titulos) and self._titulos[i][0] == consulta:
+                ids.append(self._titulos[i][1])
+                i += 1
+            return ids
+
+    def __len__(self):
+        self._asegurar_actualizado()
+        return len(self._docs)
+
+
+indice_juegos = IndiceBusqueda()
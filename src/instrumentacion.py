@@ -0,0 +1,211 @@
+"""
+Medicion de las consultas que pasan por el pool (db_connection).
+
+Con DB_INSTRUMENTAR=1 (o activar()) cada cursor prestado se envuelve para
+registrar por sentencia: cantidad, tiempo (histograma), filas y los metodos
+de los modelos que la ejecutan. Las consultas que superan DB_LENTAS_MS se
+escriben en el log "consultas_lentas" con los parametros ocultos.
+Desactivada, el unico costo es revisar `activa` al pedir un cursor.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+
+activa = os.getenv("DB_INSTRUMENTAR", "0").lower() in ("1", "true", "si")
+UMBRAL_LENTAS_MS = float(os.getenv("DB_LENTAS_MS", 200))
+
+log_lentas = logging.getLogger("consultas_lentas")
+if os.getenv("DB_LOG_LENTAS"):
+    _manejador = logging.FileHandler(os.getenv("DB_LOG_LENTAS"), encoding="utf-8")
+    _manejador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    log_lentas.addHandler(_manejador)
+    log_lentas.setLevel(logging.INFO)
+
+# Limites superiores (ms) de los baldes del histograma; el ultimo junta el resto
+BALDES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+# Modulos de infraestructura que no cuentan como "quien llamo"
+_MODULOS_INTERNOS = {"instrumentacion", "db_connection", "paginacion", "backend_sqlite", "sentencias", "contextlib"}
+
+_lock = threading.Lock()
+_stats = {}
+
+
+class _EstadisticaSentencia:
+    def __init__(self):
+        self.llamadas = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.filas = 0
+        self.lentas = 0
+        self.baldes = [0] * len(BALDES_MS)
+        self.llamadores = Counter()
+
+    def percentil(self, p):
+        """Limite superior del balde donde cae el percentil p (estimacion)."""
+        objetivo = self.llamadas * p / 100
+        acumulado = 0
+        for limite, cantidad in zip(BALDES_MS, self.baldes):
+            acumulado += cantidad
+            if cantidad and acumulado >= objetivo:
+                return min(limite, self.max_ms)
+        return self.max_ms
+
+
+def activar(umbral_lentas_ms=None):
+    global activa, UMBRAL_LENTAS_MS
+    if umbral_lentas_ms is not None:
+        UMBRAL_LENTAS_MS = umbral_lentas_ms
+    activa = True
+
+
+def desactivar():
+    global activa
+    activa = False
+
+
+def reiniciar():
+    with _lock:
+        _stats.clear()
+
+
+@lru_cache(maxsize=1024)
+def normalizar(sql):
+    """Forma de la sentencia: espacios colapsados y listas IN (%s, %s, ...) como IN (...)."""
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return re.sub(r"\(\s*%s(?:\s*,\s*%s)+\s*\)", "(...)", sql)
+
+
+def ocultar_parametros(params):
+    """Reemplaza cada parametro por su tipo (y largo en textos), sin exponer valores."""
+    if params is None:
+        return "()"
+    return "(" + ", ".join(
+        f"<{type(p).__name__}:{len(p)}>" if isinstance(p, (str, bytes)) else f"<{type(p).__name__}>"
+        for p in params
+    ) + ")"
+
+
+def _llamador():
+    """Primer metodo fuera de la capa de BD en la pila, como 'Venta.crear'."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        modulo = frame.f_globals.get("__name__", "")
+        if modulo not in _MODULOS_INTERNOS:
+            return f"{modulo}.{getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)}"
+        frame = frame.f_back
+    return "?"
+
+
+def registrar(sql, params, ms, filas):
+    clave = normalizar(sql)
+    llamador = _llamador()
+    indice = next(i for i, limite in enumerate(BALDES_MS) if ms <= limite)
+    lenta = ms >= UMBRAL_LENTAS_MS
+    with _lock:
+        st = _stats.get(clave)
+        if st is None:
+            st = _stats[clave] = _EstadisticaSentencia()
+        st.llamadas += 1
+        st.total_ms += ms
+        st.max_ms = max(st.max_ms, ms)
+        st.filas += max(filas, 0)
+        st.baldes[indice] += 1
+        st.llamadores[llamador] += 1
+        st.lentas += lenta
+    if lenta:
+        log_lentas.warning(
+            "%.1f ms | %s | %s | params=%s", ms, llamador, clave, ocultar_parametros(params)
+        )
+    return clave
+
+
+def sumar_filas(clave, filas):
+    """Suma filas leidas con fetch* a la sentencia que las produjo."""
+    with _lock:
+        st = _stats.get(clave)
+        if st is not None:
+            st.filas += filas
+
+
+class CursorInstrumentado:
+    """Envuelve un cursor y mide execute/executemany; el resto se delega."""
+
+    def __init__(self, cur):
+        self._cur = cur
+        self._clave = None
+
+    def execute(self, sql, params=None):
+        inicio = time.perf_counter()
+        try:
+            return self._cur.execute(sql, params) if params is not None else self._cur.execute(sql)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            self._clave = registrar(sql, params, ms, self._cur.rowcount)
+
+    def executemany(self, sql, seq_params):
+        seq_params = list(seq_params)
+        inicio = time.perf_counter()
+        try:
+            return self._cur.executemany(sql, seq_params)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            self._clave = registrar(sql, seq_params[0] if seq_params else None, ms, self._cur.rowcount)
+
+    def fetchone(self):
+        fila = self._cur.fetchone()
+        if fila is not None:
+            sumar_filas(self._clave, 1)
+        return fila
+
+    def fetchall(self):
+        filas = self._cur.fetchall()
+        sumar_filas(self._clave, len(filas))
+        return filas
+
+    def fetchmany(self, size=1):
+        filas = self._cur.fetchmany(size)
+        sumar_filas(self._clave, len(filas))
+        return filas
+
+    def __getattr__(self, nombre):
+        return getattr(self._cur, nombre)
+
+
+def estadisticas(orden="total_ms", limite=None):
+    """
+    [{sql, llamadas, total_ms, media_ms, max_ms, p50_ms, p95_ms, p99_ms, filas,
+    lentas, histograma, llamadores}, ...] ordenado de mayor a menor por `orden`.
+    """
+    with _lock:
+        filas = []
+        for sql, st in _stats.items():
+            filas.append(
+                {
+                    "sql": sql,
+                    "llamadas": st.llamadas,
+                    "total_ms": round(st.total_ms, 3),
+                    "media_ms": round(st.total_ms / st.llamadas, 3),
+                    "max_ms": round(st.max_ms, 3),
+                    "p50_ms": round(st.percentil(50), 3),
+                    "p95_ms": round(st.percentil(95), 3),
+                    "p99_ms": round(st.percentil(99), 3),
+                    "filas": st.filas,
+                    "lentas": st.lentas,
+                    "histograma": {
+                        str(limite): cantidad
+                        for limite, cantidad in zip(BALDES_MS, st.baldes)
+                        if cantidad
+                    },
+                    "llamadores": dict(st.llamadores.most_common()),
+                }
+            )
+    filas.sort(key=lambda f: f[orden], reverse=True)
+    return filas[:limite] if limite else filas
@@ -1,4 +1,11 @@
+import time
+
 from db_connection import get_conn
+from cache_catalogo import cache_juegos, marcar_cambio_catalogo
+from indice_busqueda import indice_juegos
+from paginacion import decodificar_cursor, iterar_bloques, paginar
+from prefetch import dividir_en_bloques
+from sentencias import cursor_preparado
 
 
 class JuegoMesa:
@@ -6,6 +13,11 @@ class JuegoMesa:
     Representa un juego de mesa en el catálogo de la tienda.
     """
 
+    # Orden de las columnas en las filas de bloques_todos()
+    CAMPOS = ("id", "titulo", "fabricante", "stock", "precio_venta", "precio_ludoteca_hora")
+    # Sin __dict__ por instancia: los listados grandes ocupan bastante menos memoria
+    __slots__ = CAMPOS
+
     def __init__(
         self, id_, titulo, fabricante, stock, precio_venta, precio_ludoteca_hora
     ):
@@ -23,18 +35,16 @@ class JuegoMesa:
     def reducir_stock(self, cantidad):
         """
         Reduce el stock del juego.
+        El descuento es atomico en la BD: solo se aplica si hay inventario suficiente.
         """
-        if self.stock < cantidad:
-            raise Exception("Inventario insuficiente para la venta.")
-
         conn = get_conn()
         try:
             cur = conn.cursor()
-            nuevo_stock = self.stock - cantidad
-            query = "UPDATE juegos_mesa SET stock = %s WHERE id = %s"
-            cur.execute(query, (nuevo_stock, self.id))
+            if not JuegoMesa._descontar_stock(cur, self.id, cantidad):
+                raise Exception("Inventario insuficiente para la venta.")
             conn.commit()
-            self.stock = nuevo_stock
+            cache_juegos.invalidar(self.id)
+            self.stock -= cantidad
             return True
         except Exception as e:
             conn.rollback()
@@ -50,11 +60,10 @@ class JuegoMesa:
         conn = get_conn()
         try:
             cur = conn.cursor()
-            nuevo_stock = self.stock + cantidad
-            query = "UPDATE juegos_mesa SET stock = %s WHERE id = %s"
-            cur.execute(query, (nuevo_stock, self.id))
+            JuegoMesa._sumar_stock(cur, self.id, cantidad)
             conn.commit()
-            self.stock = nuevo_stock
+            cache_juegos.invalidar(self.id)
+            self.stock += cantidad
             return True
         except Exception as e:
             conn.rollback()
@@ -63,6 +72,26 @@ class JuegoMesa:
             cur.close()
             conn.close()
 
+    @staticmethod
+    def _descontar_stock(cur, juego_id, cantidad):
+        """
+        Descuenta stock con un UPDATE condicional sobre el cursor recibido.
+        Retorna False si no habia inventario suficiente (o el juego no existe),
+        sin leer el stock antes: la BD decide con el conteo de filas afectadas.
+        """
+        query = "UPDATE juegos_mesa SET stock = stock - %s WHERE id = %s AND stock >= %s"
+        cur.execute(query, (cantidad, juego_id, cantidad))
+        return cur.rowcount == 1
+
+    @staticmethod
+    def _sumar_stock(cur, juego_id, cantidad):
+        """
+        Suma stock de forma relativa sobre el cursor recibido (sin pisar ventas concurrentes).
+        """
+        query = "UPDATE juegos_mesa SET stock = stock + %s WHERE id = %s"
+        cur.execute(query, (cantidad, juego_id))
+        return cur.rowcount == 1
+
     def modificar_datos(
         self,
         nuevo_titulo,
@@ -91,7 +120,10 @@ class JuegoMesa:
                     self.id,
                 ),
             )
+            marcar_cambio_catalogo(cur)
             conn.commit()
+            cache_juegos.invalidar(self.id)
+            indice_juegos.guardar(self.id, nuevo_titulo, nuevo_fabricante)
 
             self.titulo = nuevo_titulo
             self.fabricante = nuevo_fabricante
@@ -121,8 +153,11 @@ class JuegoMesa:
             cur.execute(
                 query, (titulo, fabricante, stock, precio_venta, precio_ludoteca_hora)
             )
-            conn.commit()
             juego_id = cur.lastrowid
+            marcar_cambio_catalogo(cur)
+            conn.commit()
+            cache_juegos.invalidar(juego_id)
+            indice_juegos.guardar(juego_id, titulo, fabricante)
             return cls(
                 juego_id, titulo, fabricante, stock, precio_venta, precio_ludoteca_hora
             )
@@ -130,6 +165,98 @@ class JuegoMesa:
             cur.close()
             conn.close()
 
+    @staticmethod
+    def _validar_fila(fila):
+        """
+        Valida una fila de importacion y la convierte a la tupla del INSERT.
+        Lanza ValueError con el motivo si la fila no es valida.
+        """
+        titulo = (fila.get("titulo") or "").strip()
+        if not titulo:
+            raise ValueError("titulo vacio")
+        if len(titulo) > 255:
+            raise ValueError("titulo demasiado largo")
+        fabricante = (fila.get("fabricante") or "").strip() or None
+        try:
+            stock = int(fila.get("stock") or 0)
+            precio_venta = float(fila["precio_venta"])
+            precio_ludoteca_hora = float(fila["precio_ludoteca_hora"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("stock o precios con formato invalido")
+        if stock < 0 or precio_venta < 0 or precio_ludoteca_hora < 0:
+            raise ValueError("stock y precios no pueden ser negativos")
+        return (titulo, fabricante, stock, precio_venta, precio_ludoteca_hora)
+
+    @classmethod
+    def importar_lote(cls, filas, tam_lote=500):
+        """
+        Importa (inserta o actualiza por titulo) un iterable de filas tipo dict.
+        Consume el iterable en streaming y escribe por bloques con executemany,
+        con un commit por bloque. Retorna un reporte con los conteos; un titulo
+        repetido dentro de un bloque se queda con la ultima fila y la anterior
+        cuenta como actualizada, asi los conteos suman las filas recibidas.
+        """
+        reporte = {"insertados": 0, "actualizados": 0, "rechazados": 0, "errores": []}
+        inicio = time.perf_counter()
+
+        query = """
+        INSERT INTO juegos_mesa (titulo, fabricante, stock, precio_venta, precio_ludoteca_hora) 
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE fabricante = VALUES(fabricante), stock = VALUES(stock),
+            precio_venta = VALUES(precio_venta), precio_ludoteca_hora = VALUES(precio_ludoteca_hora)
+        """
+
+        def escribir(cur, bloque):
+            titulos = [datos[0] for datos in bloque.values()]
+            marcadores = ", ".join(["%s"] * len(titulos))
+            cur.execute(
+                f"SELECT titulo FROM juegos_mesa WHERE titulo IN ({marcadores})",
+                tuple(titulos),
+            )
+            existentes = len(cur.fetchall())
+            cur.executemany(query, list(bloque.values()))
+            marcar_cambio_catalogo(cur)
+            conn.commit()
+            cache_juegos.limpiar()
+            indice_juegos.invalidar()
+            reporte["actualizados"] += existentes
+            reporte["insertados"] += len(bloque) - existentes
+
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            bloque = {}
+            for numero, fila in enumerate(filas, start=1):
+                try:
+                    datos = cls._validar_fila(fila)
+                except ValueError as e:
+                    reporte["rechazados"] += 1
+                    if len(reporte["errores"]) < 50:
+                        reporte["errores"].append((numero, str(e)))
+                    continue
+                # La BD compara titulos sin distinguir mayusculas: la clave tambien
+                clave = datos[0].casefold()
+                if clave in bloque:
+                    reporte["actualizados"] += 1
+                bloque[clave] = datos
+                if len(bloque) >= tam_lote:
+                    escribir(cur, bloque)
+                    bloque = {}
+            if bloque:
+                escribir(cur, bloque)
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error en la importación del catálogo: {e}")
+        finally:
+            cur.close()
+            conn.close()
+
+        segundos = time.perf_counter() - inicio
+        procesadas = reporte["insertados"] + reporte["actualizados"]
+        reporte["segundos"] = round(segundos, 3)
+        reporte["filas_por_segundo"] = round(procesadas / segundos, 1) if segundos else 0.0
+        return reporte
+
     @classmethod
     def listar_todos(cls):
         """
@@ -152,19 +279,67 @@ class JuegoMesa:
             cur.close()
             conn.close()
 
+    @classmethod
+    def listar_pagina(cls, limite=50, cursor=None):
+        """
+        Retorna (juegos, siguiente_cursor) ordenados por titulo, paginando por
+        clave (titulo, id) en lugar de OFFSET. siguiente_cursor es None al final.
+        """
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            query = "SELECT id, titulo, fabricante, stock, precio_venta, precio_ludoteca_hora FROM juegos_mesa"
+            params = []
+            if cursor:
+                titulo, juego_id = decodificar_cursor(cursor)
+                query += " WHERE titulo > %s OR (titulo = %s AND id > %s)"
+                params += [titulo, titulo, juego_id]
+            query += " ORDER BY titulo, id LIMIT %s"
+            params.append(limite + 1)
+            cur.execute(query, tuple(params))
+            filas, siguiente = paginar(cur.fetchall(), limite, lambda r: (r[1], r[0]))
+            juegos = [cls(r[0], r[1], r[2], r[3], float(r[4]), float(r[5])) for r in filas]
+            return juegos, siguiente
+        finally:
+            cur.close()
+            conn.close()
+
+    @classmethod
+    def iterar_todos(cls, tam_lote=500):
+        """Generador de todos los juegos ordenados por titulo, leidos por bloques."""
+        for filas in cls.bloques_todos(tam_lote):
+            for r in filas:
+                yield cls(r[0], r[1], r[2], r[3], float(r[4]), float(r[5]))
+
+    @classmethod
+    def bloques_todos(cls, tam_lote=500):
+        """
+        Igual que iterar_todos() pero sin crear objetos: entrega listas de tuplas
+        en el orden de CAMPOS, tal como llegan de la BD (precios como Decimal en MySQL).
+        """
+        query = "SELECT id, titulo, fabricante, stock, precio_venta, precio_ludoteca_hora FROM juegos_mesa ORDER BY titulo, id"
+        return iterar_bloques(query, tam_lote=tam_lote)
+
     @classmethod
     def buscar_por_titulo(cls, titulo):
         """
         Busca un juego por titulo .
         """
+        fila = cache_juegos.obtener_por_titulo(titulo)
+        if fila:
+            return cls(*fila)
+
+        generacion = cache_juegos.generacion()
         conn = get_conn()
         try:
-            cur = conn.cursor()
+            cur = cursor_preparado(conn)
             query = "SELECT id, titulo, fabricante, stock, precio_venta, precio_ludoteca_hora FROM juegos_mesa WHERE titulo = %s"
             cur.execute(query, (titulo,))
             r = cur.fetchone()
             if r:
-                return cls(r[0], r[1], r[2], r[3], float(r[4]), float(r[5]))
+                fila = (r[0], r[1], r[2], r[3], float(r[4]), float(r[5]))
+                cache_juegos.guardar(fila, generacion)
+                return cls(*fila)
             return None
         finally:
             cur.close()
@@ -175,19 +350,65 @@ class JuegoMesa:
         """
         Busca un juego por su ID.
         """
+        fila = cache_juegos.obtener_por_id(juego_id)
+        if fila:
+            return cls(*fila)
+
+        generacion = cache_juegos.generacion()
         conn = get_conn()
         try:
-            cur = conn.cursor()
+            cur = cursor_preparado(conn)
             query = "SELECT id, titulo, fabricante, stock, precio_venta, precio_ludoteca_hora FROM juegos_mesa WHERE id = %s"
             cur.execute(query, (juego_id,))
             r = cur.fetchone()
             if r:
-                return cls(r[0], r[1], r[2], r[3], float(r[4]), float(r[5]))
+                fila = (r[0], r[1], r[2], r[3], float(r[4]), float(r[5]))
+                cache_juegos.guardar(fila, generacion)
+                return cls(*fila)
             return None
         finally:
             cur.close()
             conn.close()
 
+    @classmethod
+    def buscar_por_ids(cls, ids):
+        """
+        Retorna {id: JuegoMesa} para los ids indicados. Los que no estan en la
+        cache se cargan con consultas IN de hasta 1000 ids.
+        """
+        juegos = {}
+        faltantes = []
+        for juego_id in ids:
+            fila = cache_juegos.obtener_por_id(juego_id)
+            if fila:
+                juegos[juego_id] = cls(*fila)
+            else:
+                faltantes.append(juego_id)
+        if not faltantes:
+            return juegos
+
+        generacion = cache_juegos.generacion()
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            for bloque in dividir_en_bloques(faltantes):
+                marcadores = ", ".join(["%s"] * len(bloque))
+                query = f"SELECT id, titulo, fabricante, stock, precio_venta, precio_ludoteca_hora FROM juegos_mesa WHERE id IN ({marcadores})"
+                cur.execute(query, tuple(bloque))
+                for r in cur.fetchall():
+                    fila = (r[0], r[1], r[2], r[3], float(r[4]), float(r[5]))
+                    cache_juegos.guardar(fila, generacion)
+                    juegos[r[0]] = cls(*fila)
+            return juegos
+        finally:
+            cur.close()
+            conn.close()
+
+    @classmethod
+    def estadisticas_cache(cls):
+        """Aciertos, fallos y tamaño de la cache del catálogo."""
+        return cache_juegos.estadisticas()
+
     @classmethod
     def eliminar(cls, juego_id):
         """
@@ -198,7 +419,10 @@ class JuegoMesa:
             cur = conn.cursor()
             query = "DELETE FROM juegos_mesa WHERE id = %s"
             cur.execute(query, (juego_id,))
+            marcar_cambio_catalogo(cur)
             conn.commit()
+            cache_juegos.invalidar(juego_id)
+            indice_juegos.quitar(juego_id)
             return True
         finally:
             cur.close()
@@ -1,10 +1,16 @@
 from db_connection import get_conn
+from ludoteca_sesion import LudotecaSesion
+from usuario import Usuario
 
 class LudotecaParticipante:
     """
     Representa un registro de que un Usuario participó en una Sesión de Ludoteca.
     """
 
+    # Relaciones que se pueden precargar con prefetch_related()
+    RELACIONES = {"sesion": ("sesion_id", LudotecaSesion), "usuario": ("usuario_id", Usuario)}
+    __slots__ = ("id", "sesion_id", "usuario_id") + tuple(RELACIONES)
+
     def __init__(self, id_, sesion_id, usuario_id):
         self.id = id_
         self.sesion_id = sesion_id
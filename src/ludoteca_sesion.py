@@ -1,6 +1,10 @@
+from archivo import origen
 from db_connection import get_conn
-from datetime import datetime, timedelta
 from juego_mesa import JuegoMesa
+from usuario import Usuario
+from paginacion import decodificar_cursor, iterar_bloques, paginar
+from prefetch import dividir_en_bloques, prefetch_related
+from resumenes import aplicar_sesiones
 
 
 class LudotecaSesion:
@@ -9,6 +13,12 @@ class LudotecaSesion:
     Su lógica principal es calcular el costo al finalizar.
     """
 
+    # Relaciones que se pueden precargar con prefetch_related()
+    RELACIONES = {"juego": ("juego_id", JuegoMesa), "vendedor": ("vendedor_id", Usuario)}
+    # Orden de las columnas en las filas de bloques_todas()
+    CAMPOS = ("id", "juego_id", "vendedor_id", "hora_inicio", "hora_fin", "duracion_horas", "precio_total")
+    __slots__ = CAMPOS + ("titulo_juego", "vendedor_nombre", "participantes") + tuple(RELACIONES)
+
     def __init__(
         self,
         id_,
@@ -26,6 +36,10 @@ class LudotecaSesion:
         self.hora_fin = hora_fin
         self.duracion_horas = duracion_horas
         self.precio_total = precio_total
+        # Solo se llenan en listar_con_participantes()
+        self.titulo_juego = None
+        self.vendedor_nombre = None
+        self.participantes = None
 
     def descripcion(self):
         """
@@ -64,6 +78,24 @@ class LudotecaSesion:
             cur.close()
             conn.close()
 
+    @classmethod
+    def buscar_por_ids(cls, ids):
+        """Retorna {id: LudotecaSesion} para los ids indicados, con consultas IN de hasta 1000 ids."""
+        sesiones = {}
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            for bloque in dividir_en_bloques(ids):
+                marcadores = ", ".join(["%s"] * len(bloque))
+                query = f"SELECT id, juego_id, vendedor_id, hora_inicio, hora_fin, duracion_horas, precio_total FROM ludoteca_sesiones WHERE id IN ({marcadores})"
+                cur.execute(query, tuple(bloque))
+                for r in cur.fetchall():
+                    sesiones[r[0]] = cls(r[0], r[1], r[2], r[3], r[4], r[5], r[6])
+            return sesiones
+        finally:
+            cur.close()
+            conn.close()
+
     @classmethod
     def buscar_por_id(cls, sesion_id):
         """
@@ -90,37 +122,83 @@ class LudotecaSesion:
         if self.hora_fin:
             raise Exception("La sesión ya ha sido finalizada.")
 
-        conn = get_conn()
+        cerradas = LudotecaSesion.finalizar_varias([self.id])
+        if not cerradas:
+            raise Exception("La sesión ya ha sido finalizada.")
 
-        # Obtengo el precio por hora del juego
-        juego = JuegoMesa.buscar_por_id(self.juego_id)
-        if juego is None:
-            raise Exception("Juego de la sesión no encontrado en el catálogo.")
+        cerrada = cerradas[0]
+        self.hora_fin = cerrada.hora_fin
+        self.duracion_horas = cerrada.duracion_horas
+        self.precio_total = cerrada.precio_total
+        self.titulo_juego = cerrada.titulo_juego
+        return True
 
-        precio_por_hora = juego.precio_ludoteca_hora
+    @classmethod
+    def finalizar_varias(cls, ids=None):
+        """
+        Finaliza las sesiones activas indicadas (o todas las activas si ids es
+        None) con un solo UPDATE que toma el precio por hora de juegos_mesa y la
+        hora del reloj de la BD, el mismo que marco hora_inicio.
+        Retorna las sesiones cerradas, con titulo_juego, para emitir las cuentas.
+        Las que no existen o ya estaban finalizadas se omiten.
+        """
+        if ids is not None:
+            ids = list(dict.fromkeys(ids))
+            if not ids:
+                return []
 
+        conn = get_conn()
         try:
-            # Obtener  la hora actual (simulando NOW())
-            hora_fin_bd = datetime.now()
-            duracion: timedelta = hora_fin_bd - self.hora_inicio
+            cur = conn.cursor()
 
-            # Convertir a horas y redondear
-            duracion_horas = round(duracion.total_seconds() / 3600, 2)
-            precio_total = round(duracion_horas * precio_por_hora, 2)
+            # 1. Bloquear las sesiones que siguen activas: otra terminal no puede cerrarlas a la vez
+            query = "SELECT id FROM ludoteca_sesiones WHERE hora_fin IS NULL"
+            params = ()
+            if ids is not None:
+                query += f" AND id IN ({', '.join(['%s'] * len(ids))})"
+                params = tuple(ids)
+            cur.execute(query + " ORDER BY id FOR UPDATE", params)
+            activas = tuple(r[0] for r in cur.fetchall())
+            if not activas:
+                conn.rollback()
+                return []
+            marcadores = ", ".join(["%s"] * len(activas))
 
-            cur = conn.cursor()
-            query = """
-            UPDATE ludoteca_sesiones 
-            SET hora_fin = %s, duracion_horas = %s, precio_total = %s 
-            WHERE id = %s
-            """
-            cur.execute(query, (hora_fin_bd, duracion_horas, precio_total, self.id))
-            conn.commit()
+            # 2. Cerrar todas en una sentencia; NOW() es el mismo para toda la sentencia.
+            # El precio sale de una subconsulta correlacionada (valida en MySQL y SQLite).
+            cur.execute(
+                f"""
+                UPDATE ludoteca_sesiones
+                SET hora_fin = NOW(),
+                    duracion_horas = ROUND(TIMESTAMPDIFF(SECOND, hora_inicio, NOW()) / 3600.0, 2),
+                    precio_total = ROUND(
+                        ROUND(TIMESTAMPDIFF(SECOND, hora_inicio, NOW()) / 3600.0, 2)
+                        * (SELECT j.precio_ludoteca_hora FROM juegos_mesa j WHERE j.id = ludoteca_sesiones.juego_id),
+                        2
+                    )
+                WHERE id IN ({marcadores})
+                """,
+                activas,
+            )
+            aplicar_sesiones(cur, activas)
 
-            self.hora_fin = hora_fin_bd
-            self.duracion_horas = duracion_horas
-            self.precio_total = precio_total
-            return True
+            # 3. Leer las cuentas ya calculadas por la BD
+            cur.execute(
+                f"""
+                SELECT s.id, s.juego_id, s.vendedor_id, s.hora_inicio, s.hora_fin,
+                       s.duracion_horas, s.precio_total, j.titulo
+                FROM ludoteca_sesiones s JOIN juegos_mesa j ON j.id = s.juego_id
+                WHERE s.id IN ({marcadores}) ORDER BY s.id
+                """,
+                activas,
+            )
+            cerradas = []
+            for r in cur.fetchall():
+                sesion = cls(r[0], r[1], r[2], r[3], r[4], float(r[5]), float(r[6]))
+                sesion.titulo_juego = r[7]
+                cerradas.append(sesion)
+            conn.commit()
+            return cerradas
 
         except Exception as e:
             conn.rollback()
@@ -138,6 +216,8 @@ class LudotecaSesion:
         conn = get_conn()
         try:
             cur = conn.cursor()
+            # Si estaba finalizada, se descuenta del resumen antes de borrarla
+            aplicar_sesiones(cur, [sesion_id], signo=-1)
             query = "DELETE FROM ludoteca_sesiones WHERE id = %s"
             cur.execute(query, (sesion_id,))
             conn.commit()
@@ -150,15 +230,115 @@ class LudotecaSesion:
             conn.close()
 
     @classmethod
-    def listar_todas(cls):
-        """Devuelve todas las sesiones ordenadas por fecha reciente."""
+    def listar_todas(cls, prefetch=None, incluir_archivo=False):
+        """
+        Devuelve todas las sesiones ordenadas por fecha reciente.
+        prefetch: relaciones a precargar, por ejemplo ["juego", "vendedor"].
+        incluir_archivo: tambien las sesiones movidas a las tablas de archivo.
+        """
+        tabla = origen("ludoteca_sesiones", incluir_archivo)
         conn = get_conn()
         try:
             cur = conn.cursor()
-            query = "SELECT id, juego_id, vendedor_id, hora_inicio, hora_fin, duracion_horas, precio_total FROM ludoteca_sesiones ORDER BY id DESC"
+            query = f"SELECT id, juego_id, vendedor_id, hora_inicio, hora_fin, duracion_horas, precio_total FROM {tabla} ORDER BY id DESC"
             cur.execute(query)
             rows = cur.fetchall()
-            return [cls(r[0], r[1], r[2], r[3], r[4], r[5], r[6]) for r in rows]
+            sesiones = [cls(r[0], r[1], r[2], r[3], r[4], r[5], r[6]) for r in rows]
+        finally:
+            cur.close()
+            conn.close()
+
+        if prefetch:
+            prefetch_related(sesiones, *prefetch)
+        return sesiones
+
+    @classmethod
+    def listar_pagina(cls, limite=50, cursor=None, prefetch=None):
+        """Retorna (sesiones, siguiente_cursor) de la mas reciente a la mas antigua (id DESC)."""
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            query = "SELECT id, juego_id, vendedor_id, hora_inicio, hora_fin, duracion_horas, precio_total FROM ludoteca_sesiones"
+            params = []
+            if cursor:
+                (sesion_id,) = decodificar_cursor(cursor)
+                query += " WHERE id < %s"
+                params.append(sesion_id)
+            query += " ORDER BY id DESC LIMIT %s"
+            params.append(limite + 1)
+            cur.execute(query, tuple(params))
+            filas, siguiente = paginar(cur.fetchall(), limite, lambda r: (r[0],))
+            sesiones = [cls(r[0], r[1], r[2], r[3], r[4], r[5], r[6]) for r in filas]
+        finally:
+            cur.close()
+            conn.close()
+
+        if prefetch:
+            prefetch_related(sesiones, *prefetch)
+        return sesiones, siguiente
+
+    @classmethod
+    def iterar_todas(cls, tam_lote=500, incluir_archivo=False):
+        """Generador de todas las sesiones (id DESC), leidas por bloques."""
+        for filas in cls.bloques_todas(tam_lote, incluir_archivo):
+            for r in filas:
+                yield cls(*r)
+
+    @classmethod
+    def bloques_todas(cls, tam_lote=500, incluir_archivo=False):
+        """Listas de tuplas (orden de CAMPOS) de todas las sesiones, sin crear objetos."""
+        query = f"SELECT id, juego_id, vendedor_id, hora_inicio, hora_fin, duracion_horas, precio_total FROM {origen('ludoteca_sesiones', incluir_archivo)} ORDER BY id DESC"
+        return iterar_bloques(query, tam_lote=tam_lote)
+
+    @classmethod
+    def listar_con_participantes(cls, limite=50, cursor=None):
+        """
+        Retorna (sesiones, siguiente_cursor) con el titulo del juego, el nombre del
+        vendedor y los participantes [(id, nombre), ...] ya resueltos.
+        Usa dos consultas por pagina sin importar cuantas sesiones tenga.
+        """
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            query = """
+            SELECT s.id, s.juego_id, s.vendedor_id, s.hora_inicio, s.hora_fin, s.duracion_horas, s.precio_total,
+                   j.titulo, u.nombre
+            FROM ludoteca_sesiones s
+            JOIN juegos_mesa j ON j.id = s.juego_id
+            JOIN usuarios u ON u.id = s.vendedor_id
+            """
+            params = []
+            if cursor:
+                (sesion_id,) = decodificar_cursor(cursor)
+                query += " WHERE s.id < %s"
+                params.append(sesion_id)
+            query += " ORDER BY s.id DESC LIMIT %s"
+            params.append(limite + 1)
+            cur.execute(query, tuple(params))
+            filas, siguiente = paginar(cur.fetchall(), limite, lambda r: (r[0],))
+
+            sesiones = {}
+            for r in filas:
+                sesion = cls(r[0], r[1], r[2], r[3], r[4], r[5], r[6])
+                sesion.titulo_juego = r[7]
+                sesion.vendedor_nombre = r[8]
+                sesion.participantes = []
+                sesiones[sesion.id] = sesion
+
+            if sesiones:
+                marcadores = ", ".join(["%s"] * len(sesiones))
+                query = f"""
+                SELECT p.sesion_id, u.id, u.nombre
+                FROM ludoteca_participantes p
+                JOIN usuarios u ON u.id = p.usuario_id
+                WHERE p.sesion_id IN ({marcadores})
+                ORDER BY p.id
+                """
+                cur.execute(query, tuple(sesiones))
+                for sesion_id, usuario_id, nombre in cur.fetchall():
+                    sesiones[sesion_id].participantes.append((usuario_id, nombre))
+
+            return list(sesiones.values()), siguiente
         finally:
             cur.close()
             conn.close()
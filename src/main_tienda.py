@@ -8,15 +8,23 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from tienda import Tienda
 from usuario import Usuario
 from juego_mesa import JuegoMesa
+from ejecutor_gui import EjecutorTk
+from tabla_virtual import TablaVirtual
 
 # --- Variables Globales ---
 tienda = Tienda()
 current_user = None
 ADMIN_CODE = "admin"
+# Filas que se piden a la BD por cada pagina de los listados
+TAM_PAGINA = 200
 
 root = None
-lb_output = None
+tabla = None
 lbl_help = None
+ejecutor = None
+lbl_estado = None
+pb_ocupado = None
+btn_cancelar = None
 menubar = None
 menu_usuarios = None
 menu_catalogo = None
@@ -35,6 +43,120 @@ def centrar_ventana(ventana, ancho=400, alto=300):
     ventana.geometry(f"{ancho}x{alto}+{x}+{y}")
 
 
+def mostrar_estado(ocupado, mensaje):
+    """Muestra la barra de progreso y el boton Cancelar mientras hay consultas en curso."""
+    lbl_estado.config(text=mensaje)
+    if ocupado and not pb_ocupado.winfo_manager():
+        lbl_estado.pack(side=tk.LEFT, padx=5)
+        pb_ocupado.pack(side=tk.LEFT, padx=5)
+        btn_cancelar.pack(side=tk.LEFT, padx=5)
+        pb_ocupado.start(10)
+        root.config(cursor="watch")
+    elif not ocupado and pb_ocupado.winfo_manager():
+        pb_ocupado.stop()
+        for w in (lbl_estado, pb_ocupado, btn_cancelar):
+            w.pack_forget()
+        root.config(cursor="")
+
+
+def enviar_escritura(clave, fn, *args, boton=None, al_terminar=None, al_error=None, descripcion="Guardando..."):
+    """
+    Envia una escritura a la BD en segundo plano, como la venta: una vez enviada
+    no se cancela, la clave impide un segundo envio mientras corre y el boton
+    queda deshabilitado hasta que falle (si sale bien, el formulario se cierra).
+    Si ya habia una igual en curso se avisa al usuario y retorna None.
+    """
+
+    def error(e):
+        if boton is not None and boton.winfo_exists():
+            boton.config(state="normal")
+        if al_error:
+            al_error(e)
+
+    tarea = ejecutor.enviar(
+        clave,
+        fn,
+        *args,
+        al_terminar=al_terminar,
+        al_error=error,
+        descripcion=descripcion,
+        cancelable=False,
+    )
+    if tarea is None:
+        messagebox.showinfo(
+            "En curso",
+            "Ya hay una operación igual en curso. Espere a que termine.",
+            parent=boton.winfo_toplevel() if boton is not None else root,
+        )
+    elif boton is not None:
+        boton.config(state="disabled")
+    return tarea
+
+
+def campo_juego(parent):
+    """
+    Combobox para escribir un titulo: mientras se escribe se cargan como opciones
+    los juegos que coinciden (sin importar acentos ni mayusculas). Flecha abajo
+    despliega las sugerencias.
+    """
+    combo = ttk.Combobox(parent)
+    pendiente = [None]
+
+    def mostrar(sugerencias):
+        if combo.winfo_exists():
+            combo["values"] = [s["titulo"] for s in sugerencias]
+
+    def sugerir():
+        pendiente[0] = None
+        texto = combo.get().strip()
+        if not texto:
+            combo["values"] = []
+            return
+        # En segundo plano: el indice puede necesitar cargarse o revisar la version del catalogo
+        ejecutor.enviar(
+            "sugerir_juegos",
+            tienda.sugerir_juegos,
+            texto,
+            al_terminar=mostrar,
+            reemplazar=True,
+            silenciosa=True,
+        )
+
+    def al_escribir(event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if pendiente[0] is not None:
+            combo.after_cancel(pendiente[0])
+        pendiente[0] = combo.after(150, sugerir)
+
+    combo.bind("<KeyRelease>", al_escribir)
+    return combo
+
+
+def pedir_juego(titulo_ventana, etiqueta="Titulo del juego:"):
+    """Dialogo modal con campo_juego(). Retorna el titulo elegido o None si se cancela."""
+    top = tk.Toplevel(root)
+    top.title(titulo_ventana)
+    centrar_ventana(top, 380, 130)
+    top.transient(root)
+    elegido = [None]
+
+    tk.Label(top, text=etiqueta).grid(row=0, column=0, padx=10, pady=15, sticky="e")
+    combo = campo_juego(top)
+    combo.grid(row=0, column=1, padx=10, pady=15)
+    combo.focus_set()
+
+    def aceptar(event=None):
+        elegido[0] = combo.get().strip() or None
+        top.destroy()
+
+    combo.bind("<Return>", aceptar)
+    tk.Button(top, text="Aceptar", command=aceptar).grid(row=1, column=0, columnspan=2)
+    top.grab_set()
+    top.wait_window()
+    return elegido[0]
+
+
 # --------------------------
 # Funciones de Sesion y Registro
 # --------------------------
@@ -45,9 +167,12 @@ def login_inicial():
     global current_user
 
     # Intenta asegurar que exista admin
-    try:
+    def asegurar_admin():
         if not tienda.buscar_usuario("admin"):
             tienda.registrar_usuario("admin", "administrador", "admin123")
+
+    try:
+        ejecutor.esperar(asegurar_admin)
     except:
         pass
 
@@ -73,7 +198,13 @@ def login_inicial():
             salir()
             return
 
-        usuario = Usuario.autenticar(datos_login["nombre"], datos_login["password"])
+        try:
+            usuario = ejecutor.esperar(
+                Usuario.autenticar, datos_login["nombre"], datos_login["password"]
+            )
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo conectar con la BD:\n{e}")
+            continue
         if usuario:
             current_user = usuario
             actualizar_interfaz_login()
@@ -140,6 +271,8 @@ def actualizar_interfaz_login():
     )
     ajustar_menu_por_rol()
     listar_catalogo()
+    # El indice de busqueda se arma una vez; asi la primera sugerencia ya es inmediata
+    ejecutor.enviar("precargar_busqueda", tienda.precargar_busqueda, silenciosa=True)
 
 
 def registrar_usuario_publico():
@@ -197,15 +330,29 @@ def registrar_usuario_publico():
             )
             return
 
-        try:
-            u = tienda.registrar_usuario(nombre, rol, pwd)
-            messagebox.showinfo(
-                "Éxito", f"Usuario '{u.nombre}' registrado.", parent=top
-            )
+        def registrado(u):
             resultado["user"] = u
-            top.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo registrar:\n{e}", parent=top)
+            if top.winfo_exists():
+                messagebox.showinfo(
+                    "Éxito", f"Usuario '{u.nombre}' registrado.", parent=top
+                )
+                top.destroy()
+
+        def error(e):
+            if top.winfo_exists():
+                messagebox.showerror("Error", f"No se pudo registrar:\n{e}", parent=top)
+
+        enviar_escritura(
+            "registrar_usuario",
+            tienda.registrar_usuario,
+            nombre,
+            rol,
+            pwd,
+            boton=btn,
+            al_terminar=registrado,
+            al_error=error,
+            descripcion="Registrando usuario...",
+        )
 
     btn = tk.Button(top, text="Registrar", command=guardar, bg="#dddddd")
     btn.grid(row=4, column=0, columnspan=2, pady=15)
@@ -215,6 +362,8 @@ def registrar_usuario_publico():
 
 
 def salir():
+    if ejecutor:
+        ejecutor.cerrar()
     if root:
         root.destroy()
     sys.exit(0)
@@ -254,60 +403,83 @@ def modificar_usuario():
     if not nombre_busqueda:
         return
 
-    usr = tienda.buscar_usuario(nombre_busqueda.strip())
-    if usr is None:
-        messagebox.showwarning("No encontrado", "Usuario no encontrado.")
-        return
-
-    # Formulario con datos precargados
-    top = tk.Toplevel(root)
-    top.title(f"Modificar: {usr.nombre}")
-    centrar_ventana(top, 350, 250)
+    def abrir_formulario(usr):
+        if usr is None:
+            messagebox.showwarning("No encontrado", "Usuario no encontrado.")
+            return
 
-    tk.Label(top, text="Nuevo Nombre:").grid(
-        row=0, column=0, padx=10, pady=5, sticky="e"
-    )
-    e_nom = tk.Entry(top)
-    e_nom.insert(0, usr.nombre)
-    e_nom.grid(row=0, column=1, padx=10, pady=5)
+        # Formulario con datos precargados
+        top = tk.Toplevel(root)
+        top.title(f"Modificar: {usr.nombre}")
+        centrar_ventana(top, 350, 250)
 
-    tk.Label(top, text="Nuevo Rol:").grid(row=1, column=0, padx=10, pady=5, sticky="e")
-    c_rol = ttk.Combobox(
-        top, values=["cliente", "vendedor", "administrador"], state="readonly"
-    )
-    c_rol.set(usr.role)
-    c_rol.grid(row=1, column=1, padx=10, pady=5)
+        tk.Label(top, text="Nuevo Nombre:").grid(
+            row=0, column=0, padx=10, pady=5, sticky="e"
+        )
+        e_nom = tk.Entry(top)
+        e_nom.insert(0, usr.nombre)
+        e_nom.grid(row=0, column=1, padx=10, pady=5)
 
-    tk.Label(top, text="Nueva Contraseña:").grid(
-        row=2, column=0, padx=10, pady=5, sticky="e"
-    )
-    tk.Label(
-        top, text="(Dejar vacio para mantener)", fg="gray", font=("Arial", 8)
-    ).grid(row=3, column=0, columnspan=2)
-    e_pass = tk.Entry(top, show="*")
-    e_pass.grid(row=2, column=1, padx=10, pady=5)
+        tk.Label(top, text="Nuevo Rol:").grid(row=1, column=0, padx=10, pady=5, sticky="e")
+        c_rol = ttk.Combobox(
+            top, values=["cliente", "vendedor", "administrador"], state="readonly"
+        )
+        c_rol.set(usr.role)
+        c_rol.grid(row=1, column=1, padx=10, pady=5)
 
-    def guardar_cambios():
-        nn = e_nom.get().strip()
-        nr = c_rol.get()
-        np = e_pass.get()
+        tk.Label(top, text="Nueva Contraseña:").grid(
+            row=2, column=0, padx=10, pady=5, sticky="e"
+        )
+        tk.Label(
+            top, text="(Dejar vacio para mantener)", fg="gray", font=("Arial", 8)
+        ).grid(row=3, column=0, columnspan=2)
+        e_pass = tk.Entry(top, show="*")
+        e_pass.grid(row=2, column=1, padx=10, pady=5)
+
+        def guardar_cambios():
+            nn = e_nom.get().strip()
+            nr = c_rol.get()
+            np = e_pass.get()
+
+            if not nn:
+                messagebox.showwarning(
+                    "Error", "El nombre no puede estar vacio", parent=top
+                )
+                return
 
-        if not nn:
-            messagebox.showwarning(
-                "Error", "El nombre no puede estar vacio", parent=top
+            def actualizado(_):
+                if top.winfo_exists():
+                    messagebox.showinfo("Exito", "Usuario actualizado.", parent=top)
+                    top.destroy()
+                listar_usuarios()
+
+            def error(e):
+                if top.winfo_exists():
+                    messagebox.showerror("Error", f"Fallo al actualizar: {e}", parent=top)
+
+            enviar_escritura(
+                "modificar_usuario",
+                Usuario.actualizar,
+                usr.id,
+                nn,
+                nr,
+                np if np else None,
+                boton=btn_guardar,
+                al_terminar=actualizado,
+                al_error=error,
+                descripcion="Actualizando usuario...",
             )
-            return
 
-        try:
-            Usuario.actualizar(usr.id, nn, nr, np if np else None)
-            messagebox.showinfo("Exito", "Usuario actualizado.", parent=top)
-            top.destroy()
-            listar_usuarios()
-        except Exception as e:
-            messagebox.showerror("Error", f"Fallo al actualizar: {e}", parent=top)
+        btn_guardar = tk.Button(top, text="Guardar Cambios", command=guardar_cambios)
+        btn_guardar.grid(row=4, column=0, columnspan=2, pady=15)
 
-    tk.Button(top, text="Guardar Cambios", command=guardar_cambios).grid(
-        row=4, column=0, columnspan=2, pady=15
+    ejecutor.enviar(
+        "buscar_usuario",
+        tienda.buscar_usuario,
+        nombre_busqueda.strip(),
+        al_terminar=abrir_formulario,
+        al_error=lambda e: messagebox.showerror("Error", f"No se pudo buscar el usuario:\n{e}"),
+        descripcion="Buscando usuario...",
     )
 
 
@@ -319,19 +491,16 @@ def eliminar_usuario():
     if not nombre:
         return
 
-    usr = tienda.buscar_usuario(nombre.strip())
-    if usr is None:
-        messagebox.showwarning("No encontrado", "Usuario no encontrado.")
-        return
+    def eliminado(_):
+        messagebox.showinfo("OK", "Usuario eliminado.")
+        listar_usuarios()
 
-    if messagebox.askyesno(
-        "Confirmar", f"¿Eliminar al usuario '{usr.nombre}' (ID: {usr.id})?"
-    ):
-        try:
-            Usuario.eliminar(usr.id)
-            messagebox.showinfo("OK", "Usuario eliminado.")
-            listar_usuarios()
-        except Exception as e:
+    def confirmar(usr):
+        if usr is None:
+            messagebox.showwarning("No encontrado", "Usuario no encontrado.")
+            return
+
+        def error(e):
             error_str = str(e)
             if "1451" in error_str:
                 messagebox.showerror(
@@ -342,6 +511,27 @@ def eliminar_usuario():
             else:
                 messagebox.showerror("Error", f"Error al eliminar: {e}")
 
+        if messagebox.askyesno(
+            "Confirmar", f"¿Eliminar al usuario '{usr.nombre}' (ID: {usr.id})?"
+        ):
+            enviar_escritura(
+                "eliminar_usuario",
+                Usuario.eliminar,
+                usr.id,
+                al_terminar=eliminado,
+                al_error=error,
+                descripcion="Eliminando usuario...",
+            )
+
+    ejecutor.enviar(
+        "buscar_usuario",
+        tienda.buscar_usuario,
+        nombre.strip(),
+        al_terminar=confirmar,
+        al_error=lambda e: messagebox.showerror("Error", f"No se pudo buscar el usuario:\n{e}"),
+        descripcion="Buscando usuario...",
+    )
+
 
 # --------------------------
 # Funciones de Gestion: CATÁLOGO (Admin)
@@ -400,17 +590,33 @@ def registrar_juego():
             )
             return
 
-        try:
-            j = tienda.registrar_juego(t, f, s, pv, pl)
-            messagebox.showinfo(
-                "Éxito", f"Juego '{j.titulo}' registrado correctamente.", parent=top
-            )
-            top.destroy()
+        def registrado(j):
+            if top.winfo_exists():
+                messagebox.showinfo(
+                    "Éxito", f"Juego '{j.titulo}' registrado correctamente.", parent=top
+                )
+                top.destroy()
             listar_catalogo()
-        except Exception as e:
-            messagebox.showerror(
-                "Error BD", f"No se pudo registrar el juego:\n{e}", parent=top
-            )
+
+        def error(e):
+            if top.winfo_exists():
+                messagebox.showerror(
+                    "Error BD", f"No se pudo registrar el juego:\n{e}", parent=top
+                )
+
+        enviar_escritura(
+            "registrar_juego",
+            tienda.registrar_juego,
+            t,
+            f,
+            s,
+            pv,
+            pl,
+            boton=btn_save,
+            al_terminar=registrado,
+            al_error=error,
+            descripcion="Registrando juego...",
+        )
 
     # Boton Guardar
     btn_save = tk.Button(
@@ -421,24 +627,37 @@ def registrar_juego():
 
 @requiere_rol(["administrador"])
 def eliminar_juego():
-    titulo = simpledialog.askstring("Eliminar Juego", "Titulo del juego a eliminar:")
+    titulo = pedir_juego("Eliminar Juego", "Titulo del juego a eliminar:")
     if not titulo:
         return
 
-    juego = tienda.buscar_juego(titulo.strip())
-    if not juego:
-        messagebox.showwarning("Error", "Juego no encontrado.")
-        return
+    def eliminado(_):
+        messagebox.showinfo("OK", "Juego eliminado.")
+        listar_catalogo()
 
-    if messagebox.askyesno("Confirmar", f"¿Eliminar '{juego.titulo}'?"):
-        try:
-            from juego_mesa import JuegoMesa
+    def confirmar(juego):
+        if not juego:
+            messagebox.showwarning("Error", "Juego no encontrado.")
+            return
 
-            JuegoMesa.eliminar(juego.id)
-            messagebox.showinfo("OK", "Juego eliminado.")
-            listar_catalogo()
-        except Exception as e:
-            messagebox.showerror("Error", f"Error: {e}")
+        if messagebox.askyesno("Confirmar", f"¿Eliminar '{juego.titulo}'?"):
+            enviar_escritura(
+                "eliminar_juego",
+                JuegoMesa.eliminar,
+                juego.id,
+                al_terminar=eliminado,
+                al_error=lambda e: messagebox.showerror("Error", f"Error: {e}"),
+                descripcion="Eliminando juego...",
+            )
+
+    ejecutor.enviar(
+        "buscar_juego",
+        tienda.buscar_juego,
+        titulo.strip(),
+        al_terminar=confirmar,
+        al_error=lambda e: messagebox.showerror("Error", f"No se pudo buscar el juego:\n{e}"),
+        descripcion="Buscando juego...",
+    )
 
 
 # --------------------------
@@ -457,7 +676,7 @@ def realizar_venta():
     tk.Label(top, text="Titulo del Juego:").grid(
         row=0, column=0, padx=10, pady=10, sticky="e"
     )
-    e_titulo = tk.Entry(top)
+    e_titulo = campo_juego(top)
     e_titulo.grid(row=0, column=1, padx=10, pady=10)
 
     tk.Label(top, text="Cantidad:").grid(row=1, column=0, padx=10, pady=10, sticky="e")
@@ -483,32 +702,46 @@ def realizar_venta():
             messagebox.showerror("Error", "Cantidad inválida.", parent=top)
             return
 
-        cliente_id = current_user.id
-        if e_cliente:
-            cli_nom = e_cliente.get().strip()
+        cli_nom = e_cliente.get().strip() if e_cliente else ""
+
+        def vender():
+            # Corre en segundo plano: solo BD, nada de widgets
+            cliente_id = current_user.id
             if cli_nom:
                 c = tienda.buscar_usuario(cli_nom)
-                if c:
-                    cliente_id = c.id
-                else:
-                    messagebox.showerror("Error", "Cliente no encontrado.", parent=top)
-                    return
-
-        try:
-            venta = tienda.realizar_venta(cliente_id, tit, cant)
-            messagebox.showinfo(
-                "Venta Exitosa",
-                f"Total: ${venta.precio_total}\n{venta.descripcion()}",
-                parent=top,
-            )
-            top.destroy()
+                if c is None:
+                    raise Exception("Cliente no encontrado.")
+                cliente_id = c.id
+            return tienda.realizar_venta(cliente_id, tit, cant)
+
+        def venta_ok(venta):
+            if top.winfo_exists():
+                messagebox.showinfo(
+                    "Venta Exitosa",
+                    f"Total: ${venta.precio_total}\n{venta.descripcion()}",
+                    parent=top,
+                )
+                top.destroy()
             listar_catalogo()
-        except Exception as e:
-            messagebox.showerror("Error", f"Error en venta: {e}", parent=top)
 
-    tk.Button(top, text="Confirmar Venta", command=procesar_venta, bg="#dddddd").grid(
-        row=3, column=0, columnspan=2, pady=15
+        def venta_error(e):
+            if top.winfo_exists():
+                messagebox.showerror("Error", f"Error en venta: {e}", parent=top)
+
+        # Una venta ya enviada no se cancela ni se puede enviar dos veces
+        enviar_escritura(
+            "venta",
+            vender,
+            boton=btn_confirmar,
+            al_terminar=venta_ok,
+            al_error=venta_error,
+            descripcion="Registrando venta...",
+        )
+
+    btn_confirmar = tk.Button(
+        top, text="Confirmar Venta", command=procesar_venta, bg="#dddddd"
     )
+    btn_confirmar.grid(row=3, column=0, columnspan=2, pady=15)
 
 
 @requiere_rol(["administrador", "vendedor"])
@@ -518,7 +751,7 @@ def iniciar_ludoteca():
     centrar_ventana(top, 350, 180)
 
     tk.Label(top, text="Juego:").grid(row=0, column=0, padx=10, pady=10)
-    e_juego = tk.Entry(top)
+    e_juego = campo_juego(top)
     e_juego.grid(row=0, column=1, padx=10, pady=10)
 
     tk.Label(top, text="Participante Inicial:").grid(row=1, column=0, padx=10, pady=10)
@@ -531,22 +764,35 @@ def iniciar_ludoteca():
         if not tit:
             return
 
-        try:
+        def abrir_sesion():
             sesion = tienda.iniciar_sesion_juego(tit, current_user.id)
             msg = f"Sesion iniciada ID: {sesion.id}"
 
             if par:
                 tienda.registrar_participante(sesion.id, par)
                 msg += f"\nParticipante {par} agregado."
+            return msg
+
+        def sesion_ok(msg):
+            if top.winfo_exists():
+                messagebox.showinfo("OK", msg, parent=top)
+                top.destroy()
+
+        def sesion_error(e):
+            if top.winfo_exists():
+                messagebox.showerror("Error", f"{e}", parent=top)
+
+        enviar_escritura(
+            "iniciar_ludoteca",
+            abrir_sesion,
+            boton=btn_iniciar,
+            al_terminar=sesion_ok,
+            al_error=sesion_error,
+            descripcion="Iniciando sesión de ludoteca...",
+        )
 
-            messagebox.showinfo("OK", msg, parent=top)
-            top.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", f"{e}", parent=top)
-
-    tk.Button(top, text="Iniciar Sesion", command=iniciar).grid(
-        row=2, column=0, columnspan=2, pady=10
-    )
+    btn_iniciar = tk.Button(top, text="Iniciar Sesion", command=iniciar)
+    btn_iniciar.grid(row=2, column=0, columnspan=2, pady=10)
 
 
 @requiere_rol(["administrador", "vendedor"])
@@ -555,141 +801,299 @@ def finalizar_ludoteca():
     if not sid:
         return
     try:
-        tienda.finalizar_sesion_juego(int(sid))
-        from ludoteca_sesion import LudotecaSesion
+        sesion_id = int(sid)
+    except ValueError:
+        messagebox.showerror("Error", "ID de sesion inválido.")
+        return
+
+    def cerrar_sesion():
+        # Un solo UPDATE en la BD; la cuenta vuelve ya calculada
+        cerradas = tienda.finalizar_sesiones([sesion_id])
+        if not cerradas:
+            raise Exception("Sesión no encontrada o ya finalizada.")
+        return cerradas[0]
 
-        s = LudotecaSesion.buscar_por_id(int(sid))
+    def mostrar_cuenta(s):
         messagebox.showinfo(
             "Finalizada",
             f"Sesion {s.id} terminada.\nDuracion: {s.duracion_horas}h\nTotal a pagar: ${s.precio_total}",
         )
-    except Exception as e:
-        messagebox.showerror("Error", f"Error finalizar: {e}")
+
+    # Cada sesion tiene su clave: cerrar otra mesa mientras tanto no se bloquea
+    enviar_escritura(
+        f"finalizar_ludoteca_{sesion_id}",
+        cerrar_sesion,
+        al_terminar=mostrar_cuenta,
+        al_error=lambda e: messagebox.showerror("Error", f"Error finalizar: {e}"),
+        descripcion="Finalizando sesión...",
+    )
+
+
+@requiere_rol(["administrador", "vendedor"])
+def finalizar_todas_ludoteca():
+    if not messagebox.askyesno("Ludoteca", "¿Finalizar todas las sesiones activas?"):
+        return
+
+    def mostrar_cuentas(sesiones):
+        if not sesiones:
+            messagebox.showinfo("Ludoteca", "No hay sesiones activas.")
+            return
+        total = sum(s.precio_total for s in sesiones)
+        tabla.mostrar_mensaje(
+            f"Sesiones finalizadas: {len(sesiones)} | Total: {formato_dinero(total)}",
+            [
+                f"Sesion {s.id} | {s.titulo_juego} | {s.duracion_horas}h | {formato_dinero(s.precio_total)}"
+                for s in sesiones
+            ],
+        )
+
+    enviar_escritura(
+        "finalizar_todas_ludoteca",
+        tienda.finalizar_sesiones,
+        "todas_activas",
+        al_terminar=mostrar_cuentas,
+        al_error=lambda e: messagebox.showerror("Error", f"Error finalizar: {e}"),
+        descripcion="Finalizando sesiones...",
+    )
+
+
+def ver_mesas_activas():
+    """Panel con las sesiones en curso; el tiempo y el costo avanzan cada segundo sin consultar la BD."""
+    top = tk.Toplevel(root)
+    top.title("Mesas activas")
+    centrar_ventana(top, 720, 320)
+
+    columnas = [
+        ("Sesion", 60),
+        ("Juego", 180),
+        ("Inicio", 140),
+        ("Tiempo", 80),
+        ("Costo", 80),
+        ("Participantes", 180),
+    ]
+    tree = ttk.Treeview(top, columns=[c[0] for c in columnas], show="headings")
+    for nombre, ancho in columnas:
+        tree.heading(nombre, text=nombre)
+        tree.column(nombre, width=ancho, stretch=True)
+    tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    lbl_total = ttk.Label(top, text="Cargando...")
+    lbl_total.pack(side=tk.LEFT, padx=5, pady=5)
+
+    def formato_tiempo(delta):
+        segundos = int(delta.total_seconds())
+        return f"{segundos // 3600}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+
+    def pintar(sesiones):
+        if not top.winfo_exists():
+            return
+        tree.delete(*tree.get_children())
+        for s in sesiones:
+            tree.insert(
+                "",
+                tk.END,
+                values=(
+                    s["id"],
+                    s["titulo_juego"],
+                    s["hora_inicio"],
+                    formato_tiempo(s["transcurrido"]),
+                    formato_dinero(s["costo"]),
+                    ", ".join(s["participantes"]) or "Ninguno",
+                ),
+            )
+        total = sum(s["costo"] for s in sesiones)
+        lbl_total.config(text=f"Mesas activas: {len(sesiones)} | Acumulado: {formato_dinero(total)}")
+
+    def tic():
+        # Ya cargado el registro, listar no consulta la BD
+        if top.winfo_exists():
+            pintar(tienda.listar_sesiones_activas())
+            top.after(1000, tic)
+
+    def refrescar():
+        ejecutor.enviar(
+            "mesas_activas",
+            tienda.refrescar_sesiones_activas,
+            al_terminar=lambda _: pintar(tienda.listar_sesiones_activas()),
+            al_error=lambda e: lbl_total.config(text=f"Error: {e}"),
+            descripcion="Actualizando mesas activas...",
+        )
+
+    ttk.Button(top, text="Refrescar", command=refrescar).pack(side=tk.RIGHT, padx=5, pady=5)
+
+    # La primera carga (unica consulta) va en segundo plano
+    ejecutor.enviar(
+        "mesas_activas",
+        tienda.listar_sesiones_activas,
+        al_terminar=lambda sesiones: (pintar(sesiones), top.after(1000, tic)),
+        al_error=lambda e: lbl_total.config(text=f"Error: {e}"),
+        descripcion="Cargando mesas activas...",
+    )
 
 
 # --------------------------
 # Listados
 # --------------------------
+def formato_dinero(valor):
+    return f"${valor:.2f}"
+
+
 def listar_catalogo():
-    if lb_output:
-        lb_output.delete(0, tk.END)
-        lb_output.insert(tk.END, "--- CATÁLOGO ---")
-        try:
-            items = tienda.listar_catalogo()
-            for i in items:
-                lb_output.insert(
-                    tk.END,
-                    f"[{i.id}] {i.titulo} | Stock: {i.stock} | ${i.precio_venta}",
-                )
-        except Exception as e:
-            lb_output.insert(tk.END, f"Error: {e}")
+    def cargar(cursor):
+        juegos, siguiente = tienda.listar_catalogo_pagina(TAM_PAGINA, cursor)
+        filas = [
+            (j.id, j.titulo, j.fabricante, j.stock, j.precio_venta, j.precio_ludoteca_hora)
+            for j in juegos
+        ]
+        return filas, siguiente
+
+    if tabla:
+        tabla.mostrar(
+            "--- CATÁLOGO ---",
+            [
+                ("ID", 50, None),
+                ("Titulo", 220, None),
+                ("Fabricante", 150, None),
+                ("Stock", 60, None),
+                ("Venta", 80, formato_dinero),
+                ("Ludoteca/h", 80, formato_dinero),
+            ],
+            cargar,
+            vacio="El catálogo está vacío.",
+        )
 
 
 def listar_usuarios():
-    if lb_output:
-        lb_output.delete(0, tk.END)
-        lb_output.insert(tk.END, "--- USUARIOS ---")
-        try:
-            items = tienda.listar_usuarios()
-            for i in items:
-                lb_output.insert(tk.END, f"[{i.id}] {i.nombre} ({i.role})")
-        except Exception as e:
-            lb_output.insert(tk.END, f"Error: {e}")
+    def cargar(cursor):
+        usuarios, siguiente = tienda.listar_usuarios_pagina(TAM_PAGINA, cursor)
+        return [(u.id, u.nombre, u.role) for u in usuarios], siguiente
+
+    if tabla:
+        tabla.mostrar(
+            "--- USUARIOS ---",
+            [("ID", 50, None), ("Nombre", 250, None), ("Rol", 150, None)],
+            cargar,
+            vacio="No hay usuarios registrados.",
+        )
 
 
 def listar_sesiones_ludoteca():
     """Muestra el historial de sesiones y sus participantes."""
-    if lb_output:
-        lb_output.delete(0, tk.END)
-        lb_output.insert(tk.END, "--- HISTORIAL DE LUDOTECA ---")
-        try:
-            sesiones = tienda.listar_sesiones()
-
-            if not sesiones:
-                lb_output.insert(tk.END, "No hay sesiones registradas.")
-                return
-
-            for s in sesiones:
-                ids_participantes = tienda.obtener_participantes(s.id)
-                participantes_str = (
-                    ", ".join(map(str, ids_participantes))
-                    if ids_participantes
-                    else "Ninguno"
-                )
-
-                estado = (
-                    "ACTIVA"
-                    if s.hora_fin is None
-                    else f"Finalizada (${s.precio_total})"
-                )
-
-                texto = f"[ID: {s.id}] Juego ID: {s.juego_id} | {estado} | Participantes IDs: [{participantes_str}]"
-                lb_output.insert(tk.END, texto)
 
-        except Exception as e:
-            lb_output.insert(tk.END, f"Error al listar sesiones: {e}")
+    def cargar(cursor):
+        sesiones, siguiente = tienda.listar_sesiones_detalle(TAM_PAGINA, cursor)
+        filas = []
+        for s in sesiones:
+            participantes_str = (
+                ", ".join(nombre for _, nombre in s.participantes)
+                if s.participantes
+                else "Ninguno"
+            )
+            estado = "ACTIVA" if s.hora_fin is None else "Finalizada"
+            precio = float(s.precio_total) if s.precio_total is not None else None
+            filas.append(
+                (s.id, s.titulo_juego, s.vendedor_nombre, s.hora_inicio, estado, precio, participantes_str)
+            )
+        return filas, siguiente
+
+    if tabla:
+        tabla.mostrar(
+            "--- HISTORIAL DE LUDOTECA ---",
+            [
+                ("ID", 50, None),
+                ("Juego", 180, None),
+                ("Vendedor", 100, None),
+                ("Inicio", 140, None),
+                ("Estado", 80, None),
+                ("Total", 70, formato_dinero),
+                ("Participantes", 200, None),
+            ],
+            cargar,
+            vacio="No hay sesiones registradas.",
+        )
 
 
 @requiere_rol(["administrador"])
 def modificar_juego():
     """Busca un juego por titulo y abre formulario para editarlo."""
-    titulo_busc = simpledialog.askstring(
-        "Modificar Juego", "Titulo del juego a editar:"
-    )
+    titulo_busc = pedir_juego("Modificar Juego", "Titulo del juego a editar:")
     if not titulo_busc:
         return
 
-    juego = tienda.buscar_juego(titulo_busc.strip())
-    if not juego:
-        messagebox.showwarning("Error", "Juego no encontrado.")
-        return
-
-    top = tk.Toplevel(root)
-    top.title(f"Editar: {juego.titulo}")
-    centrar_ventana(top, 400, 300)
-    top.transient(root)
-
-    labels = [
-        "Nuevo Titulo:",
-        "Nuevo Fabricante:",
-        "Nuevo Precio Venta:",
-        "Nuevo Precio Ludo/h:",
-    ]
-    valores_actuales = [
-        juego.titulo,
-        juego.fabricante,
-        str(juego.precio_venta),
-        str(juego.precio_ludoteca_hora),
-    ]
-    entries = []
-
-    for i, (lbl, val) in enumerate(zip(labels, valores_actuales)):
-        tk.Label(top, text=lbl).grid(row=i, column=0, padx=10, pady=10, sticky="e")
-        e = tk.Entry(top)
-        e.insert(0, val)
-        e.grid(row=i, column=1, padx=10, pady=10)
-        entries.append(e)
-
-    def guardar_cambios():
-        nt, nf, npv, npl = [e.get().strip() for e in entries]
+    def abrir_formulario(juego):
+        if not juego:
+            messagebox.showwarning("Error", "Juego no encontrado.")
+            return
 
-        try:
-            npv_float = float(npv)
-            npl_float = float(npl)
+        top = tk.Toplevel(root)
+        top.title(f"Editar: {juego.titulo}")
+        centrar_ventana(top, 400, 300)
+        top.transient(root)
+
+        labels = [
+            "Nuevo Titulo:",
+            "Nuevo Fabricante:",
+            "Nuevo Precio Venta:",
+            "Nuevo Precio Ludo/h:",
+        ]
+        valores_actuales = [
+            juego.titulo,
+            juego.fabricante,
+            str(juego.precio_venta),
+            str(juego.precio_ludoteca_hora),
+        ]
+        entries = []
+
+        for i, (lbl, val) in enumerate(zip(labels, valores_actuales)):
+            tk.Label(top, text=lbl).grid(row=i, column=0, padx=10, pady=10, sticky="e")
+            e = tk.Entry(top)
+            e.insert(0, val)
+            e.grid(row=i, column=1, padx=10, pady=10)
+            entries.append(e)
+
+        def guardar_cambios():
+            nt, nf, npv, npl = [e.get().strip() for e in entries]
+
+            try:
+                npv_float = float(npv)
+                npl_float = float(npl)
+            except ValueError:
+                messagebox.showerror("Error", "Los precios deben ser números.", parent=top)
+                return
 
-            # Llamar al backen
-            tienda.modificar_juego_datos(juego.id, nt, nf, npv_float, npl_float)
+            def actualizado(_):
+                if top.winfo_exists():
+                    messagebox.showinfo("Éxito", "Juego actualizado correctamente.", parent=top)
+                    top.destroy()
+                listar_catalogo()
+
+            def error(e):
+                if top.winfo_exists():
+                    messagebox.showerror("Error", f"No se pudo actualizar: {e}", parent=top)
+
+            enviar_escritura(
+                "modificar_juego",
+                tienda.modificar_juego_datos,
+                juego.id,
+                nt,
+                nf,
+                npv_float,
+                npl_float,
+                boton=btn_guardar,
+                al_terminar=actualizado,
+                al_error=error,
+                descripcion="Actualizando juego...",
+            )
 
-            messagebox.showinfo("Éxito", "Juego actualizado correctamente.", parent=top)
-            top.destroy()
-            listar_catalogo()
-        except ValueError:
-            messagebox.showerror("Error", "Los precios deben ser números.", parent=top)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo actualizar: {e}", parent=top)
+        btn_guardar = tk.Button(top, text="Guardar Cambios", command=guardar_cambios, bg="#dddddd")
+        btn_guardar.grid(row=4, column=0, columnspan=2, pady=20)
 
-    tk.Button(top, text="Guardar Cambios", command=guardar_cambios, bg="#dddddd").grid(
-        row=4, column=0, columnspan=2, pady=20
+    ejecutor.enviar(
+        "buscar_juego",
+        tienda.buscar_juego,
+        titulo_busc.strip(),
+        al_terminar=abrir_formulario,
+        al_error=lambda e: messagebox.showerror("Error", f"No se pudo buscar el juego:\n{e}"),
+        descripcion="Buscando juego...",
     )
 
 
@@ -698,26 +1102,35 @@ def listar_mis_compras():
     if not current_user:
         return
 
-    if lb_output:
-        lb_output.delete(0, tk.END)
-        lb_output.insert(tk.END, f"--- COMPRAS DE {current_user.nombre.upper()} ---")
-        try:
-            ventas = tienda.listar_ventas_cliente(current_user.id)
-            if not ventas:
-                lb_output.insert(tk.END, "No has realizado compras aún.")
-                return
-
-            for v in ventas:
-                juego = JuegoMesa.buscar_por_id(v.juego_id)
-                nom_juego = juego.titulo if juego else f"ID {v.juego_id}"
+    cliente_id = current_user.id
 
-                lb_output.insert(
-                    tk.END,
-                    f"Fecha: {v.fecha_venta} | {nom_juego} (x{v.cantidad}) | Total: ${v.precio_total}",
-                )
-
-        except Exception as e:
-            lb_output.insert(tk.END, f"Error al obtener compras: {e}")
+    def cargar(cursor):
+        ventas, siguiente = tienda.listar_ventas_cliente_pagina(
+            cliente_id, TAM_PAGINA, cursor, prefetch=["juego"]
+        )
+        filas = [
+            (
+                v.fecha_venta,
+                v.juego.titulo if v.juego else f"ID {v.juego_id}",
+                v.cantidad,
+                v.precio_total,
+            )
+            for v in ventas
+        ]
+        return filas, siguiente
+
+    if tabla:
+        tabla.mostrar(
+            f"--- COMPRAS DE {current_user.nombre.upper()} ---",
+            [
+                ("Fecha", 160, None),
+                ("Juego", 250, None),
+                ("Cantidad", 80, None),
+                ("Total", 100, formato_dinero),
+            ],
+            cargar,
+            vacio="No has realizado compras aún.",
+        )
 
 
 # --------------------------
@@ -748,6 +1161,7 @@ def ajustar_menu_por_rol():
     if menu_acciones:
         menu_acciones.entryconfig("Iniciar Sesion Ludoteca", state=state_vend)
         menu_acciones.entryconfig("Finalizar Sesion Ludoteca", state=state_vend)
+        menu_acciones.entryconfig("Finalizar Todas las Sesiones", state=state_vend)
         # state_vend si prefieres  = restringe
         # state "normal" para todos
         menu_acciones.entryconfig("Ver Historial Ludoteca", state="normal")
@@ -788,10 +1202,12 @@ menu_acciones.add_command(
 menu_acciones.add_separator()
 menu_acciones.add_command(label="Iniciar Sesion Ludoteca", command=iniciar_ludoteca)
 menu_acciones.add_command(label="Finalizar Sesion Ludoteca", command=finalizar_ludoteca)
+menu_acciones.add_command(label="Finalizar Todas las Sesiones", command=finalizar_todas_ludoteca)
 menu_acciones.add_separator()
 menu_acciones.add_command(
     label="Ver Historial Ludoteca", command=listar_sesiones_ludoteca
 )
+menu_acciones.add_command(label="Ver Mesas Activas", command=ver_mesas_activas)
 menubar.add_cascade(label="Acciones", menu=menu_acciones)
 
 # 4. Menú Sistema
@@ -801,17 +1217,27 @@ menubar.add_cascade(label="Sistema", menu=menu_sys)
 root.config(menu=menubar)
 
 # UI Principal
+barra_estado = ttk.Frame(root)
+barra_estado.pack(side=tk.BOTTOM, fill=tk.X)
+lbl_help = ttk.Label(
+    barra_estado, text="Iniciando sistema...", relief=tk.SUNKEN, anchor=tk.W
+)
+lbl_help.pack(side=tk.LEFT, fill=tk.X, expand=True)
+# Indicadores de consulta en curso (se muestran solo mientras hay trabajo)
+lbl_estado = ttk.Label(barra_estado, text="")
+pb_ocupado = ttk.Progressbar(barra_estado, mode="indeterminate", length=120)
+btn_cancelar = ttk.Button(
+    barra_estado, text="Cancelar", command=lambda: ejecutor.cancelar()
+)
+
+ejecutor = EjecutorTk(root, al_cambiar_estado=mostrar_estado)
+root.bind("<Escape>", lambda event: ejecutor.cancelar())
+
 frame_top = ttk.Frame(root, padding=10)
 frame_top.pack(fill=tk.BOTH, expand=True)
 
-lb_output = tk.Listbox(frame_top, font=("Consolas", 10))
-lb_output.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-sb = ttk.Scrollbar(frame_top, orient=tk.VERTICAL, command=lb_output.yview)
-sb.pack(side=tk.RIGHT, fill=tk.Y)
-lb_output.config(yscrollcommand=sb.set)
-
-lbl_help = ttk.Label(root, text="Iniciando sistema...", relief=tk.SUNKEN, anchor=tk.W)
-lbl_help.pack(side=tk.BOTTOM, fill=tk.X)
+tabla = TablaVirtual(frame_top, ejecutor)
+tabla.pack(fill=tk.BOTH, expand=True)
 
 # Arrancar
 root.after(100, login_inicial)
@@ -0,0 +1,10 @@
+-- Indices secundarios para las consultas frecuentes.
+
+-- Venta.listar_por_cliente y su paginacion por (fecha_venta, id)
+CREATE INDEX idx_ventas_cliente_fecha ON ventas (cliente_id, fecha_venta, id);
+
+-- Participantes por sesion (listar_por_sesion y el historial de ludoteca)
+CREATE INDEX idx_participantes_sesion ON ludoteca_participantes (sesion_id, usuario_id);
+
+-- Busqueda de sesiones activas (hora_fin IS NULL)
+CREATE INDEX idx_sesiones_hora_fin ON ludoteca_sesiones (hora_fin);
@@ -0,0 +1,12 @@
+-- Restricciones de integridad y tabla de version del catalogo.
+
+-- Respaldo en la BD del descuento atomico de stock
+ALTER TABLE juegos_mesa ADD CONSTRAINT chk_juegos_stock CHECK (stock >= 0);
+ALTER TABLE ventas ADD CONSTRAINT chk_ventas_cantidad CHECK (cantidad > 0);
+
+-- Bases creadas antes de la cache del catalogo
+CREATE TABLE IF NOT EXISTS catalogo_version (
+    id TINYINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+INSERT IGNORE INTO catalogo_version (id, version) VALUES (1, 0);
@@ -0,0 +1,2 @@
+-- Los hashes pbkdf2_sha256$iteraciones$sal$hash no caben en VARCHAR(64).
+ALTER TABLE usuarios MODIFY password VARCHAR(255) NULL;
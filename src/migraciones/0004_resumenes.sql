@@ -0,0 +1,32 @@
+-- Tablas de resumen diario mantenidas en cada escritura (ver resumenes.py).
+-- Despues de aplicar esta migracion: python resumenes.py reconstruir
+
+CREATE TABLE IF NOT EXISTS resumen_ventas_juego (
+    fecha DATE NOT NULL,
+    juego_id INT NOT NULL,
+    ventas INT NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, juego_id),
+    INDEX idx_resumen_ventas_juego (juego_id, fecha)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS resumen_ventas_cliente (
+    fecha DATE NOT NULL,
+    cliente_id INT NOT NULL,
+    ventas INT NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, cliente_id),
+    INDEX idx_resumen_ventas_cliente (cliente_id, fecha)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS resumen_ludoteca_juego (
+    fecha DATE NOT NULL,
+    juego_id INT NOT NULL,
+    sesiones INT NOT NULL DEFAULT 0,
+    horas DECIMAL(10, 2) NOT NULL DEFAULT 0,
+    ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, juego_id),
+    INDEX idx_resumen_ludoteca_juego (juego_id, fecha)
+) ENGINE=InnoDB;
@@ -0,0 +1,12 @@
+-- Registro de los meses archivados (ver archivo.py). Las tablas de archivo
+-- (ventas_archivo_AAAA_MM, ...) las crea archivo.py al mover cada mes.
+
+CREATE TABLE IF NOT EXISTS archivo_meses (
+    tabla VARCHAR(64) NOT NULL,
+    mes DATE NOT NULL,
+    tabla_archivo VARCHAR(64) NOT NULL,
+    filas INT NOT NULL DEFAULT 0,
+    volcado VARCHAR(500) NULL,
+    archivado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tabla, mes)
+) ENGINE=InnoDB;
@@ -0,0 +1,134 @@
+import argparse
+import os
+import re
+import sys
+
+from db_connection import create_connection, close_connection
+
+
+MIGRACIONES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migraciones")
+
+# Archivos con nombre NNNN_descripcion.sql
+PATRON_MIGRACION = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+def listar_migraciones(directorio=MIGRACIONES_DIR):
+    """Retorna [(version, nombre, ruta), ...] ordenadas por version."""
+    migraciones = []
+    for archivo in os.listdir(directorio):
+        m = PATRON_MIGRACION.match(archivo)
+        if m:
+            migraciones.append(
+                (int(m.group(1)), m.group(2), os.path.join(directorio, archivo))
+            )
+    migraciones.sort()
+    return migraciones
+
+
+def leer_sentencias(ruta):
+    """Separa un archivo .sql en sentencias (terminadas en ';'), sin comentarios '--'."""
+    with open(ruta, encoding="utf-8") as f:
+        lineas = [l for l in f if not l.strip().startswith("--")]
+    return [s.strip() for s in "".join(lineas).split(";") if s.strip()]
+
+
+def crear_tabla_version(connection):
+    cursor = connection.cursor()
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        nombre VARCHAR(255) NOT NULL,
+        aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB;
+    """
+    )
+    connection.commit()
+    cursor.close()
+
+
+def versiones_aplicadas(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT version FROM schema_version")
+    versiones = {r[0] for r in cursor.fetchall()}
+    cursor.close()
+    return versiones
+
+
+def pendientes(connection):
+    """Migraciones que todavia no figuran en schema_version."""
+    crear_tabla_version(connection)
+    aplicadas = versiones_aplicadas(connection)
+    return [m for m in listar_migraciones() if m[0] not in aplicadas]
+
+
+def aplicar(connection, dry_run=False, hasta=None):
+    """
+    Aplica en orden las migraciones pendientes (hasta la version indicada).
+    Con dry_run solo imprime las sentencias. Cada migracion se registra en
+    schema_version al terminar; MySQL confirma el DDL sentencia por sentencia,
+    asi que una migracion fallida a medias se debe revisar a mano.
+    """
+    aplicadas = []
+    for version, nombre, ruta in pendientes(connection):
+        if hasta is not None and version > hasta:
+            break
+        sentencias = leer_sentencias(ruta)
+        print(f"== {version:04d}_{nombre} ({len(sentencias)} sentencias)")
+        if dry_run:
+            for sentencia in sentencias:
+                print(sentencia + ";")
+            continue
+
+        cursor = connection.cursor()
+        try:
+            for sentencia in sentencias:
+                cursor.execute(sentencia)
+            cursor.execute(
+                "INSERT INTO schema_version (version, nombre) VALUES (%s, %s)",
+                (version, nombre),
+            )
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            raise Exception(f"Error en la migración {version:04d}_{nombre}: {e}")
+        finally:
+            cursor.close()
+        aplicadas.append(version)
+    return aplicadas
+
+
+def estado(connection):
+    crear_tabla_version(connection)
+    aplicadas = versiones_aplicadas(connection)
+    for version, nombre, _ in listar_migraciones():
+        marca = "aplicada" if version in aplicadas else "pendiente"
+        print(f"{version:04d}_{nombre}: {marca}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la tienda.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("estado", help="Lista las migraciones y si estan aplicadas")
+    p_aplicar = sub.add_parser("aplicar", help="Aplica las migraciones pendientes")
+    p_aplicar.add_argument("--dry-run", action="store_true", help="Solo muestra el SQL")
+    p_aplicar.add_argument("--hasta", type=int, help="Ultima version a aplicar")
+    args = parser.parse_args(argv)
+
+    connection = create_connection()
+    if not connection:
+        return 1
+    try:
+        if args.comando == "estado":
+            estado(connection)
+        else:
+            aplicadas = aplicar(connection, dry_run=args.dry_run, hasta=args.hasta)
+            if not args.dry_run:
+                print(f"Migraciones aplicadas: {len(aplicadas)}")
+    finally:
+        close_connection(connection)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,19 @@
-from db_connection import create_connection, close_connection
+from db_connection import DB_BACKEND, create_connection, close_connection
+import migrar
 
 
 def crear_tablas(connection):
+    if DB_BACKEND == "sqlite":
+        import backend_sqlite
+
+        return backend_sqlite.crear_tablas(connection)
+
     querry_usuario = """
     CREATE TABLE IF NOT EXISTS usuarios (
         id INT AUTO_INCREMENT PRIMARY KEY,
         nombre VARCHAR(255) NOT NULL UNIQUE,
         role VARCHAR(50) NOT NULL DEFAULT 'cliente',
-        password VARCHAR(64) NULL, -- Almacena el hash de la contraseña
+        password VARCHAR(255) NULL, -- Almacena el hash de la contraseña (pbkdf2_sha256$...)
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     ) ENGINE=InnoDB;
     """
@@ -66,12 +72,75 @@ def crear_tablas(connection):
     ) ENGINE=InnoDB;
     """
 
+    querry_catalogo_version = """
+    CREATE TABLE IF NOT EXISTS catalogo_version (
+        id TINYINT PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0 -- Se incrementa en cada cambio del catálogo
+    ) ENGINE=InnoDB;
+    """
+
+    # Resumenes diarios (ver resumenes.py); sin FOREIGN KEY para poder reconstruirlos libremente
+    querry_resumen_ventas_juego = """
+    CREATE TABLE IF NOT EXISTS resumen_ventas_juego (
+        fecha DATE NOT NULL,
+        juego_id INT NOT NULL,
+        ventas INT NOT NULL DEFAULT 0,
+        unidades INT NOT NULL DEFAULT 0,
+        ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, juego_id),
+        INDEX idx_resumen_ventas_juego (juego_id, fecha)
+    ) ENGINE=InnoDB;
+    """
+
+    querry_resumen_ventas_cliente = """
+    CREATE TABLE IF NOT EXISTS resumen_ventas_cliente (
+        fecha DATE NOT NULL,
+        cliente_id INT NOT NULL,
+        ventas INT NOT NULL DEFAULT 0,
+        unidades INT NOT NULL DEFAULT 0,
+        ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, cliente_id),
+        INDEX idx_resumen_ventas_cliente (cliente_id, fecha)
+    ) ENGINE=InnoDB;
+    """
+
+    querry_resumen_ludoteca_juego = """
+    CREATE TABLE IF NOT EXISTS resumen_ludoteca_juego (
+        fecha DATE NOT NULL,
+        juego_id INT NOT NULL,
+        sesiones INT NOT NULL DEFAULT 0,
+        horas DECIMAL(10, 2) NOT NULL DEFAULT 0,
+        ingresos DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, juego_id),
+        INDEX idx_resumen_ludoteca_juego (juego_id, fecha)
+    ) ENGINE=InnoDB;
+    """
+
+    # Registro de los meses movidos a tablas de archivo (ver archivo.py)
+    querry_archivo_meses = """
+    CREATE TABLE IF NOT EXISTS archivo_meses (
+        tabla VARCHAR(64) NOT NULL,
+        mes DATE NOT NULL,
+        tabla_archivo VARCHAR(64) NOT NULL,
+        filas INT NOT NULL DEFAULT 0,
+        volcado VARCHAR(500) NULL,
+        archivado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (tabla, mes)
+    ) ENGINE=InnoDB;
+    """
+
     cursor = connection.cursor()
     cursor.execute(querry_usuario)
     cursor.execute(querry_juegosmesa)
     cursor.execute(querry_ventas)
     cursor.execute(querry_ludoteca)
     cursor.execute(querry_sesiones)
+    cursor.execute(querry_catalogo_version)
+    cursor.execute("INSERT IGNORE INTO catalogo_version (id, version) VALUES (1, 0)")
+    cursor.execute(querry_resumen_ventas_juego)
+    cursor.execute(querry_resumen_ventas_cliente)
+    cursor.execute(querry_resumen_ludoteca_juego)
+    cursor.execute(querry_archivo_meses)
     connection.commit()
     print("Tablas creadas exitosamente.")
     cursor.close()
@@ -204,6 +273,8 @@ def main():
     connection = create_connection()
     if connection:
         crear_tablas(connection)
+        # Indices y cambios posteriores al esquema base
+        migrar.aplicar(connection)
         close_connection(connection)
 
 
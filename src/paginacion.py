@@ -0,0 +1,64 @@
+import base64
+import json
+
+from db_connection import get_conn
+
+
+def codificar_cursor(*valores):
+    """Convierte la clave de la ultima fila de una pagina en un token opaco."""
+    crudo = json.dumps(valores, default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii")
+
+
+def decodificar_cursor(token):
+    """Recupera la clave guardada en un token de codificar_cursor()."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, AttributeError):
+        raise Exception("Cursor de paginación inválido.")
+
+
+def paginar(filas, limite, clave):
+    """
+    Recorta la fila extra pedida a la BD (LIMIT limite + 1) y arma el cursor
+    de la pagina siguiente con clave(ultima_fila). Retorna (filas, cursor).
+    """
+    if len(filas) > limite:
+        filas = filas[:limite]
+        return filas, codificar_cursor(*clave(filas[-1]))
+    return filas, None
+
+
+def iterar_bloques(query, params=(), tam_lote=500, crudo=False):
+    """
+    Generador que recorre el resultado de una consulta con fetchmany y entrega
+    listas de hasta tam_lote filas, sin cargarlo completo en memoria. Mantiene
+    una conexion del pool mientras dura. Con crudo=True (solo MySQL) las filas
+    llegan como bytes sin convertir a tipos de Python.
+    """
+    conn = get_conn()
+    agotado = False
+    try:
+        cur = conn.cursor(raw=True) if crudo else conn.cursor()
+        cur.execute(query, params)
+        while True:
+            filas = cur.fetchmany(tam_lote)
+            if not filas:
+                agotado = True
+                break
+            yield filas
+    finally:
+        if not agotado:
+            # El consumidor corto antes: el resultado pendiente se debe drenar
+            try:
+                cur.fetchall()
+            except Exception:
+                pass
+        cur.close()
+        conn.close()
+
+
+def iterar_filas(query, params=(), tam_lote=500):
+    """Igual que iterar_bloques(), pero fila por fila."""
+    for filas in iterar_bloques(query, params, tam_lote):
+        yield from filas
@@ -0,0 +1,33 @@
+def prefetch_related(objs, *relaciones):
+    """
+    Resuelve relaciones de una lista de objetos con una consulta IN por relacion.
+
+    Cada modelo declara RELACIONES = {"nombre": ("campo_id", ModeloDestino)} y el
+    destino implementa buscar_por_ids(ids) -> {id: objeto}. El objeto resuelto
+    queda en el atributo con el nombre de la relacion (por ejemplo venta.juego),
+    o None si ya no existe.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+
+    modelo = type(objs[0])
+    for relacion in relaciones:
+        try:
+            campo, destino = modelo.RELACIONES[relacion]
+        except (AttributeError, KeyError):
+            raise Exception(f"Relación '{relacion}' no definida en {modelo.__name__}.")
+
+        ids = {getattr(o, campo) for o in objs}
+        ids.discard(None)
+        cargados = destino.buscar_por_ids(ids) if ids else {}
+        for o in objs:
+            setattr(o, relacion, cargados.get(getattr(o, campo)))
+    return objs
+
+
+def dividir_en_bloques(valores, tam=1000):
+    """Parte una coleccion de ids en listas de a lo sumo `tam` para las consultas IN."""
+    valores = list(valores)
+    for i in range(0, len(valores), tam):
+        yield valores[i : i + tam]
@@ -0,0 +1,264 @@
+"""
+Resumenes diarios de ventas y ludoteca.
+
+Las tablas resumen_* se actualizan dentro de la misma transaccion que la
+escritura que las afecta (Venta.crear, Venta.crear_carrito, Venta.eliminar,
+LudotecaSesion.finalizar_sesion y LudotecaSesion.eliminar), asi los reportes
+leen unas pocas filas por dia en lugar de recorrer todo el historial.
+`python resumenes.py reconstruir` las recalcula desde las tablas base,
+incluidos los meses archivados (ver archivo.py).
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+from archivo import origen
+from db_connection import get_conn
+
+
+def _marcadores(ids):
+    return ", ".join(["%s"] * len(ids))
+
+
+def aplicar_ventas(cur, ids, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) las ventas indicadas en los resumenes de
+    su dia. Para restar se debe llamar antes del DELETE, mientras las filas existen.
+    """
+    if not ids:
+        return
+    ids = tuple(ids)
+    marcadores = _marcadores(ids)
+    for tabla, columna in (
+        ("resumen_ventas_juego", "juego_id"),
+        ("resumen_ventas_cliente", "cliente_id"),
+    ):
+        cur.execute(
+            f"""
+            INSERT INTO {tabla} (fecha, {columna}, ventas, unidades, ingresos)
+            SELECT DATE(fecha_venta), {columna}, %s * COUNT(*), %s * SUM(cantidad), %s * SUM(precio_total)
+            FROM ventas WHERE id IN ({marcadores})
+            GROUP BY DATE(fecha_venta), {columna}
+            ON DUPLICATE KEY UPDATE
+                ventas = ventas + VALUES(ventas),
+                unidades = unidades + VALUES(unidades),
+                ingresos = ingresos + VALUES(ingresos)
+            """,
+            (signo, signo, signo) + ids,
+        )
+
+
+def restar_venta(cur, fecha_venta, cliente_id, juego_id, cantidad, precio_total):
+    """
+    Resta una venta de los resumenes de su dia a partir de sus valores. Sirve
+    despues del DELETE, cuando la fila ya no se puede leer.
+    """
+    for tabla, columna, valor in (
+        ("resumen_ventas_juego", "juego_id", juego_id),
+        ("resumen_ventas_cliente", "cliente_id", cliente_id),
+    ):
+        cur.execute(
+            f"""
+            INSERT INTO {tabla} (fecha, {columna}, ventas, unidades, ingresos)
+            VALUES (DATE(%s), %s, -1, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                ventas = ventas + VALUES(ventas),
+                unidades = unidades + VALUES(unidades),
+                ingresos = ingresos + VALUES(ingresos)
+            """,
+            (fecha_venta, valor, -cantidad, -precio_total),
+        )
+
+
+def aplicar_sesiones(cur, ids, signo=1):
+    """
+    Suma (o resta) las sesiones finalizadas indicadas en resumen_ludoteca_juego,
+    en el dia de su hora_fin. Las sesiones activas se ignoran.
+    """
+    if not ids:
+        return
+    ids = tuple(ids)
+    cur.execute(
+        f"""
+        INSERT INTO resumen_ludoteca_juego (fecha, juego_id, sesiones, horas, ingresos)
+        SELECT DATE(hora_fin), juego_id, %s * COUNT(*), %s * SUM(duracion_horas), %s * SUM(precio_total)
+        FROM ludoteca_sesiones WHERE id IN ({_marcadores(ids)}) AND hora_fin IS NOT NULL
+        GROUP BY DATE(hora_fin), juego_id
+        ON DUPLICATE KEY UPDATE
+            sesiones = sesiones + VALUES(sesiones),
+            horas = horas + VALUES(horas),
+            ingresos = ingresos + VALUES(ingresos)
+        """,
+        (signo, signo, signo) + ids,
+    )
+
+
+def reconstruir(desde=None):
+    """
+    Recalcula los resumenes desde ventas y ludoteca_sesiones, con sus tablas de
+    archivo (todo el historial, o desde la fecha indicada), en una sola
+    transaccion. Sirve para el llenado inicial y para corregir diferencias.
+    """
+    ventas = origen("ventas", incluir_archivo=True)
+    sesiones = origen("ludoteca_sesiones", incluir_archivo=True)
+    filtro_ventas = "WHERE fecha_venta >= %s" if desde else ""
+    filtro_sesiones = "AND hora_fin >= %s" if desde else ""
+    filtro_resumen = "WHERE fecha >= %s" if desde else ""
+    params = (desde,) if desde else ()
+
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        for tabla in ("resumen_ventas_juego", "resumen_ventas_cliente", "resumen_ludoteca_juego"):
+            cur.execute(f"DELETE FROM {tabla} {filtro_resumen}", params)
+
+        for tabla, columna in (
+            ("resumen_ventas_juego", "juego_id"),
+            ("resumen_ventas_cliente", "cliente_id"),
+        ):
+            cur.execute(
+                f"""
+                INSERT INTO {tabla} (fecha, {columna}, ventas, unidades, ingresos)
+                SELECT DATE(fecha_venta), {columna}, COUNT(*), SUM(cantidad), SUM(precio_total)
+                FROM {ventas} {filtro_ventas}
+                GROUP BY DATE(fecha_venta), {columna}
+                """,
+                params,
+            )
+        cur.execute(
+            f"""
+            INSERT INTO resumen_ludoteca_juego (fecha, juego_id, sesiones, horas, ingresos)
+            SELECT DATE(hora_fin), juego_id, COUNT(*), SUM(duracion_horas), SUM(precio_total)
+            FROM {sesiones} WHERE hora_fin IS NOT NULL {filtro_sesiones}
+            GROUP BY DATE(hora_fin), juego_id
+            """,
+            params,
+        )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise Exception(f"Error al reconstruir los resúmenes: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _rango(desde, hasta, dias=30):
+    """Por defecto, los ultimos `dias` dias hasta hoy (inclusive)."""
+    hasta = hasta or date.today()
+    desde = desde or (date.fromisoformat(str(hasta)) - timedelta(days=dias - 1))
+    return desde, hasta
+
+
+def _consultar(query, params):
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(query, params)
+        return cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def ventas_por_juego(desde=None, hasta=None, limite=20):
+    """Juegos con mas ingresos por venta en el rango, leyendo solo resumen_ventas_juego."""
+    desde, hasta = _rango(desde, hasta)
+    filas = _consultar(
+        """
+        SELECT r.juego_id, j.titulo, SUM(r.ventas), SUM(r.unidades), SUM(r.ingresos)
+        FROM resumen_ventas_juego r LEFT JOIN juegos_mesa j ON j.id = r.juego_id
+        WHERE r.fecha BETWEEN %s AND %s
+        GROUP BY r.juego_id, j.titulo
+        HAVING SUM(r.ventas) > 0
+        ORDER BY SUM(r.ingresos) DESC LIMIT %s
+        """,
+        (desde, hasta, limite),
+    )
+    return [
+        {"juego_id": r[0], "titulo": r[1], "ventas": int(r[2]), "unidades": int(r[3]), "ingresos": float(r[4])}
+        for r in filas
+    ]
+
+
+def ventas_por_cliente(desde=None, hasta=None, limite=20):
+    """Clientes con mas compras en el rango, leyendo solo resumen_ventas_cliente."""
+    desde, hasta = _rango(desde, hasta)
+    filas = _consultar(
+        """
+        SELECT r.cliente_id, u.nombre, SUM(r.ventas), SUM(r.unidades), SUM(r.ingresos)
+        FROM resumen_ventas_cliente r LEFT JOIN usuarios u ON u.id = r.cliente_id
+        WHERE r.fecha BETWEEN %s AND %s
+        GROUP BY r.cliente_id, u.nombre
+        HAVING SUM(r.ventas) > 0
+        ORDER BY SUM(r.ingresos) DESC LIMIT %s
+        """,
+        (desde, hasta, limite),
+    )
+    return [
+        {"cliente_id": r[0], "nombre": r[1], "ventas": int(r[2]), "unidades": int(r[3]), "ingresos": float(r[4])}
+        for r in filas
+    ]
+
+
+def ludoteca_por_juego(desde=None, hasta=None, limite=20):
+    """Horas e ingresos de ludoteca por juego en el rango, leyendo solo resumen_ludoteca_juego."""
+    desde, hasta = _rango(desde, hasta)
+    filas = _consultar(
+        """
+        SELECT r.juego_id, j.titulo, SUM(r.sesiones), SUM(r.horas), SUM(r.ingresos)
+        FROM resumen_ludoteca_juego r LEFT JOIN juegos_mesa j ON j.id = r.juego_id
+        WHERE r.fecha BETWEEN %s AND %s
+        GROUP BY r.juego_id, j.titulo
+        HAVING SUM(r.sesiones) > 0
+        ORDER BY SUM(r.ingresos) DESC LIMIT %s
+        """,
+        (desde, hasta, limite),
+    )
+    return [
+        {"juego_id": r[0], "titulo": r[1], "sesiones": int(r[2]), "horas": float(r[3]), "ingresos": float(r[4])}
+        for r in filas
+    ]
+
+
+def ingresos_diarios(desde=None, hasta=None):
+    """[{fecha, ventas, ludoteca, total}, ...] por dia del rango, de los dos resumenes por juego."""
+    desde, hasta = _rango(desde, hasta)
+    dias = {}
+    for tabla, clave in (("resumen_ventas_juego", "ventas"), ("resumen_ludoteca_juego", "ludoteca")):
+        filas = _consultar(
+            f"SELECT fecha, SUM(ingresos) FROM {tabla} WHERE fecha BETWEEN %s AND %s GROUP BY fecha",
+            (desde, hasta),
+        )
+        for fecha, ingresos in filas:
+            dia = dias.setdefault(fecha, {"fecha": fecha, "ventas": 0.0, "ludoteca": 0.0})
+            dia[clave] = float(ingresos)
+    reporte = [dias[f] for f in sorted(dias)]
+    for dia in reporte:
+        dia["total"] = round(dia["ventas"] + dia["ludoteca"], 2)
+    return reporte
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resúmenes diarios de ventas y ludoteca.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_reconstruir = sub.add_parser("reconstruir", help="Recalcula los resúmenes desde las tablas base")
+    p_reconstruir.add_argument("--desde", help="Solo desde esta fecha (AAAA-MM-DD)")
+    p_diario = sub.add_parser("diario", help="Muestra los ingresos por día")
+    p_diario.add_argument("--desde", help="Fecha inicial (AAAA-MM-DD)")
+    p_diario.add_argument("--hasta", help="Fecha final (AAAA-MM-DD)")
+    args = parser.parse_args(argv)
+
+    if args.comando == "reconstruir":
+        reconstruir(args.desde)
+        print("Resúmenes reconstruidos.")
+        return 0
+
+    for dia in ingresos_diarios(args.desde, args.hasta):
+        print(f"{dia['fecha']}  ventas ${dia['ventas']:10.2f}  ludoteca ${dia['ludoteca']:10.2f}  total ${dia['total']:10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Sentencias preparadas por conexion para las consultas mas frecuentes.
+
+cursor_preparado(conn) se usa igual que conn.cursor(), pero cada SQL distinto
+se prepara una sola vez en el servidor por conexion fisica y las llamadas
+siguientes solo envian los parametros (protocolo binario, sin reconvertir el
+texto del resultado). Con el conector en C (DB_USE_PURE=0, por defecto) la
+conversion de filas tambien se hace en C.
+
+En SQLite no hace falta: sqlite3 ya guarda las sentencias compiladas por
+conexion, y cursor_preparado() entrega un cursor normal.
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import instrumentacion
+from db_connection import DB_BACKEND
+
+
+PREPARADAS = os.getenv("DB_PREPARADAS", "1").lower() in ("1", "true", "si")
+# Sentencias preparadas que se mantienen abiertas por conexion (LRU)
+MAX_POR_CONEXION = int(os.getenv("DB_PREPARADAS_MAX", 32))
+
+# conexion fisica -> OrderedDict(sql -> cursor preparado). Al cerrarse o
+# reciclarse la conexion su entrada desaparece y el servidor libera las sentencias.
+_por_conexion = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _cursor_para(cruda, sql):
+    # Cada conexion la usa un solo hilo a la vez; el lock protege el diccionario global
+    with _lock:
+        cursores = _por_conexion.get(cruda)
+        if cursores is None:
+            cursores = _por_conexion[cruda] = OrderedDict()
+    entrada = cursores.get(sql)
+    if entrada is None:
+        entrada = (cruda.cursor(prepared=True), sql)
+        cursores[sql] = entrada
+        while len(cursores) > MAX_POR_CONEXION:
+            _, (viejo, _) = cursores.popitem(last=False)
+            try:
+                viejo.close()
+            except Exception:
+                pass
+    else:
+        cursores.move_to_end(sql)
+    return entrada
+
+
+class CursorPreparado:
+    """
+    Cursor que ejecuta cada SQL con la sentencia preparada de la conexion. El
+    resultado se lee completo al ejecutar (son consultas de pocas filas), asi la
+    conexion queda libre para la siguiente sentencia. close() no cierra las
+    sentencias: quedan listas para la proxima llamada.
+    """
+
+    def __init__(self, cruda):
+        self._cruda = cruda
+        self._filas = []
+        self._pos = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def execute(self, sql, params=()):
+        cur, sql_preparado = _cursor_para(self._cruda, sql)
+        if instrumentacion.activa:
+            cur = instrumentacion.CursorInstrumentado(cur)
+        # El conector reusa la sentencia solo si recibe el mismo objeto str
+        cur.execute(sql_preparado, tuple(params))
+        self.description = cur.description
+        self._filas = cur.fetchall() if cur.description else []
+        self._pos = 0
+        self.rowcount = cur.rowcount
+        self.lastrowid = cur.lastrowid
+
+    def fetchone(self):
+        if self._pos >= len(self._filas):
+            return None
+        fila = self._filas[self._pos]
+        self._pos += 1
+        return fila
+
+    def fetchmany(self, size=1):
+        filas = self._filas[self._pos : self._pos + size]
+        self._pos += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._filas[self._pos :]
+        self._pos = len(self._filas)
+        return filas
+
+    def close(self):
+        self._filas = []
+
+
+def cursor_preparado(conn):
+    """
+    Cursor para las consultas calientes de los modelos. Con MySQL usa sentencias
+    preparadas por conexion; con SQLite o DB_PREPARADAS=0, un cursor normal.
+    """
+    if not PREPARADAS or DB_BACKEND != "mysql":
+        return conn.cursor()
+    return CursorPreparado(conn.conexion_cruda())
+
+
+def estadisticas():
+    """Cantidad de conexiones con sentencias preparadas y total de sentencias abiertas."""
+    conexiones = list(_por_conexion.values())
+    return {
+        "conexiones": len(conexiones),
+        "sentencias": sum(len(c) for c in conexiones),
+        "max_por_conexion": MAX_POR_CONEXION,
+    }
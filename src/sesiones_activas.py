@@ -0,0 +1,156 @@
+import threading
+from datetime import datetime, timedelta
+
+from db_connection import al_confirmar, get_conn
+
+
+class SesionActiva:
+    """Datos en memoria de una sesion de ludoteca en curso."""
+
+    def __init__(self, id_, juego_id, titulo_juego, precio_hora, vendedor_id, hora_inicio):
+        self.id = id_
+        self.juego_id = juego_id
+        self.titulo_juego = titulo_juego
+        self.precio_hora = precio_hora
+        self.vendedor_id = vendedor_id
+        self.hora_inicio = hora_inicio
+        self.participantes = []
+
+
+class RegistroSesionesActivas:
+    """
+    Sesiones de ludoteca en curso, cargadas de la BD una sola vez (en el primer
+    uso) y mantenidas despues por Tienda al iniciar, agregar participantes y
+    finalizar. El tiempo transcurrido y el costo acumulado se calculan en memoria
+    con el reloj de la BD, estimado con el desfase medido al cargar.
+    Los cambios hechos desde otra terminal se ven al llamar refrescar().
+    """
+
+    def __init__(self):
+        self._sesiones = {}
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._desfase = None  # hora de la BD - hora local
+
+    def _asegurar_cargado(self):
+        if not self._cargado:
+            self.refrescar()
+
+    def refrescar(self):
+        """Relee de la BD las sesiones activas y el desfase de reloj."""
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT NOW()")
+            desfase = cur.fetchone()[0] - datetime.now()
+
+            cur.execute(
+                """
+                SELECT s.id, s.juego_id, j.titulo, j.precio_ludoteca_hora, s.vendedor_id, s.hora_inicio
+                FROM ludoteca_sesiones s JOIN juegos_mesa j ON j.id = s.juego_id
+                WHERE s.hora_fin IS NULL
+                """
+            )
+            sesiones = {
+                r[0]: SesionActiva(r[0], r[1], r[2], float(r[3]), r[4], r[5])
+                for r in cur.fetchall()
+            }
+
+            if sesiones:
+                marcadores = ", ".join(["%s"] * len(sesiones))
+                cur.execute(
+                    f"""
+                    SELECT p.sesion_id, u.nombre
+                    FROM ludoteca_participantes p JOIN usuarios u ON u.id = p.usuario_id
+                    WHERE p.sesion_id IN ({marcadores})
+                    ORDER BY p.id
+                    """,
+                    tuple(sesiones),
+                )
+                for sesion_id, nombre in cur.fetchall():
+                    sesiones[sesion_id].participantes.append(nombre)
+        finally:
+            cur.close()
+            conn.close()
+
+        with self._lock:
+            self._sesiones = sesiones
+            self._desfase = desfase
+            self._cargado = True
+
+    # --- Cambios (se aplican al confirmar la transaccion en curso) ---
+
+    def agregar(self, sesion, titulo_juego, precio_hora):
+        """Registra una sesion recien iniciada (LudotecaSesion)."""
+        activa = SesionActiva(
+            sesion.id, sesion.juego_id, titulo_juego, float(precio_hora),
+            sesion.vendedor_id, sesion.hora_inicio,
+        )
+        al_confirmar(lambda: self._guardar(activa))
+
+    def agregar_participante(self, sesion_id, nombre):
+        al_confirmar(lambda: self._agregar_participante(sesion_id, nombre))
+
+    def quitar(self, *ids):
+        """Saca del registro las sesiones finalizadas."""
+        al_confirmar(lambda: self._quitar(ids))
+
+    def _guardar(self, activa):
+        with self._lock:
+            # Sin cargar todavia: la carga inicial ya la leera de la BD
+            if self._cargado:
+                self._sesiones[activa.id] = activa
+
+    def _agregar_participante(self, sesion_id, nombre):
+        with self._lock:
+            activa = self._sesiones.get(sesion_id)
+            if activa is not None:
+                activa.participantes.append(nombre)
+
+    def _quitar(self, ids):
+        with self._lock:
+            for sesion_id in ids:
+                self._sesiones.pop(sesion_id, None)
+
+    # --- Consultas (sin ir a la BD una vez cargado) ---
+
+    def ahora_bd(self):
+        """Hora actual estimada de la BD."""
+        self._asegurar_cargado()
+        return datetime.now() + self._desfase
+
+    def listar(self):
+        """
+        [{id, juego_id, titulo_juego, vendedor_id, hora_inicio, participantes,
+        transcurrido, horas, costo}, ...] de las sesiones activas, la mas antigua
+        primero. El costo se calcula igual que al finalizar (horas redondeadas a 2
+        decimales por el precio por hora).
+        """
+        ahora = self.ahora_bd()
+        with self._lock:
+            sesiones = sorted(self._sesiones.values(), key=lambda s: s.hora_inicio)
+            resultado = []
+            for s in sesiones:
+                transcurrido = max(ahora - s.hora_inicio, timedelta(0))
+                horas = round(transcurrido.total_seconds() / 3600, 2)
+                resultado.append(
+                    {
+                        "id": s.id,
+                        "juego_id": s.juego_id,
+                        "titulo_juego": s.titulo_juego,
+                        "vendedor_id": s.vendedor_id,
+                        "hora_inicio": s.hora_inicio,
+                        "participantes": list(s.participantes),
+                        "transcurrido": transcurrido,
+                        "horas": horas,
+                        "costo": round(horas * s.precio_hora, 2),
+                    }
+                )
+        return resultado
+
+    def __len__(self):
+        self._asegurar_cargado()
+        return len(self._sesiones)
+
+
+sesiones_activas = RegistroSesionesActivas()
@@ -0,0 +1,215 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+def ordenar_filas(filas, columna, descendente=False):
+    """
+    Retorna las filas ordenadas por `columna`, con los None al final en ambos
+    sentidos. Numeros y textos no se comparan entre si: se agrupan por tipo.
+    """
+    con_valor = [f for f in filas if f[columna] is not None]
+    con_valor.sort(key=lambda f: (str(type(f[columna])), f[columna]), reverse=descendente)
+    return con_valor + [f for f in filas if f[columna] is None]
+
+
+class TablaVirtual(ttk.Frame):
+    """
+    Tabla para listados grandes. Solo existen tantas filas de Treeview como
+    caben en pantalla: al desplazarse se reescriben sus valores con la ventana
+    visible de los datos ya cargados. Las paginas se piden a la BD (en segundo
+    plano) cuando el usuario se acerca al final de lo cargado, y el orden por
+    columna se hace en memoria sobre lo ya cargado, sin volver a consultar.
+    """
+
+    ALTO_FILA = 20
+
+    def __init__(self, parent, ejecutor, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.ejecutor = ejecutor
+
+        self.lbl_titulo = ttk.Label(self, text="", font=("Consolas", 10, "bold"))
+        self.lbl_titulo.pack(side=tk.TOP, fill=tk.X)
+
+        ttk.Style().configure("Treeview", rowheight=self.ALTO_FILA)
+        self.tree = ttk.Treeview(self, show="headings", selectmode="browse")
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.sb = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._desplazar)
+        self.sb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Configure>", lambda e: self._ajustar_visibles(e.height))
+        self.tree.bind("<MouseWheel>", lambda e: self._mover(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self._mover(-3))
+        self.tree.bind("<Button-5>", lambda e: self._mover(3))
+        self.tree.bind("<Up>", lambda e: self._mover(-1))
+        self.tree.bind("<Down>", lambda e: self._mover(1))
+        self.tree.bind("<Prior>", lambda e: self._mover(-self._visibles))
+        self.tree.bind("<Next>", lambda e: self._mover(self._visibles))
+
+        self._filas = []
+        self._formatos = []
+        self._offset = 0
+        self._visibles = 20
+        self._ranuras = []
+        self._cargar_pagina = None
+        self._siguiente = None
+        self._cargando = False
+        self._generacion = 0
+        self._orden = None  # (indice_columna, descendente)
+        self._vacio = ""
+
+    # --- API ---
+
+    def mostrar(self, titulo, columnas, cargar_pagina, vacio="Sin resultados."):
+        """
+        columnas: [(encabezado, ancho, formato o None), ...]
+        cargar_pagina(cursor) -> (filas, siguiente_cursor); se ejecuta en un hilo
+        de fondo y debe retornar tuplas ya armadas (sin tocar widgets).
+        """
+        self._generacion += 1
+        self.lbl_titulo.config(text=titulo)
+        self._configurar_columnas(columnas)
+        self._filas = []
+        self._offset = 0
+        self._orden = None
+        self._siguiente = None
+        self._cargar_pagina = cargar_pagina
+        self._vacio = vacio
+        self._cargando = False
+        self._render()
+        self._pedir_pagina(None)
+
+    def mostrar_mensaje(self, titulo, lineas):
+        """Muestra texto simple (errores o avisos) en una sola columna."""
+        self._generacion += 1
+        self.lbl_titulo.config(text=titulo)
+        self._configurar_columnas([("", 700, None)])
+        self._filas = [(linea,) for linea in lineas]
+        self._offset = 0
+        self._siguiente = None
+        self._cargar_pagina = None
+        self._cargando = False
+        self._render()
+
+    # --- Carga por paginas ---
+
+    def _pedir_pagina(self, cursor):
+        self._cargando = True
+        generacion = self._generacion
+        self.ejecutor.enviar(
+            "listado",
+            self._cargar_pagina,
+            cursor,
+            al_terminar=lambda res: self._recibir_pagina(generacion, res),
+            al_error=lambda e: self._error_pagina(generacion, e),
+            descripcion="Cargando filas...",
+            reemplazar=True,
+        )
+
+    def _recibir_pagina(self, generacion, resultado):
+        if generacion != self._generacion:
+            return
+        filas, self._siguiente = resultado
+        self._cargando = False
+        self._filas.extend(filas)
+        if self._orden is not None:
+            self._aplicar_orden()
+        if not self._filas:
+            self.mostrar_mensaje(self.lbl_titulo.cget("text"), [self._vacio])
+            return
+        self._render()
+
+    def _error_pagina(self, generacion, error):
+        if generacion != self._generacion:
+            return
+        self._cargando = False
+        if self._filas:
+            self.lbl_titulo.config(text=f"{self.lbl_titulo.cget('text')} (error: {error})")
+        else:
+            self.mostrar_mensaje(self.lbl_titulo.cget("text"), [f"Error: {error}"])
+
+    def _quizas_cargar_mas(self):
+        # Se pide la siguiente pagina cuando falta menos de una pantalla por mostrar
+        if (
+            self._siguiente
+            and not self._cargando
+            and self._offset + 2 * self._visibles >= len(self._filas)
+        ):
+            self._pedir_pagina(self._siguiente)
+
+    # --- Ventana visible ---
+
+    def _configurar_columnas(self, columnas):
+        ids = [f"c{i}" for i in range(len(columnas))]
+        self.tree.delete(*self.tree.get_children())
+        self._ranuras = []
+        self.tree.configure(columns=ids)
+        self._formatos = []
+        for i, (encabezado, ancho, formato) in enumerate(columnas):
+            self.tree.heading(ids[i], text=encabezado, command=lambda i=i: self._ordenar(i))
+            self.tree.column(ids[i], width=ancho, stretch=True)
+            self._formatos.append(formato)
+
+    def _ajustar_visibles(self, alto):
+        # El alto incluye el encabezado de columnas (~1 fila)
+        visibles = max(1, alto // self.ALTO_FILA - 1)
+        if visibles != self._visibles:
+            self._visibles = visibles
+            self._render()
+
+    def _render(self):
+        while len(self._ranuras) < self._visibles:
+            self._ranuras.append(self.tree.insert("", tk.END, values=()))
+        while len(self._ranuras) > self._visibles:
+            self.tree.delete(self._ranuras.pop())
+
+        for i, ranura in enumerate(self._ranuras):
+            indice = self._offset + i
+            if indice < len(self._filas):
+                self.tree.item(ranura, values=self._formatear(self._filas[indice]))
+            else:
+                self.tree.item(ranura, values=())
+
+        total = max(len(self._filas), 1)
+        self.sb.set(self._offset / total, min(1.0, (self._offset + self._visibles) / total))
+        self._quizas_cargar_mas()
+
+    def _formatear(self, fila):
+        return tuple(
+            "" if v is None else (fmt(v) if fmt else v)
+            for v, fmt in zip(fila, self._formatos)
+        )
+
+    def _mover(self, filas):
+        self._ir_a(self._offset + filas)
+        return "break"
+
+    def _ir_a(self, offset):
+        maximo = max(0, len(self._filas) - self._visibles)
+        offset = min(max(0, int(offset)), maximo)
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+        else:
+            self._quizas_cargar_mas()
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self._ir_a(float(cantidad) * len(self._filas))
+        elif accion == "scroll":
+            paso = self._visibles if unidad == "pages" else 1
+            self._ir_a(self._offset + int(cantidad) * paso)
+
+    # --- Orden en memoria ---
+
+    def _ordenar(self, columna):
+        if not self._filas:
+            return
+        descendente = self._orden == (columna, False)
+        self._orden = (columna, descendente)
+        self._aplicar_orden()
+        self._offset = 0
+        self._render()
+
+    def _aplicar_orden(self):
+        columna, descendente = self._orden
+        self._filas = ordenar_filas(self._filas, columna, descendente)
@@ -1,11 +1,38 @@
+import contextlib
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import tkinter as tk
 import unittest
+from unittest import mock
+from datetime import date
 
 # Importar las clases de POO
 from db_connection import create_connection, close_connection
 from mysql_env import crear_tablas, insert_usuario
-from usuario import Usuario, hash_password
+from usuario import Usuario, hash_password, verificar_password
 from juego_mesa import JuegoMesa
 from venta import Venta
+from cache_catalogo import cache_juegos
+from indice_busqueda import indice_juegos
+from tienda import Tienda
+from ejecutor_gui import EjecutorTk
+from tabla_virtual import TablaVirtual, ordenar_filas
+import analitica
+import archivo
+import bench_tienda
+import exportar
+import db_connection
+import instrumentacion
+import migrar
+import sentencias
 
 # --- CONFIGURACIoN DE PRUEBA ---
 TEST_PASSWORD = "TestPassword123"
@@ -53,9 +80,15 @@ class TestTienda(unittest.TestCase):
         cursor.execute("DELETE FROM ludoteca_sesiones")
         cursor.execute("DELETE FROM ludoteca_participantes")
         cursor.execute("DELETE FROM juegos_mesa")
+        cursor.execute("DELETE FROM resumen_ventas_juego")
+        cursor.execute("DELETE FROM resumen_ventas_cliente")
+        cursor.execute("DELETE FROM resumen_ludoteca_juego")
         conn.commit()
         cursor.close()
         close_connection(conn)
+        # Los DELETE directos no pasan por los modelos: vaciar la cache y el indice a mano
+        cache_juegos.limpiar()
+        indice_juegos.invalidar()
 
     # --- PRUEBA 1: Probamos los CRUD ---
     def test_1_crud_juego_mesa(self):
@@ -127,6 +160,901 @@ class TestTienda(unittest.TestCase):
         
         print("\nPrueba 4 (Seguridad): Realizada con exito - Autenticacion correcta y rechazo de claves erroneas.")
 
+    # --- PRUEBA 5: Venta sin stock no toca el inventario ---
+    def test_5_venta_sin_stock_atomica(self):
+        """Prueba que una venta rechazada por stock no descuente nada."""
+        juego = JuegoMesa.crear("Venta Atomica", "F", 2, 10.00, 1.00)
+
+        with self.assertRaisesRegex(Exception, "Inventario insuficiente"):
+            Venta.crear(TEST_CLIENTE_ID, juego.id, 3)
+
+        juego_actualizado = JuegoMesa.buscar_por_id(juego.id)
+        self.assertEqual(juego_actualizado.stock, 2)
+
+        # Vender justo lo que queda deja el stock en cero
+        Venta.crear(TEST_CLIENTE_ID, juego.id, 2)
+        self.assertEqual(JuegoMesa.buscar_por_id(juego.id).stock, 0)
+
+        print("\nPrueba 5 (Stock Atomico): Realizada con exito - El descuento condicional evita sobreventa.")
+
+    # --- PRUEBA 6: Carrito todo o nada ---
+    def test_6_carrito_todo_o_nada(self):
+        """Prueba que el carrito venda todas las lineas o ninguna."""
+        j1 = JuegoMesa.crear("Carrito A", "F", 5, 10.00, 1.00)
+        j2 = JuegoMesa.crear("Carrito B", "F", 1, 30.00, 1.00)
+
+        # La segunda linea no tiene stock: no se debe vender nada
+        with self.assertRaisesRegex(Exception, "Inventario insuficiente"):
+            Venta.crear_carrito(TEST_CLIENTE_ID, [("Carrito A", 2), ("Carrito B", 2)])
+        self.assertEqual(JuegoMesa.buscar_por_id(j1.id).stock, 5)
+
+        # El mismo juego con otras mayusculas suma contra el mismo stock
+        with self.assertRaisesRegex(Exception, "Inventario insuficiente"):
+            Venta.crear_carrito(TEST_CLIENTE_ID, [("Carrito A", 3), ("carrito a", 3)])
+        self.assertEqual(JuegoMesa.buscar_por_id(j1.id).stock, 5)
+
+        ventas = Venta.crear_carrito(
+            TEST_CLIENTE_ID, [("Carrito A", 2), ("Carrito B", 1), ("CARRITO A", 1)]
+        )
+        self.assertEqual(len(ventas), 2)
+        self.assertEqual(sum(v.precio_total for v in ventas), 60.00)  # 3*10 + 1*30
+        self.assertEqual(JuegoMesa.buscar_por_id(j1.id).stock, 2)
+        self.assertEqual(JuegoMesa.buscar_por_id(j2.id).stock, 0)
+
+        print("\nPrueba 6 (Carrito): Realizada con exito - El carrito se confirma completo o no se confirma.")
+
+    # --- PRUEBA 7: Importacion masiva del catalogo ---
+    def test_7_importar_lote(self):
+        """Prueba el upsert por titulo y el conteo del reporte de importacion."""
+        JuegoMesa.crear("Import A", "Viejo", 1, 10.00, 1.00)
+        filas = [
+            {"titulo": "Import A", "fabricante": "Nuevo", "stock": "7", "precio_venta": "12.5", "precio_ludoteca_hora": "2"},
+            {"titulo": "Import B", "fabricante": "F", "stock": "3", "precio_venta": "20", "precio_ludoteca_hora": "1.5"},
+            {"titulo": "", "fabricante": "F", "stock": "1", "precio_venta": "1", "precio_ludoteca_hora": "1"},
+            {"titulo": "Import C", "fabricante": "F", "stock": "-2", "precio_venta": "1", "precio_ludoteca_hora": "1"},
+        ]
+
+        reporte = JuegoMesa.importar_lote(iter(filas), tam_lote=1)
+        self.assertEqual(reporte["insertados"], 1)
+        self.assertEqual(reporte["actualizados"], 1)
+        self.assertEqual(reporte["rechazados"], 2)
+
+        juego_a = JuegoMesa.buscar_por_titulo("Import A")
+        self.assertEqual(juego_a.fabricante, "Nuevo")
+        self.assertEqual(juego_a.stock, 7)
+        self.assertIsNotNone(JuegoMesa.buscar_por_titulo("Import B"))
+
+        print("\nPrueba 7 (Importacion): Realizada con exito - Upsert por lotes y filas invalidas rechazadas.")
+
+    # --- PRUEBA 8: Cache del catalogo ---
+    def test_8_cache_catalogo(self):
+        """Prueba que la cache sirva aciertos y se invalide con las escrituras."""
+        juego = JuegoMesa.crear("Cache Test", "F", 4, 10.00, 1.00)
+
+        JuegoMesa.buscar_por_id(juego.id)
+        aciertos = cache_juegos.aciertos
+        self.assertEqual(JuegoMesa.buscar_por_titulo("Cache Test").id, juego.id)
+        self.assertEqual(cache_juegos.aciertos, aciertos + 1)
+
+        # Un cambio de stock y de precio no debe dejar datos viejos
+        Venta.crear(TEST_CLIENTE_ID, juego.id, 1)
+        self.assertEqual(JuegoMesa.buscar_por_id(juego.id).stock, 3)
+        juego.modificar_datos("Cache Test", "F", 15.00, 1.00)
+        self.assertEqual(JuegoMesa.buscar_por_titulo("Cache Test").precio_venta, 15.00)
+
+        # Lo leido dentro de una transaccion deshecha no queda en la cache
+        with self.assertRaises(Exception):
+            with Tienda.transaccion():
+                Venta.crear(TEST_CLIENTE_ID, juego.id, 2)
+                self.assertEqual(JuegoMesa.buscar_por_id(juego.id).stock, 1)
+                raise Exception("deshacer")
+        self.assertEqual(JuegoMesa.buscar_por_id(juego.id).stock, 3)
+
+        print("\nPrueba 8 (Cache): Realizada con exito - Aciertos contados e invalidacion en escrituras.")
+
+    # --- PRUEBA 9: Paginacion por clave ---
+    def test_9_paginacion_catalogo(self):
+        """Prueba que las paginas cubran el catalogo sin repetir ni saltar juegos."""
+        for i in range(5):
+            JuegoMesa.crear(f"Pagina {i}", "F", 1, 10.00, 1.00)
+
+        titulos = []
+        cursor = None
+        while True:
+            juegos, cursor = JuegoMesa.listar_pagina(limite=2, cursor=cursor)
+            titulos += [j.titulo for j in juegos]
+            if cursor is None:
+                break
+
+        self.assertEqual(titulos, [f"Pagina {i}" for i in range(5)])
+        self.assertEqual([j.titulo for j in JuegoMesa.iterar_todos(tam_lote=2)], titulos)
+
+        print("\nPrueba 9 (Paginacion): Realizada con exito - Paginas por clave y lectura por bloques.")
+
+    # --- PRUEBA 10: Precarga de relaciones ---
+    def test_10_prefetch_ventas(self):
+        """Prueba que las ventas listadas traigan su juego y cliente precargados."""
+        juego = JuegoMesa.crear("Prefetch Test", "F", 5, 10.00, 1.00)
+        Venta.crear(TEST_CLIENTE_ID, juego.id, 1)
+        Venta.crear(TEST_CLIENTE_ID, juego.id, 2)
+
+        ventas = Venta.listar_por_cliente(TEST_CLIENTE_ID, prefetch=["juego", "cliente"])
+        self.assertEqual(len(ventas), 2)
+        for v in ventas:
+            self.assertEqual(v.juego.titulo, "Prefetch Test")
+            self.assertEqual(v.cliente.nombre, "ClientTest")
+
+        print("\nPrueba 10 (Prefetch): Realizada con exito - Relaciones resueltas con consultas IN.")
+
+    # --- PRUEBA 11: Unidad de trabajo ---
+    def test_11_transaccion_compartida(self):
+        """Prueba que un error dentro de Tienda.transaccion() deshaga todas las operaciones."""
+        juego = JuegoMesa.crear("Transaccion Test", "F", 5, 10.00, 1.00)
+
+        with self.assertRaises(RuntimeError):
+            with Tienda.transaccion():
+                Venta.crear(TEST_CLIENTE_ID, juego.id, 2)
+                Venta.crear(TEST_CLIENTE_ID, juego.id, 1)
+                raise RuntimeError("cancelar")
+
+        self.assertEqual(JuegoMesa.buscar_por_id(juego.id).stock, 5)
+        self.assertEqual(Venta.listar_por_cliente(TEST_CLIENTE_ID), [])
+
+        print("\nPrueba 11 (Unidad de trabajo): Realizada con exito - Un solo commit para operaciones anidadas.")
+
+    # --- PRUEBA 12: Hash de contraseñas ---
+    def test_12_hash_y_rehash_password(self):
+        """Prueba que un hash viejo (sha256) se acepte y se migre a pbkdf2 al iniciar sesion."""
+        legado = hashlib.sha256(TEST_PASSWORD.encode("utf-8")).hexdigest()
+        conn = create_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM usuarios WHERE nombre IN ('LegadoTest', 'LoteTest1', 'LoteTest2')")
+        conn.commit()
+        cursor.close()
+        insert_usuario(conn, "LegadoTest", "cliente", legado)
+        close_connection(conn)
+
+        usuario = Usuario.autenticar("LegadoTest", TEST_PASSWORD)
+        self.assertIsNotNone(usuario)
+        self.assertTrue(usuario.password_hash.startswith("pbkdf2_sha256$"))
+        self.assertIsNotNone(Usuario.autenticar("LegadoTest", TEST_PASSWORD))
+        self.assertIsNone(Usuario.autenticar("LegadoTest", "otra"))
+        self.assertFalse(verificar_password(TEST_PASSWORD, "pbkdf2_sha256$roto"))
+        self.assertFalse(verificar_password(TEST_PASSWORD, "pbkdf2_sha256$x$no-base64$!!"))
+
+        filas = [
+            {"nombre": "LoteTest1", "role": "cliente", "password": "uno"},
+            {"nombre": "LoteTest2", "role": "cliente", "password": "dos"},
+            {"nombre": "", "password": "x"},
+            {"nombre": "lotetest1", "role": "cliente", "password": "tres"},
+        ]
+        reporte = Usuario.importar_lote(filas, procesos=2)
+        self.assertEqual((reporte["insertados"], reporte["rechazados"]), (2, 2))
+        self.assertEqual(reporte["errores"][-1], (4, "nombre repetido: 'lotetest1'"))
+        self.assertIsNotNone(Usuario.autenticar("LoteTest1", "uno"))
+        self.assertEqual(Usuario.importar_lote(filas[:2], procesos=2)["existentes"], 2)
+        self.assertIsNotNone(Usuario.autenticar("LoteTest2", "dos"))
+
+        print("\nPrueba 12 (Contraseñas): Realizada con exito - Hash con sal, rehash e importacion en lote.")
+
+    # --- PRUEBA 13: Resumenes diarios ---
+    def test_13_resumenes_ventas(self):
+        """Prueba que los resumenes se mantengan al vender, eliminar y reconstruir."""
+        tienda = Tienda()
+        juego = JuegoMesa.crear("Resumen Test", "F", 10, 10.00, 1.00)
+        venta = Venta.crear(TEST_CLIENTE_ID, juego.id, 2)
+        Venta.crear_carrito(TEST_CLIENTE_ID, [("Resumen Test", 3)])
+
+        reporte = tienda.reporte_ventas_por_juego()
+        self.assertEqual((reporte[0]["ventas"], reporte[0]["unidades"]), (2, 5))
+        self.assertAlmostEqual(reporte[0]["ingresos"], 50.00)
+        self.assertAlmostEqual(tienda.reporte_ventas_por_cliente()[0]["ingresos"], 50.00)
+
+        Venta.eliminar(venta.id)
+        self.assertEqual(tienda.reporte_ventas_por_juego()[0]["unidades"], 3)
+
+        tienda.reconstruir_resumenes()
+        self.assertEqual(tienda.reporte_ventas_por_juego()[0]["unidades"], 3)
+        self.assertAlmostEqual(tienda.reporte_ingresos_diarios()[-1]["ventas"], 30.00)
+
+        print("\nPrueba 13 (Resumenes): Realizada con exito - Reportes sin recorrer el historial.")
+
+    # --- PRUEBA 14: Analitica columnar ---
+    def test_14_analitica_columnar(self):
+        """Prueba que el cargador columnar lea las ventas y agregue igual que la BD."""
+        juego = JuegoMesa.crear("Analitica Test", "F", 20, 10.00, 1.00)
+        Venta.crear(TEST_CLIENTE_ID, juego.id, 2)
+        Venta.crear_carrito(TEST_CLIENTE_ID, [("Analitica Test", 3)])
+
+        tabla = analitica.cargar_ventas(con_juego=True, tam_bloque=1)
+        self.assertEqual(len(tabla), 2)
+        self.assertEqual(int(tabla["cantidad"].sum()), 5)
+        juegos, ingresos = analitica.sumar_por(tabla["juego_id"], tabla["precio_total"])
+        self.assertEqual(juegos.tolist(), [juego.id])
+        self.assertAlmostEqual(float(ingresos[0]), 50.00)
+        self.assertAlmostEqual(float(analitica.ingresos_por_hora_del_dia(tabla).sum()), 50.00)
+        self.assertEqual(tabla["precio_venta"].tolist(), [10.00, 10.00])
+
+        print("\nPrueba 14 (Analitica): Realizada con exito - Ventas cargadas en columnas por bloques.")
+
+    # --- PRUEBA 15: Cierre de sesiones en lote ---
+    def test_15_finalizar_sesiones(self):
+        """Prueba que varias sesiones se cierren en una sentencia con el precio del juego."""
+        tienda = Tienda()
+        JuegoMesa.crear("Ludoteca Test", "F", 1, 10.00, 4.00)
+        s1 = tienda.iniciar_sesion_juego("Ludoteca Test", TEST_VENDEDOR_ID)
+        s2 = tienda.iniciar_sesion_juego("Ludoteca Test", TEST_VENDEDOR_ID)
+
+        cerradas = tienda.finalizar_sesiones([s1.id, s2.id, s1.id])
+        self.assertEqual([s.id for s in cerradas], [s1.id, s2.id])
+        for s in cerradas:
+            self.assertIsNotNone(s.hora_fin)
+            self.assertEqual(s.titulo_juego, "Ludoteca Test")
+            self.assertAlmostEqual(s.precio_total, round(s.duracion_horas * 4.00, 2))
+
+        # Ya cerradas: no se vuelven a facturar
+        self.assertEqual(tienda.finalizar_sesiones("todas_activas"), [])
+        with self.assertRaises(Exception):
+            tienda.finalizar_sesion_juego(s1.id)
+
+        print("\nPrueba 15 (Cierre en lote): Realizada con exito - Un UPDATE con el reloj de la BD.")
+
+    # --- PRUEBA 16: Registro de sesiones activas ---
+    def test_16_sesiones_activas(self):
+        """Prueba que el registro en memoria siga el ciclo de vida de las sesiones."""
+        tienda = Tienda()
+        JuegoMesa.crear("Mesa Test", "F", 1, 10.00, 6.00)
+        tienda.refrescar_sesiones_activas()
+        sesion = tienda.iniciar_sesion_juego("Mesa Test", TEST_VENDEDOR_ID)
+        tienda.registrar_participante(sesion.id, "ClientTest")
+
+        activas = tienda.listar_sesiones_activas()
+        self.assertEqual([s["id"] for s in activas], [sesion.id])
+        self.assertEqual(activas[0]["participantes"], ["ClientTest"])
+        self.assertAlmostEqual(activas[0]["costo"], round(activas[0]["horas"] * 6.00, 2))
+
+        tienda.finalizar_sesion_juego(sesion.id)
+        self.assertEqual(tienda.listar_sesiones_activas(), [])
+
+        print("\nPrueba 16 (Mesas activas): Realizada con exito - Costo en vivo sin consultar la BD.")
+
+    # --- PRUEBA 17: Instrumentacion de consultas ---
+    def test_17_instrumentacion(self):
+        """Prueba que se midan las consultas por sentencia y que el log de lentas oculte parametros."""
+        juego = JuegoMesa.crear("Instrumentado Test", "F", 5, 10.00, 1.00)
+        instrumentacion.reiniciar()
+        instrumentacion.activar(umbral_lentas_ms=0)
+        try:
+            with self.assertLogs("consultas_lentas", level="WARNING") as log:
+                cache_juegos.limpiar()
+                JuegoMesa.buscar_por_titulo("Instrumentado Test")
+        finally:
+            instrumentacion.desactivar()
+            instrumentacion.UMBRAL_LENTAS_MS = 200
+
+        consultas = db_connection.stats()["consultas"]
+        select = next(c for c in consultas if c["sql"].startswith("SELECT id, titulo"))
+        self.assertEqual((select["llamadas"], select["filas"]), (1, 1))
+        self.assertIn("juego_mesa.JuegoMesa.buscar_por_titulo", select["llamadores"])
+        self.assertFalse(any("Instrumentado Test" in linea for linea in log.output))
+        self.assertTrue(any("<str:18>" in linea for linea in log.output))
+        self.assertEqual(JuegoMesa.buscar_por_id(juego.id).titulo, "Instrumentado Test")
+
+        print("\nPrueba 17 (Instrumentacion): Realizada con exito - Tiempos por sentencia y log sin datos.")
+
+    # --- PRUEBA 18: Sentencias preparadas ---
+    def test_18_sentencias_preparadas(self):
+        """Prueba que cada SQL se prepare una vez por conexion y se reuse en las llamadas siguientes."""
+        juego = JuegoMesa.crear("Preparado Test", "F", 5, 10.00, 1.00)
+        sql = "SELECT titulo, stock FROM juegos_mesa WHERE id = %s"
+        conn = db_connection.get_conn()
+        try:
+            cruda = conn.conexion_cruda()
+            for _ in range(3):
+                cur = sentencias.CursorPreparado(cruda)
+                cur.execute(sql, (juego.id,))
+                self.assertEqual(tuple(cur.fetchone()), ("Preparado Test", 5))
+                self.assertIsNone(cur.fetchone())
+                cur.close()
+            self.assertEqual(list(sentencias._por_conexion[cruda]), [sql])
+        finally:
+            conn.close()
+
+        # Los modelos dan el mismo resultado con y sin sentencias preparadas
+        cache_juegos.limpiar()
+        self.assertEqual(JuegoMesa.buscar_por_id(juego.id).titulo, "Preparado Test")
+
+        print("\nPrueba 18 (Sentencias preparadas): Realizada con exito - Una preparacion por SQL y conexion.")
+
+    # --- PRUEBA 19: Filas compactas ---
+    def test_19_filas_compactas(self):
+        """Prueba que los modelos no tengan __dict__ y que los bloques crudos coincidan con los objetos."""
+        juego = JuegoMesa.crear("Compacto Test", "F", 50, 10.00, 1.00)
+        Venta.crear(TEST_CLIENTE_ID, juego.id, 2)
+        Venta.crear(TEST_CLIENTE_ID, juego.id, 3)
+
+        ventas = Venta.listar_por_cliente(TEST_CLIENTE_ID, prefetch=["juego"])
+        self.assertFalse(hasattr(ventas[0], "__dict__"))
+        self.assertEqual(ventas[0].juego.titulo, "Compacto Test")
+        self.assertIn("Venta ID", ventas[0].descripcion())
+        with self.assertRaises(AttributeError):
+            ventas[0].atributo_inventado = 1
+
+        filas = [r for bloque in Venta.bloques_por_cliente(TEST_CLIENTE_ID, tam_lote=1) for r in bloque]
+        self.assertEqual(len(filas[0]), len(Venta.CAMPOS))
+        objetos = list(Venta.iterar_por_cliente(TEST_CLIENTE_ID))
+        self.assertEqual([r[0] for r in filas], [v.id for v in objetos])
+
+        print("\nPrueba 19 (Filas compactas): Realizada con exito - Modelos con __slots__ y bloques sin objetos.")
+
+    # --- PRUEBA 20: Busqueda en el catalogo ---
+    def test_20_busqueda_catalogo(self):
+        """Prueba la busqueda por prefijo sin acentos, la tolerancia a errores y la sincronizacion con escrituras."""
+        tienda = Tienda()
+        catan = JuegoMesa.crear("Catán: El Juego", "Devir", 5, 40.00, 4.00)
+        JuegoMesa.crear("Carcassonne", "Devir", 5, 30.00, 3.00)
+        JuegoMesa.crear("Dixit", "Libellud", 5, 25.00, 2.00)
+
+        self.assertEqual(tienda.sugerir_juegos("catan")[0]["titulo"], "Catán: El Juego")
+        self.assertEqual([s["titulo"] for s in tienda.sugerir_juegos("CA")], ["Carcassonne", "Catán: El Juego"])
+        self.assertEqual([s["titulo"] for s in tienda.sugerir_juegos("juego cat")], ["Catán: El Juego"])
+        self.assertEqual(len(tienda.sugerir_juegos("devir")), 2)
+        self.assertEqual(tienda.sugerir_juegos("cataan")[0]["titulo"], "Catán: El Juego")
+        self.assertEqual(tienda.buscar_juego("catan el juego").id, catan.id)
+
+        # Las escrituras por los modelos actualizan el indice sin recargarlo
+        tienda.modificar_juego_datos(catan.id, "Catán Junior", "Devir", 35.00, 3.00)
+        JuegoMesa.crear("Dobble", "Asmodee", 5, 15.00, 1.00)
+        self.assertEqual([s["titulo"] for s in tienda.sugerir_juegos("cat")], ["Catán Junior"])
+        self.assertEqual([j.titulo for j in tienda.buscar_juegos("d", limite=2)], ["Dixit", "Dobble"])
+        JuegoMesa.eliminar(catan.id)
+        self.assertEqual(tienda.sugerir_juegos("junior"), [])
+
+        print("\nPrueba 20 (Busqueda): Realizada con exito - Prefijos sin acentos, errores de tipeo y sincronizacion.")
+
+    # --- PRUEBA 21: Exportacion del historial ---
+    def test_21_exportar_historial(self):
+        """Prueba la exportacion por bloques a CSV comprimido y JSONL con nombres resueltos."""
+        tienda = Tienda()
+        juego = JuegoMesa.crear("Exportado Test", "F", 50, 10.00, 2.00)
+        for cantidad in (1, 2, 3):
+            Venta.crear(TEST_CLIENTE_ID, juego.id, cantidad)
+        sesion = tienda.iniciar_sesion_juego(juego.titulo, TEST_VENDEDOR_ID)
+        tienda.registrar_participante(sesion.id, "ClientTest")
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_csv = os.path.join(carpeta, "ventas.csv.gz")
+            reporte = tienda.exportar_historial("ventas", ruta_csv)
+            self.assertEqual(reporte["filas"], 3)
+            with gzip.open(ruta_csv, "rt", encoding="utf-8", newline="") as f:
+                filas = list(csv.DictReader(f))
+            self.assertEqual([int(f["cantidad"]) for f in filas], [1, 2, 3])
+            self.assertEqual({(f["cliente"], f["juego"]) for f in filas}, {("ClientTest", "Exportado Test")})
+
+            ruta_jsonl = os.path.join(carpeta, "sesiones.jsonl")
+            exportar.exportar("sesiones", ruta_jsonl, tam_bloque=1)
+            with open(ruta_jsonl, encoding="utf-8") as f:
+                sesiones = [json.loads(linea) for linea in f]
+            self.assertEqual(len(sesiones), 1)
+            self.assertEqual(
+                (sesiones[0]["juego"], sesiones[0]["vendedor"], sesiones[0]["participantes"]),
+                ("Exportado Test", "AdminTest", 1),
+            )
+            self.assertIsNone(sesiones[0]["hora_fin"])
+
+            # Un rango que no incluye hoy no exporta nada
+            self.assertEqual(exportar.exportar("ventas", ruta_csv, hasta="2000-01-01")["filas"], 0)
+        self.assertEqual(exportar.rango_mes("2024-12"), ("2024-12-01", "2025-01-01"))
+
+        print("\nPrueba 21 (Exportacion): Realizada con exito - CSV.gz y JSONL por bloques con filtros de fecha.")
+
+    # --- PRUEBA 22: Archivo del historial frio ---
+    def test_22_archivar_historial(self):
+        """Prueba que los meses viejos pasen a las tablas de archivo y se lean solo si se piden."""
+        tienda = Tienda()
+        juego = JuegoMesa.crear("Archivado Test", "F", 50, 10.00, 2.00)
+        ventas = [Venta.crear(TEST_CLIENTE_ID, juego.id, cantidad) for cantidad in (1, 2, 3)]
+        vieja = tienda.iniciar_sesion_juego(juego.titulo, TEST_VENDEDOR_ID)
+        tienda.registrar_participante(vieja.id, "ClientTest")
+        tienda.finalizar_sesion_juego(vieja.id)
+        activa = tienda.iniciar_sesion_juego(juego.titulo, TEST_VENDEDOR_ID)
+
+        conn = create_connection()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE ventas SET fecha_venta = %s WHERE id = %s", ("2020-03-15 10:00:00", ventas[0].id))
+        cursor.execute("UPDATE ventas SET fecha_venta = %s WHERE id = %s", ("2020-04-02 12:00:00", ventas[1].id))
+        cursor.execute(
+            "UPDATE ludoteca_sesiones SET hora_inicio = %s, hora_fin = %s WHERE id = %s",
+            ("2020-03-20 18:00:00", "2020-03-20 20:00:00", vieja.id),
+        )
+        # Una sesion sin finalizar no se archiva aunque sea vieja
+        cursor.execute("UPDATE ludoteca_sesiones SET hora_inicio = %s WHERE id = %s", ("2020-03-21 18:00:00", activa.id))
+        conn.commit()
+        tienda.reconstruir_resumenes()
+
+        def resumenes():
+            cursor.execute("SELECT fecha, cliente_id, ventas, unidades, ingresos FROM resumen_ventas_cliente ORDER BY fecha")
+            filas = cursor.fetchall()
+            cursor.execute("SELECT fecha, juego_id, sesiones, horas, ingresos FROM resumen_ludoteca_juego ORDER BY fecha")
+            return filas + cursor.fetchall()
+
+        antes = resumenes()
+        conn.commit()
+        try:
+            with tempfile.TemporaryDirectory() as carpeta:
+                reporte = tienda.archivar_historial("2021-01-15", volcar_en=carpeta)
+                self.assertEqual(
+                    reporte,
+                    [
+                        {"mes": "2020-03", "ventas": 1, "ludoteca_participantes": 1, "ludoteca_sesiones": 1},
+                        {"mes": "2020-04", "ventas": 1, "ludoteca_participantes": 0, "ludoteca_sesiones": 0},
+                    ],
+                )
+                with gzip.open(os.path.join(carpeta, "ventas_2020_03.csv.gz"), "rt", encoding="utf-8") as f:
+                    self.assertEqual([int(fila["id"]) for fila in csv.DictReader(f)], [ventas[0].id])
+                self.assertFalse(os.path.exists(os.path.join(carpeta, "sesiones_2020_04.csv.gz")))
+
+            # Las consultas de siempre solo ven las filas recientes
+            self.assertEqual([v.id for v in tienda.listar_ventas_cliente(TEST_CLIENTE_ID)], [ventas[2].id])
+            self.assertEqual([s.id for s in tienda.listar_sesiones()], [activa.id])
+            # Pidiendolo, el archivo se une de forma transparente
+            self.assertEqual(
+                [v.id for v in tienda.listar_ventas_cliente(TEST_CLIENTE_ID, incluir_archivo=True)],
+                [ventas[2].id, ventas[1].id, ventas[0].id],
+            )
+            self.assertEqual({s.id for s in tienda.listar_sesiones(incluir_archivo=True)}, {vieja.id, activa.id})
+            self.assertEqual(len(list(Venta.iterar_por_cliente(TEST_CLIENTE_ID, tam_lote=1, incluir_archivo=True))), 3)
+            self.assertEqual(len(analitica.cargar_ventas(incluir_archivo=True)), 3)
+            with tempfile.TemporaryDirectory() as carpeta:
+                ruta = os.path.join(carpeta, "sesiones.jsonl")
+                exportar.exportar("sesiones", ruta, incluir_archivo=True)
+                with open(ruta, encoding="utf-8") as f:
+                    sesiones = {s["id"]: s for s in map(json.loads, f)}
+            self.assertEqual(sesiones[vieja.id]["participantes"], 1)
+
+            # Archivar no cambia los resumenes, ni al reconstruirlos
+            self.assertEqual(resumenes(), antes)
+            tienda.reconstruir_resumenes()
+            self.assertEqual(resumenes(), antes)
+            conn.commit()
+
+            self.assertEqual(len(archivo.listar()), 4)
+            self.assertEqual(archivo.archivar("2021-01-15"), [])
+        finally:
+            for tabla, _ in archivo.MOVIMIENTOS:
+                for nombre in archivo.tablas_archivo(tabla):
+                    cursor.execute(f"DROP TABLE {nombre}")
+            cursor.execute("DELETE FROM archivo_meses")
+            conn.commit()
+            cursor.close()
+            close_connection(conn)
+
+        self.assertEqual(archivo.corte_por_defecto(24, date(2024, 5, 10)), date(2022, 5, 1))
+        self.assertEqual(archivo.corte_por_defecto(1, date(2024, 1, 31)), date(2023, 12, 1))
+
+        print("\nPrueba 22 (Archivo): Realizada con exito - Meses viejos archivados, volcados y leidos bajo pedido.")
+
+    # --- PRUEBA 23: Titulos repetidos en la importacion ---
+    def test_23_importar_titulos_repetidos(self):
+        """Prueba que un titulo repetido en el mismo bloque gane con la ultima fila y cuente en el reporte."""
+        filas = [
+            {"titulo": "Repetido", "fabricante": "F", "stock": "1", "precio_venta": "10", "precio_ludoteca_hora": "1"},
+            {"titulo": "Otro", "fabricante": "F", "stock": "2", "precio_venta": "10", "precio_ludoteca_hora": "1"},
+            {"titulo": "REPETIDO", "fabricante": "F", "stock": "5", "precio_venta": "10", "precio_ludoteca_hora": "1"},
+            {"titulo": "Repetido", "fabricante": "Ultimo", "stock": "9", "precio_venta": "15", "precio_ludoteca_hora": "1"},
+        ]
+
+        reporte = JuegoMesa.importar_lote(filas, tam_lote=10)
+        self.assertEqual((reporte["insertados"], reporte["actualizados"], reporte["rechazados"]), (2, 2, 0))
+        self.assertEqual(
+            reporte["insertados"] + reporte["actualizados"] + reporte["rechazados"], len(filas)
+        )
+        repetido = JuegoMesa.buscar_por_titulo("Repetido")
+        self.assertEqual((repetido.fabricante, repetido.stock, repetido.precio_venta), ("Ultimo", 9, 15.0))
+
+        print("\nPrueba 23 (Importacion con repetidos): Realizada con exito - Gana la ultima fila y el reporte suma la entrada.")
+
+    # --- PRUEBA 24: Tabla virtual ---
+    def test_24_tabla_virtual(self):
+        """Prueba el orden en memoria (None al final) y la carga de paginas al desplazarse."""
+        filas = [(3, "c"), (None, "x"), (1, "a"), (2, None), (None, "y")]
+        self.assertEqual([f[0] for f in ordenar_filas(filas, 0)], [1, 2, 3, None, None])
+        self.assertEqual([f[0] for f in ordenar_filas(filas, 0, descendente=True)], [3, 2, 1, None, None])
+        self.assertEqual([f[1] for f in ordenar_filas(filas, 1, descendente=True)], ["y", "x", "c", "a", None])
+
+        try:
+            root = tk.Tk()
+        except tk.TclError:
+            print("\nPrueba 24 (Tabla virtual): Realizada con exito - Orden verificado; paginacion omitida (sin pantalla).")
+            return
+
+        class EjecutorInmediato:
+            """Corre cada tarea en el acto, sin hilos."""
+
+            def enviar(self, clave, fn, *args, al_terminar=None, al_error=None, **kwargs):
+                al_terminar(fn(*args))
+
+        pedidos = []
+
+        def cargar_pagina(cursor):
+            inicio = cursor or 0
+            pedidos.append(inicio)
+            siguiente = inicio + 50 if inicio + 50 < 200 else None
+            return [(i, None if i % 10 == 0 else f"f{i:03d}") for i in range(inicio, inicio + 50)], siguiente
+
+        try:
+            tabla = TablaVirtual(root, EjecutorInmediato())
+            tabla.mostrar("Prueba", [("n", 50, None), ("texto", 80, None)], cargar_pagina)
+            self.assertEqual((pedidos, len(tabla._filas)), ([0], 50))
+
+            # Acercarse al final de lo cargado pide la pagina siguiente
+            tabla._ir_a(20)
+            self.assertEqual((pedidos, len(tabla._filas)), ([0, 50], 100))
+
+            tabla._ordenar(1)
+            tabla._ordenar(1)  # segundo clic: descendente
+            self.assertEqual(tabla._filas[0][1], "f099")
+            self.assertIsNone(tabla._filas[-1][1])
+        finally:
+            root.destroy()
+
+        print("\nPrueba 24 (Tabla virtual): Realizada con exito - Orden con None al final y paginas bajo demanda.")
+
+    # --- PRUEBA 25: Rehash sin la migracion 0003 ---
+    def test_25_rehash_fallido_no_impide_login(self):
+        """Prueba que un hash sha256 viejo permita entrar aunque la columna no admita el hash nuevo."""
+        legado = hashlib.sha256(TEST_PASSWORD.encode("utf-8")).hexdigest()
+        conn = create_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM usuarios WHERE nombre = 'ColumnaCortaTest'")
+        conn.commit()
+        insert_usuario(conn, "ColumnaCortaTest", "cliente", legado)
+
+        # Simula una BD sin la migracion 0003: password no admite mas de 64 caracteres
+        if db_connection.DB_BACKEND == "mysql":
+            cursor.execute("ALTER TABLE usuarios MODIFY password VARCHAR(64) NULL")
+        else:
+            cursor.execute(
+                """
+                CREATE TRIGGER password_corta BEFORE UPDATE OF password ON usuarios
+                WHEN length(NEW.password) > 64
+                BEGIN SELECT RAISE(ABORT, 'Data too long for column password'); END
+                """
+            )
+        conn.commit()
+        try:
+            with self.assertLogs("usuario", level="WARNING"):
+                usuario = Usuario.autenticar("ColumnaCortaTest", TEST_PASSWORD)
+            self.assertIsNotNone(usuario, "Una contraseña correcta debe permitir el login.")
+            self.assertEqual(usuario.password_hash, legado)
+            self.assertEqual(Usuario.buscar_por_nombre("ColumnaCortaTest").password_hash, legado)
+            self.assertIsNone(Usuario.autenticar("ColumnaCortaTest", "otra"))
+        finally:
+            if db_connection.DB_BACKEND == "mysql":
+                cursor.execute("ALTER TABLE usuarios MODIFY password VARCHAR(255) NULL")
+            else:
+                cursor.execute("DROP TRIGGER password_corta")
+            conn.commit()
+
+        # Con la columna corregida, el siguiente login migra el hash
+        usuario = Usuario.autenticar("ColumnaCortaTest", TEST_PASSWORD)
+        self.assertTrue(usuario.password_hash.startswith("pbkdf2_sha256$"))
+        self.assertEqual(Usuario.buscar_por_nombre("ColumnaCortaTest").password_hash, usuario.password_hash)
+        cursor.close()
+        close_connection(conn)
+
+        print("\nPrueba 25 (Rehash tolerante): Realizada con exito - Login correcto aunque el hash no se pueda migrar.")
+
+    # --- PRUEBA 26: Archivo con error ---
+    def test_26_archivar_con_error(self):
+        """Prueba que un mes que no se pudo mover no deje tablas vacias, registro ni volcado."""
+        juego = JuegoMesa.crear("Archivo Fallido Test", "F", 10, 10.00, 2.00)
+        venta = Venta.crear(TEST_CLIENTE_ID, juego.id, 1)
+        tienda = Tienda()
+        sesion = tienda.iniciar_sesion_juego(juego.titulo, TEST_VENDEDOR_ID)
+        participante = tienda.registrar_participante(sesion.id, "ClientTest")
+        tienda.finalizar_sesion_juego(sesion.id)
+
+        conn = create_connection()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE ventas SET fecha_venta = %s WHERE id = %s", ("2019-06-10 10:00:00", venta.id))
+        cursor.execute(
+            "UPDATE ludoteca_sesiones SET hora_inicio = %s, hora_fin = %s WHERE id = %s",
+            ("2019-06-10 18:00:00", "2019-06-10 19:00:00", sesion.id),
+        )
+        # Una tabla de archivo huerfana con el mismo id hace fallar el movimiento de los participantes
+        cursor.execute("CREATE TABLE IF NOT EXISTS ludoteca_participantes_archivo_2019_06 LIKE ludoteca_participantes")
+        cursor.execute(
+            "INSERT INTO ludoteca_participantes_archivo_2019_06 (id, sesion_id, usuario_id) VALUES (%s, %s, %s)",
+            (participante.id, sesion.id, TEST_CLIENTE_ID),
+        )
+        conn.commit()
+
+        try:
+            with tempfile.TemporaryDirectory() as carpeta:
+                with self.assertRaisesRegex(Exception, "Error al archivar 2019-06"):
+                    archivo.archivar("2019-07-01", volcar_en=carpeta)
+                self.assertEqual(os.listdir(carpeta), [])
+
+            # Todo sigue activo y sin registrar; la tabla de ventas creada para el intento ya no existe
+            self.assertEqual([v.id for v in Venta.listar_por_cliente(TEST_CLIENTE_ID)], [venta.id])
+            self.assertEqual(archivo.listar(), [])
+            with self.assertRaises(Exception):
+                cursor.execute("SELECT COUNT(*) FROM ventas_archivo_2019_06")
+            conn.rollback()
+
+            # Sin el conflicto, el mismo mes se archiva entero
+            cursor.execute("DROP TABLE ludoteca_participantes_archivo_2019_06")
+            conn.commit()
+            reporte = archivo.archivar("2019-07-01")
+            self.assertEqual(
+                reporte, [{"mes": "2019-06", "ventas": 1, "ludoteca_participantes": 1, "ludoteca_sesiones": 1}]
+            )
+        finally:
+            for tabla, _ in archivo.MOVIMIENTOS:
+                cursor.execute(f"DROP TABLE IF EXISTS {archivo.nombre_archivo(tabla, date(2019, 6, 1))}")
+            cursor.execute("DELETE FROM archivo_meses")
+            conn.commit()
+            cursor.close()
+            close_connection(conn)
+
+        print("\nPrueba 26 (Archivo con error): Realizada con exito - Sin tablas vacias, registro ni volcado al fallar.")
+
+    # --- PRUEBA 27: Ejecutor en segundo plano ---
+    def test_27_ejecutor_claves_y_cancelacion(self):
+        """Prueba que el ejecutor rechace claves repetidas, reemplace, cancele y entregue los resultados en el sondeo."""
+
+        class RaizFalsa:
+            # Solo lo que usa EjecutorTk: after() guarda el sondeo y la prueba lo corre a mano
+            def __init__(self):
+                self.pendientes = []
+
+            def after(self, ms, fn):
+                self.pendientes.append(fn)
+
+        raiz = RaizFalsa()
+        estados = []
+        ejecutor = EjecutorTk(raiz, al_cambiar_estado=lambda ocupado, mensaje: estados.append((ocupado, mensaje)))
+        liberar = threading.Event()
+        resultados, errores = [], []
+
+        def lenta(valor):
+            liberar.wait(5)
+            return valor
+
+        def falla():
+            raise Exception("fallo esperado")
+
+        try:
+            venta = ejecutor.enviar(
+                "venta", lenta, "v1", al_terminar=resultados.append, descripcion="Venta...", cancelable=False
+            )
+            self.assertIsNotNone(venta)
+            self.assertIsNone(ejecutor.enviar("venta", lenta, "v2", al_terminar=resultados.append))
+            self.assertEqual(estados[-1], (True, "Venta..."))
+
+            # Una escritura no se cancela; un listado se reemplaza y el anterior se descarta
+            ejecutor.cancelar()
+            self.assertTrue(ejecutor.ocupado("venta"))
+            primera = ejecutor.enviar("listado", lenta, "l1", al_terminar=resultados.append)
+            segunda = ejecutor.enviar("listado", lenta, "l2", al_terminar=resultados.append, reemplazar=True)
+            self.assertTrue(primera.cancelada)
+            self.assertFalse(segunda.cancelada)
+            ejecutor.enviar("error", falla, al_error=errores.append)
+
+            liberar.set()
+            for tarea in (venta, primera, segunda):
+                tarea.future.result(5)
+            while ejecutor.ocupado() or ejecutor._callbacks:
+                raiz.pendientes.pop(0)()
+
+            self.assertEqual(sorted(resultados), ["l2", "v1"])
+            self.assertEqual([str(e) for e in errores], ["fallo esperado"])
+            self.assertEqual(estados[-1], (False, ""))
+        finally:
+            liberar.set()
+            ejecutor.cerrar()
+
+        print("\nPrueba 27 (Ejecutor): Realizada con exito - Claves sin duplicar, reemplazo y cancelacion correctos.")
+
+    # --- PRUEBA 28: Sesiones con participantes ---
+    def test_28_sesiones_con_participantes(self):
+        """Prueba que cada pagina de sesiones traiga juego, vendedor y participantes con dos consultas."""
+        juego = JuegoMesa.crear("Detalle Test", "F", 5, 10.00, 2.00)
+        tienda = Tienda()
+        sesiones = [tienda.iniciar_sesion_juego(juego.titulo, TEST_VENDEDOR_ID) for _ in range(3)]
+        tienda.registrar_participante(sesiones[0].id, "ClientTest")
+        tienda.registrar_participante(sesiones[0].id, "AdminTest")
+        tienda.registrar_participante(sesiones[2].id, "ClientTest")
+
+        instrumentacion.reiniciar()
+        instrumentacion.activar()
+        try:
+            paginas = []
+            cursor = None
+            while True:
+                pagina, cursor = tienda.listar_sesiones_detalle(limite=2, cursor=cursor)
+                paginas.append(pagina)
+                if cursor is None:
+                    break
+        finally:
+            instrumentacion.desactivar()
+
+        # Dos consultas por pagina, no una por sesion
+        consultas = sum(
+            c["llamadas"]
+            for c in db_connection.stats()["consultas"]
+            if "ludoteca_sesion.LudotecaSesion.listar_con_participantes" in c["llamadores"]
+        )
+        self.assertEqual(consultas, 2 * len(paginas))
+
+        self.assertEqual([len(p) for p in paginas], [2, 1])
+        detalle = {s.id: s for p in paginas for s in p}
+        self.assertEqual(list(detalle), [s.id for s in reversed(sesiones)])
+        for s in detalle.values():
+            self.assertEqual((s.titulo_juego, s.vendedor_nombre), ("Detalle Test", "AdminTest"))
+        self.assertEqual(
+            detalle[sesiones[0].id].participantes, [(TEST_CLIENTE_ID, "ClientTest"), (TEST_VENDEDOR_ID, "AdminTest")]
+        )
+        self.assertEqual(detalle[sesiones[1].id].participantes, [])
+        self.assertEqual(detalle[sesiones[2].id].participantes, [(TEST_CLIENTE_ID, "ClientTest")])
+
+        print("\nPrueba 28 (Sesiones con participantes): Realizada con exito - Participantes agrupados por sesion.")
+
+    # --- PRUEBA 29: Migraciones ---
+    def test_29_migraciones(self):
+        """Prueba que aplicar() respete dry_run y hasta, y que no repita migraciones ya registradas."""
+        carpeta = tempfile.mkdtemp()
+        archivos = {
+            "9001_tabla_prueba.sql": "-- Tabla de prueba\nCREATE TABLE migracion_prueba (id INT PRIMARY KEY);",
+            "9002_fila_uno.sql": "INSERT INTO migracion_prueba (id) VALUES (1);",
+            "9003_fila_dos.sql": "INSERT INTO migracion_prueba (id) VALUES (2);\n",
+        }
+        for nombre, sql in archivos.items():
+            with open(os.path.join(carpeta, nombre), "w", encoding="utf-8") as f:
+                f.write(sql)
+
+        listar_migraciones = migrar.listar_migraciones
+        conn = create_connection()
+        cursor = conn.cursor()
+        try:
+            with mock.patch.object(migrar, "listar_migraciones", lambda: listar_migraciones(carpeta)):
+                salida = io.StringIO()
+                with contextlib.redirect_stdout(salida):
+                    self.assertEqual(migrar.aplicar(conn, dry_run=True), [])
+                self.assertIn("CREATE TABLE migracion_prueba (id INT PRIMARY KEY);", salida.getvalue())
+                self.assertNotIn("Tabla de prueba", salida.getvalue())
+                self.assertEqual([m[0] for m in migrar.pendientes(conn)], [9001, 9002, 9003])
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(migrar.aplicar(conn, hasta=9002), [9001, 9002])
+                    self.assertEqual(migrar.aplicar(conn), [9003])
+                    self.assertEqual(migrar.aplicar(conn), [])
+
+            cursor.execute("SELECT id FROM migracion_prueba ORDER BY id")
+            self.assertEqual([r[0] for r in cursor.fetchall()], [1, 2])
+        finally:
+            cursor.execute("DROP TABLE IF EXISTS migracion_prueba")
+            cursor.execute("DELETE FROM schema_version WHERE version >= 9000")
+            conn.commit()
+            cursor.close()
+            close_connection(conn)
+            shutil.rmtree(carpeta)
+
+        print("\nPrueba 29 (Migraciones): Realizada con exito - Dry run, corte por version y sin repetir.")
+
+    # --- PRUEBA 30: Pool de conexiones ---
+    def test_30_pool_espera_y_overflow(self):
+        """Prueba que el pool abra conexiones de overflow, espere una libre y falle al agotarse el tiempo."""
+        pool = db_connection.PoolConexiones(
+            lambda: sqlite3.connect(":memory:", check_same_thread=False), tamano=1, max_overflow=1, timeout=0.2
+        )
+        primera = pool.obtener()
+        overflow = pool.obtener()
+        self.assertEqual(pool.estadisticas()["overflow_abiertas"], 1)
+
+        with self.assertRaisesRegex(Exception, "Pool de conexiones agotado"):
+            pool.obtener()
+
+        # Una conexion devuelta desde otro hilo despierta al que espera
+        pool.timeout = 5
+        threading.Timer(0.05, overflow.close).start()
+        tercera = pool.obtener()
+        tercera.close()
+        primera.close()
+
+        stats = pool.estadisticas()
+        self.assertEqual((stats["agotamientos"], stats["esperas"], stats["prestamos"]), (1, 2, 3))
+        self.assertGreater(stats["espera_max_ms"], 0)
+        # Al volver, la conexion de overflow no se queda: solo tamano conexiones libres
+        self.assertEqual((stats["abiertas"], stats["libres"], stats["en_uso"]), (1, 1, 0))
+        pool.cerrar_todas()
+
+        print("\nPrueba 30 (Pool): Realizada con exito - Overflow, espera y agotamiento con limite de tiempo.")
+
+    # --- PRUEBA 31: Benchmarks ---
+    def test_31_bench_correr_y_comparar(self):
+        """Prueba que el benchmark guarde sus resultados en JSON, limpie sus datos y marque regresiones."""
+        self.assertEqual(bench_tienda.percentil([1.0, 2.0, 3.0, 4.0], 50), 2.0)
+        self.assertEqual(bench_tienda.percentil([], 95), 0.0)
+
+        # Un cliente real cuyo nombre empieza como los del benchmark, con una compra
+        real = Usuario.buscar_por_nombre("Benchetrit") or Usuario.crear("Benchetrit", "cliente", TEST_PASSWORD)
+        juego = JuegoMesa.crear("Bench Real Test", "F", 5, 10.00, 1.00)
+        Venta.crear(real.id, juego.id, 1)
+
+        carpeta = tempfile.mkdtemp()
+        base = os.path.join(carpeta, "base.json")
+        nuevo = os.path.join(carpeta, "nuevo.json")
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                codigo = bench_tienda.main(["correr", "--salida", base, "--repeticiones", "3", "--tamanos", "100"])
+            self.assertEqual(codigo, 0)
+            with open(base, encoding="utf-8") as f:
+                corrida = json.load(f)
+            self.assertEqual(corrida["repeticiones"], 3)
+            self.assertIn("juego_listar_todos_100", corrida["resultados"])
+            for r in corrida["resultados"].values():
+                self.assertLessEqual(r["p50_ms"], r["p95_ms"])
+                self.assertGreater(r["ops_por_seg"], 0)
+
+            # Los datos Bench se borran al terminar
+            self.assertIsNone(Usuario.buscar_por_nombre("BenchCliente"))
+            self.assertIsNone(JuegoMesa.buscar_por_titulo("Bench 000000"))
+            # ...y solo esos: el cliente real y su compra siguen
+            self.assertIsNotNone(Usuario.buscar_por_nombre("Benchetrit"))
+            self.assertEqual(JuegoMesa.buscar_por_id(juego.id).stock, 4)
+            self.assertEqual(len(Venta.listar_por_cliente(real.id)), 1)
+
+            # Una corrida igual no tiene regresiones; con la venta al doble de lenta, si
+            corrida["resultados"]["venta_crear"]["p50_ms"] *= 2
+            with open(nuevo, "w", encoding="utf-8") as f:
+                json.dump(corrida, f)
+            with contextlib.redirect_stdout(io.StringIO()) as salida:
+                self.assertEqual(bench_tienda.main(["comparar", base, base]), 0)
+                self.assertEqual(bench_tienda.main(["comparar", base, nuevo, "--umbral", "0.5"]), 1)
+            regresiones = [linea for linea in salida.getvalue().splitlines() if "REGRESION" in linea]
+            self.assertEqual(len(regresiones), 1)
+            self.assertTrue(regresiones[0].startswith("venta_crear"))
+            self.assertIn("p50_ms", regresiones[0])
+        finally:
+            shutil.rmtree(carpeta)
+
+        print("\nPrueba 31 (Benchmarks): Realizada con exito - Resultados en JSON y regresiones detectadas.")
+
+    # --- PRUEBA 32: Cache dentro de transacciones ---
+    def test_32_cache_en_transaccion(self):
+        """Prueba que las busquedas de Tienda dentro de transaccion() usen la cache salvo para lo ya escrito."""
+        vendido = JuegoMesa.crear("Cache Venta Test", "F", 10, 10.00, 1.00)
+        otro = JuegoMesa.crear("Cache Mesa Test", "F", 10, 10.00, 1.00)
+        tienda = Tienda()
+
+        # Cada sesion busca el juego dentro de su transaccion: desde la segunda, aciertos
+        aciertos = cache_juegos.aciertos
+        for _ in range(3):
+            tienda.iniciar_sesion_juego(otro.titulo, TEST_VENDEDOR_ID)
+        self.assertEqual(cache_juegos.aciertos, aciertos + 2)
+
+        # La venta encuentra el juego en la cache; al descontar stock lo invalida y se vuelve a leer
+        aciertos = cache_juegos.aciertos
+        tienda.realizar_venta(TEST_CLIENTE_ID, otro.titulo, 1)
+        self.assertEqual(cache_juegos.aciertos, aciertos + 1)
+        self.assertEqual(tienda.buscar_juego(otro.titulo).stock, 9)
+        for _ in range(5):
+            tienda.realizar_venta(TEST_CLIENTE_ID, vendido.titulo, 1)
+        self.assertEqual(tienda.buscar_juego(vendido.titulo).stock, 5)
+        aciertos = cache_juegos.aciertos
+        with Tienda.transaccion():
+            self.assertEqual(tienda.buscar_juego(otro.titulo).id, otro.id)
+            Venta.crear(TEST_CLIENTE_ID, vendido.id, 1)
+            # Lo escrito sin confirmar no entra en la cache
+            self.assertEqual(JuegoMesa.buscar_por_id(vendido.id).stock, 4)
+            self.assertIsNone(cache_juegos.obtener_por_id(vendido.id))
+        self.assertEqual(cache_juegos.aciertos, aciertos + 1)
+        self.assertEqual(tienda.buscar_juego(vendido.titulo).stock, 4)
+
+        print("\nPrueba 32 (Cache en transaccion): Realizada con exito - Aciertos dentro de la unidad de trabajo.")
+
 
 # Ejecucion de las pruebas
 if __name__ == "__main__":
@@ -1,8 +1,14 @@
+from db_connection import transaccion
 from usuario import Usuario
 from juego_mesa import JuegoMesa
 from venta import Venta
 from ludoteca_sesion import LudotecaSesion
 from ludoteca_participante import LudotecaParticipante
+import archivo
+import exportar
+import resumenes
+from sesiones_activas import sesiones_activas
+from indice_busqueda import indice_juegos
 
 class Tienda:
     """
@@ -13,68 +19,151 @@ class Tienda:
     def __init__(self):
         pass
 
+    @staticmethod
+    def transaccion():
+        """
+        Unidad de trabajo: `with Tienda.transaccion():` hace que todas las
+        operaciones del bloque compartan una conexion y un solo commit.
+        """
+        return transaccion()
+
     def registrar_juego(self, titulo, fabricante, stock, precio_venta, precio_ludoteca_hora):
         """Crea un nuevo juego."""
         return JuegoMesa.crear(titulo, fabricante, stock, precio_venta, precio_ludoteca_hora)
 
     def buscar_juego(self, titulo):
-        """Busca un juego por titulo."""
-        return JuegoMesa.buscar_por_titulo(titulo)
+        """
+        Busca un juego por titulo. Si no hay uno exactamente igual, acepta el
+        unico cuyo titulo coincide sin contar acentos ni signos ("catan" -> "Catán").
+        """
+        juego = JuegoMesa.buscar_por_titulo(titulo)
+        if juego is None:
+            ids = indice_juegos.ids_con_titulo(titulo)
+            if len(ids) == 1:
+                juego = JuegoMesa.buscar_por_id(ids[0])
+        return juego
+
+    def sugerir_juegos(self, texto, limite=10):
+        """
+        Sugerencias para completar mientras se escribe: [{id, titulo, fabricante}, ...]
+        por relevancia, resueltas en memoria con el indice de busqueda.
+        """
+        return indice_juegos.buscar(texto, limite)
+
+    def buscar_juegos(self, texto, limite=10):
+        """Igual que sugerir_juegos() pero retorna los JuegoMesa completos, en el mismo orden."""
+        ids = [s["id"] for s in indice_juegos.buscar(texto, limite)]
+        juegos = JuegoMesa.buscar_por_ids(ids) if ids else {}
+        return [juegos[i] for i in ids if i in juegos]
+
+    def precargar_busqueda(self):
+        """Carga el indice de busqueda (conviene hacerlo en segundo plano al iniciar)."""
+        if not indice_juegos.cargado():
+            indice_juegos.cargar()
 
     def listar_catalogo(self):
         """Lista todos los juegos."""
         return JuegoMesa.listar_todos()
 
+    def estadisticas_cache(self):
+        """Contadores de la cache del catálogo (aciertos, fallos, entradas)."""
+        return JuegoMesa.estadisticas_cache()
+
+    def listar_catalogo_pagina(self, limite=50, cursor=None):
+        """Lista una pagina del catalogo. Retorna (juegos, siguiente_cursor)."""
+        return JuegoMesa.listar_pagina(limite, cursor)
+
     def modificar_juego_datos(self, juego_id, nuevo_titulo, nuevo_fabricante, nuevo_precio_venta, nuevo_precio_ludoteca_hora):
         """Modifica los datos descriptivos y precios de un juego."""
-        juego = JuegoMesa.buscar_por_id(juego_id)
-        if juego:
-            return juego.modificar_datos(nuevo_titulo, nuevo_fabricante, nuevo_precio_venta, nuevo_precio_ludoteca_hora)
+        with transaccion():
+            juego = JuegoMesa.buscar_por_id(juego_id)
+            if juego:
+                return juego.modificar_datos(nuevo_titulo, nuevo_fabricante, nuevo_precio_venta, nuevo_precio_ludoteca_hora)
         raise Exception("Juego no encontrado para modificar.")
     
     def realizar_venta(self, cliente_id, titulo_juego, cantidad):
         """
         Registra una venta de un juego.
         """
-        juego = self.buscar_juego(titulo_juego)
-        if juego is None:
-            raise Exception(f"Juego '{titulo_juego}' no encontrado para la venta.")
-    
-        return Venta.crear(cliente_id, juego.id, cantidad)
+        with transaccion():
+            juego = self.buscar_juego(titulo_juego)
+            if juego is None:
+                raise Exception(f"Juego '{titulo_juego}' no encontrado para la venta.")
+
+            return Venta.crear(cliente_id, juego.id, cantidad)
     
-    def listar_ventas_cliente(self, cliente_id):
-        """Lista las ventas realizadas por un cliente especifico."""
-        return Venta.listar_por_cliente(cliente_id)
+    def realizar_venta_carrito(self, cliente_id, items):
+        """
+        Registra la venta de varios juegos [(titulo, cantidad), ...] en una sola transaccion.
+        """
+        return Venta.crear_carrito(cliente_id, items)
+
+    def listar_ventas_cliente(self, cliente_id, prefetch=None, incluir_archivo=False):
+        """Lista las ventas realizadas por un cliente especifico (con incluir_archivo, tambien las archivadas)."""
+        return Venta.listar_por_cliente(cliente_id, prefetch, incluir_archivo)
     
+    def listar_ventas_cliente_pagina(self, cliente_id, limite=50, cursor=None, prefetch=None):
+        """Lista una pagina de las ventas de un cliente. Retorna (ventas, siguiente_cursor)."""
+        return Venta.listar_pagina_por_cliente(cliente_id, limite, cursor, prefetch)
+
     def iniciar_sesion_juego(self, titulo_juego, vendedor_id):
         """
         Registra una nueva sesion de juego en la BD.
         """
-        juego = self.buscar_juego(titulo_juego)
-        if juego is None:
-            raise Exception(f"Juego '{titulo_juego}' no encontrado para la ludoteca.")
+        with transaccion():
+            juego = self.buscar_juego(titulo_juego)
+            if juego is None:
+                raise Exception(f"Juego '{titulo_juego}' no encontrado para la ludoteca.")
 
-        return LudotecaSesion.iniciar_sesion(juego.id, vendedor_id)
+            sesion = LudotecaSesion.iniciar_sesion(juego.id, vendedor_id)
+            sesiones_activas.agregar(sesion, juego.titulo, juego.precio_ludoteca_hora)
+            return sesion
 
     def registrar_participante(self, sesion_id, nombre_usuario):
         """
         Agrega un usuario a una sesion de juego activa.
         """
-        usuario = self.buscar_usuario(nombre_usuario)
-        if usuario is None:
-            raise Exception(f"Usuario '{nombre_usuario}' no encontrado para participar.")
-        
-        return LudotecaParticipante.registrar_participante(sesion_id, usuario.id)
+        with transaccion():
+            usuario = self.buscar_usuario(nombre_usuario)
+            if usuario is None:
+                raise Exception(f"Usuario '{nombre_usuario}' no encontrado para participar.")
+
+            participante = LudotecaParticipante.registrar_participante(sesion_id, usuario.id)
+            sesiones_activas.agregar_participante(sesion_id, usuario.nombre)
+            return participante
 
     def finalizar_sesion_juego(self, sesion_id):
         """
         Finaliza una sesion, calcula la duracion y el costo total.
         """
-        sesion = LudotecaSesion.buscar_por_id(sesion_id)
-        if sesion is None:
+        if LudotecaSesion.finalizar_varias([sesion_id]):
+            sesiones_activas.quitar(sesion_id)
+            return True
+        # Solo en el camino de error se distingue la causa
+        if LudotecaSesion.buscar_por_id(sesion_id) is None:
             raise Exception("Sesión de juego no encontrada.")
-            
-        return sesion.finalizar_sesion()
+        raise Exception("La sesión ya ha sido finalizada.")
+
+    def finalizar_sesiones(self, ids):
+        """
+        Finaliza varias sesiones en una sola sentencia. ids es una lista de IDs o
+        "todas_activas". Retorna las sesiones cerradas con su cuenta (titulo_juego,
+        duracion_horas, precio_total); las ya finalizadas se omiten.
+        """
+        cerradas = LudotecaSesion.finalizar_varias(None if ids == "todas_activas" else ids)
+        sesiones_activas.quitar(*(s.id for s in cerradas))
+        return cerradas
+
+    def listar_sesiones_activas(self):
+        """
+        Sesiones en curso con su tiempo transcurrido y costo acumulado, desde el
+        registro en memoria (solo la primera llamada consulta la BD).
+        """
+        return sesiones_activas.listar()
+
+    def refrescar_sesiones_activas(self):
+        """Relee las sesiones activas de la BD (por cambios hechos en otra terminal)."""
+        sesiones_activas.refrescar()
 
     def obtener_participantes(self, sesion_id):
         """Obtiene la lista de IDs de usuarios que participaron en una sesion de juego."""
@@ -93,6 +182,54 @@ class Tienda:
         """CRUD: Lista todos los usuarios."""
         return Usuario.listar_todos()
     
-    def listar_sesiones(self):
-        """Devuelve el historial completo de sesiones."""
-        return LudotecaSesion.listar_todas()
\ No newline at end of file
+    def listar_usuarios_pagina(self, limite=50, cursor=None):
+        """Lista una pagina de usuarios. Retorna (usuarios, siguiente_cursor)."""
+        return Usuario.listar_pagina(limite, cursor)
+    
+    def listar_sesiones(self, incluir_archivo=False):
+        """Devuelve el historial de sesiones (con incluir_archivo, tambien las archivadas)."""
+        return LudotecaSesion.listar_todas(incluir_archivo=incluir_archivo)
+
+    def listar_sesiones_pagina(self, limite=50, cursor=None):
+        """Devuelve una pagina del historial de sesiones. Retorna (sesiones, siguiente_cursor)."""
+        return LudotecaSesion.listar_pagina(limite, cursor)
+
+    def listar_sesiones_detalle(self, limite=50, cursor=None):
+        """
+        Devuelve una pagina del historial con titulo del juego, vendedor y participantes.
+        Retorna (sesiones, siguiente_cursor).
+        """
+        return LudotecaSesion.listar_con_participantes(limite, cursor)
+
+    # --- Reportes (leen solo las tablas de resumen) ---
+
+    def reporte_ventas_por_juego(self, desde=None, hasta=None, limite=20):
+        """Juegos con mas ingresos por venta entre dos fechas (por defecto, los ultimos 30 dias)."""
+        return resumenes.ventas_por_juego(desde, hasta, limite)
+
+    def reporte_ventas_por_cliente(self, desde=None, hasta=None, limite=20):
+        """Clientes con mas compras entre dos fechas."""
+        return resumenes.ventas_por_cliente(desde, hasta, limite)
+
+    def reporte_ludoteca_por_juego(self, desde=None, hasta=None, limite=20):
+        """Horas e ingresos de ludoteca por juego entre dos fechas."""
+        return resumenes.ludoteca_por_juego(desde, hasta, limite)
+
+    def reporte_ingresos_diarios(self, desde=None, hasta=None):
+        """Ingresos por dia (ventas, ludoteca y total) entre dos fechas."""
+        return resumenes.ingresos_diarios(desde, hasta)
+
+    def reconstruir_resumenes(self, desde=None):
+        """Recalcula las tablas de resumen desde el historial completo (o desde una fecha)."""
+        return resumenes.reconstruir(desde)
+
+    def exportar_historial(self, tipo, salida, formato=None, desde=None, hasta=None, incluir_archivo=False):
+        """Exporta "ventas" o "sesiones" a CSV/JSONL (opcionalmente .gz) sin cargarlas en memoria."""
+        return exportar.exportar(tipo, salida, formato, desde, hasta, incluir_archivo=incluir_archivo)
+
+    def archivar_historial(self, antes_de=None, volcar_en=None):
+        """
+        Mueve las ventas y sesiones finalizadas anteriores al corte a las tablas
+        de archivo (opcionalmente exportandolas a .csv.gz). Retorna el reporte por mes.
+        """
+        return archivo.archivar(antes_de, volcar_en)
@@ -1,13 +1,79 @@
 # usuario.py (Proyecto Tienda - Actualizado)
-from db_connection import get_conn
+from db_connection import en_transaccion, get_conn
+from paginacion import decodificar_cursor, iterar_bloques, paginar
+from prefetch import dividir_en_bloques
+from sentencias import cursor_preparado
+from concurrent.futures import ProcessPoolExecutor
+import base64
 import hashlib
+import hmac
+import logging
+import os
+import time
 
-def hash_password(password: str):
+# Formato: pbkdf2_sha256$<iteraciones>$<sal>$<hash> (sal y hash en base64).
+# Los hashes viejos (sha256 hexadecimal sin sal) se siguen aceptando y se
+# reemplazan por el formato nuevo en el siguiente login correcto.
+ALGORITMO_PASSWORD = "pbkdf2_sha256"
+PASSWORD_ITERACIONES = int(os.getenv("PASSWORD_ITERACIONES", 200000))
+
+log = logging.getLogger("usuario")
+
+
+def hash_password(password: str, iteraciones=None):
     if password is None:
         return None
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+    iteraciones = iteraciones or PASSWORD_ITERACIONES
+    sal = os.urandom(16)
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), sal, iteraciones)
+    sal_b64 = base64.b64encode(sal).decode("ascii")
+    dk_b64 = base64.b64encode(dk).decode("ascii")
+    return f"{ALGORITMO_PASSWORD}${iteraciones}${sal_b64}${dk_b64}"
+
+
+def verificar_password(password, password_hash):
+    """Compara la contraseña con un hash en formato nuevo o viejo (sha256 sin sal)."""
+    if password is None or not password_hash:
+        return False
+    if password_hash.startswith(ALGORITMO_PASSWORD + "$"):
+        try:
+            _, iteraciones, sal_b64, dk_b64 = password_hash.split("$")
+            esperado = base64.b64decode(dk_b64)
+            dk = hashlib.pbkdf2_hmac(
+                "sha256", password.encode("utf-8"), base64.b64decode(sal_b64), int(iteraciones)
+            )
+        except ValueError:
+            # Hash mal formado (partes de mas o de menos, base64 o iteraciones invalidas)
+            return False
+        return hmac.compare_digest(dk, esperado)
+    legado = hashlib.sha256(password.encode("utf-8")).hexdigest()
+    return hmac.compare_digest(legado, password_hash)
+
+
+def necesita_rehash(password_hash):
+    """True si el hash es del formato viejo o usa menos iteraciones que las actuales."""
+    if not password_hash or not password_hash.startswith(ALGORITMO_PASSWORD + "$"):
+        return True
+    return int(password_hash.split("$")[1]) < PASSWORD_ITERACIONES
+
+
+def calibrar_iteraciones(objetivo_ms=250, muestra=20000):
+    """
+    Mide esta maquina y retorna las iteraciones de PBKDF2 que tardan unos
+    objetivo_ms por hash (redondeado a miles), para fijar PASSWORD_ITERACIONES.
+    """
+    inicio = time.perf_counter()
+    hashlib.pbkdf2_hmac("sha256", b"calibracion", b"sal-de-prueba-16", muestra)
+    ms_por_iteracion = (time.perf_counter() - inicio) * 1000 / muestra
+    iteraciones = int(objetivo_ms / ms_por_iteracion)
+    return max(10000, round(iteraciones, -3))
+
 
 class Usuario:
+    # Orden de las columnas en las filas de bloques_todos()
+    CAMPOS = ("id", "nombre", "role", "password_hash")
+    __slots__ = CAMPOS
+
     def __init__(self, id_, nombre, role, password_hash=None):
         self.id = id_
         self.nombre = nombre
@@ -36,10 +102,79 @@ class Usuario:
             conn.close()
 
     @classmethod
-    def buscar_por_nombre(cls, nombre):
+    def importar_lote(cls, filas, tam_lote=500, procesos=None):
+        """
+        Importa usuarios desde un iterable de dicts (nombre, role, password).
+        Los hashes se calculan en paralelo en un pool de procesos (uno por nucleo
+        por defecto) y se insertan con executemany, un commit por bloque.
+        Los nombres que ya existen se omiten sin tocar su contraseña; un nombre
+        repetido dentro del archivo (sin importar mayusculas) se rechaza.
+        """
+        reporte = {"insertados": 0, "existentes": 0, "rechazados": 0, "errores": []}
+        inicio = time.perf_counter()
+        query = "INSERT INTO usuarios (nombre, role, password) VALUES (%s, %s, %s)"
+
+        def escribir(cur, bloque):
+            nombres = [f[0] for f in bloque.values()]
+            marcadores = ", ".join(["%s"] * len(nombres))
+            cur.execute(
+                f"SELECT nombre FROM usuarios WHERE nombre IN ({marcadores})",
+                tuple(nombres),
+            )
+            existentes = {r[0].lower() for r in cur.fetchall()}
+            nuevos = [f for f in bloque.values() if f[0].lower() not in existentes]
+            # Solo se gasta CPU en hashear a los usuarios que realmente se insertan
+            hashes = hasheador.map(hash_password, [f[2] for f in nuevos], chunksize=16)
+            cur.executemany(query, [(f[0], f[1], h) for f, h in zip(nuevos, hashes)])
+            conn.commit()
+            reporte["insertados"] += len(nuevos)
+            reporte["existentes"] += len(bloque) - len(nuevos)
+
         conn = get_conn()
         try:
             cur = conn.cursor()
+            with ProcessPoolExecutor(max_workers=procesos) as hasheador:
+                bloque = {}
+                for numero, fila in enumerate(filas, start=1):
+                    nombre = (fila.get("nombre") or "").strip()
+                    role = (fila.get("role") or "cliente").strip()
+                    password = fila.get("password") or ""
+                    if not nombre or not password or len(nombre) > 255:
+                        reporte["rechazados"] += 1
+                        if len(reporte["errores"]) < 50:
+                            reporte["errores"].append((numero, "nombre o contraseña vacios"))
+                        continue
+                    clave = nombre.casefold()
+                    if clave in bloque:
+                        reporte["rechazados"] += 1
+                        if len(reporte["errores"]) < 50:
+                            reporte["errores"].append((numero, f"nombre repetido: '{nombre}'"))
+                        continue
+                    bloque[clave] = (nombre, role, password)
+                    if len(bloque) >= tam_lote:
+                        escribir(cur, bloque)
+                        bloque = {}
+                if bloque:
+                    escribir(cur, bloque)
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error en la importación de usuarios: {e}")
+        finally:
+            cur.close()
+            conn.close()
+
+        segundos = time.perf_counter() - inicio
+        reporte["segundos"] = round(segundos, 3)
+        reporte["filas_por_segundo"] = (
+            round(reporte["insertados"] / segundos, 1) if segundos else 0.0
+        )
+        return reporte
+
+    @classmethod
+    def buscar_por_nombre(cls, nombre):
+        conn = get_conn()
+        try:
+            cur = cursor_preparado(conn)
             query = "SELECT id, nombre, role, password FROM usuarios WHERE nombre = %s"
             cur.execute(query, (nombre,))
             r = cur.fetchone()
@@ -51,23 +186,63 @@ class Usuario:
             conn.close()
 
     @classmethod
-    def autenticar(cls, nombre, password):
+    def buscar_por_ids(cls, ids):
+        """Retorna {id: Usuario} para los ids indicados, con consultas IN de hasta 1000 ids."""
+        usuarios = {}
         conn = get_conn()
         try:
             cur = conn.cursor()
+            for bloque in dividir_en_bloques(ids):
+                marcadores = ", ".join(["%s"] * len(bloque))
+                query = f"SELECT id, nombre, role, password FROM usuarios WHERE id IN ({marcadores})"
+                cur.execute(query, tuple(bloque))
+                for r in cur.fetchall():
+                    usuarios[r[0]] = cls(r[0], r[1], r[2], r[3])
+            return usuarios
+        finally:
+            cur.close()
+            conn.close()
+
+    @classmethod
+    def autenticar(cls, nombre, password):
+        conn = get_conn()
+        try:
+            cur = cursor_preparado(conn)
             query = "SELECT id, nombre, role, password FROM usuarios WHERE nombre = %s"
             cur.execute(query, (nombre,))
             r = cur.fetchone()
             
             if r:
                 stored_hash = r[3]
-                if hash_password(password) == stored_hash:
+                if verificar_password(password, stored_hash):
+                    if necesita_rehash(stored_hash):
+                        stored_hash = cls._rehash(conn, cur, r[0], password, stored_hash)
                     return cls(r[0], r[1], r[2], stored_hash)
             return None
         finally:
             cur.close()
             conn.close()
 
+    @staticmethod
+    def _rehash(conn, cur, usuario_id, password, stored_hash):
+        """
+        Migra el hash al formato/costo actual con la contraseña ya validada y
+        retorna el hash que queda guardado. Si el UPDATE falla (por ejemplo, una
+        BD sin la migracion 0003, con password VARCHAR(64)) se registra en el log
+        y el login sigue con el hash viejo.
+        """
+        nuevo = hash_password(password)
+        try:
+            cur.execute("UPDATE usuarios SET password = %s WHERE id = %s", (nuevo, usuario_id))
+            conn.commit()
+            return nuevo
+        except Exception as e:
+            # Dentro de transaccion() un rollback desharia toda la unidad de trabajo
+            if not en_transaccion():
+                conn.rollback()
+            log.warning("No se pudo actualizar el hash de la contraseña del usuario %s: %s", usuario_id, e)
+            return stored_hash
+
     @classmethod
     def listar_todos(cls):
         conn = get_conn()
@@ -80,6 +255,40 @@ class Usuario:
             cur.close()
             conn.close()
 
+    @classmethod
+    def listar_pagina(cls, limite=50, cursor=None):
+        """Retorna (usuarios, siguiente_cursor) ordenados por nombre, paginando por (nombre, id)."""
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            query = "SELECT id, nombre, role, password FROM usuarios"
+            params = []
+            if cursor:
+                nombre, usuario_id = decodificar_cursor(cursor)
+                query += " WHERE nombre > %s OR (nombre = %s AND id > %s)"
+                params += [nombre, nombre, usuario_id]
+            query += " ORDER BY nombre, id LIMIT %s"
+            params.append(limite + 1)
+            cur.execute(query, tuple(params))
+            filas, siguiente = paginar(cur.fetchall(), limite, lambda r: (r[1], r[0]))
+            return [cls(r[0], r[1], r[2], r[3]) for r in filas], siguiente
+        finally:
+            cur.close()
+            conn.close()
+
+    @classmethod
+    def iterar_todos(cls, tam_lote=500):
+        """Generador de todos los usuarios ordenados por nombre, leidos por bloques."""
+        for filas in cls.bloques_todos(tam_lote):
+            for r in filas:
+                yield cls(r[0], r[1], r[2], r[3])
+
+    @classmethod
+    def bloques_todos(cls, tam_lote=500):
+        """Listas de tuplas (orden de CAMPOS) de todos los usuarios, sin crear objetos."""
+        query = "SELECT id, nombre, role, password FROM usuarios ORDER BY nombre, id"
+        return iterar_bloques(query, tam_lote=tam_lote)
+
     @classmethod
     def actualizar(cls, id_usuario, nuevo_nombre, nuevo_role, nueva_password=None):
         """Actualiza los datos de un usuario."""
@@ -1,5 +1,12 @@
-from db_connection import get_conn
+from archivo import origen
+from db_connection import en_transaccion, get_conn
 from juego_mesa import JuegoMesa
+from usuario import Usuario
+from cache_catalogo import cache_juegos
+from paginacion import decodificar_cursor, iterar_bloques, paginar
+from prefetch import prefetch_related
+from resumenes import aplicar_ventas, restar_venta
+from sentencias import cursor_preparado
 
 
 class Venta:
@@ -7,6 +14,13 @@ class Venta:
     Representa una transaccion de compra de un juego de mesa.
     """
 
+    # Relaciones que se pueden precargar con prefetch_related()
+    RELACIONES = {"juego": ("juego_id", JuegoMesa), "cliente": ("cliente_id", Usuario)}
+    # Orden de las columnas en las filas de bloques_por_cliente()
+    CAMPOS = ("id", "cliente_id", "juego_id", "cantidad", "precio_total", "fecha_venta")
+    # Las relaciones precargadas tambien necesitan su lugar
+    __slots__ = CAMPOS + tuple(RELACIONES)
+
     def __init__(self, id_, cliente_id, juego_id, cantidad, precio_total, fecha_venta):
         self.id = id_
         self.cliente_id = cliente_id
@@ -23,34 +37,36 @@ class Venta:
     def crear(cls, cliente_id, juego_id, cantidad):
         """
         Crea un nuevo registro de venta.
+        El descuento de stock, la lectura del precio y el INSERT van en una sola
+        conexion y una sola transaccion, asi dos terminales no pueden sobrevender.
         """
         conn = get_conn()
+        try:
+            # Todas las sentencias de una venta se repiten igual: van preparadas
+            cur = cursor_preparado(conn)
 
-        juego = JuegoMesa.buscar_por_id(juego_id)
-        if juego is None:
-            raise Exception("Juego no encontrado en el catálogo. Venta cancelada.")
+            if not JuegoMesa._descontar_stock(cur, juego_id, cantidad):
+                # Solo en el camino de error se distingue la causa
+                cur.execute("SELECT id FROM juegos_mesa WHERE id = %s", (juego_id,))
+                if cur.fetchone() is None:
+                    raise Exception("Juego no encontrado en el catálogo. Venta cancelada.")
+                raise Exception("Inventario insuficiente para la venta.")
 
-        precio_unitario = juego.precio_venta
-        precio_total = cantidad * precio_unitario
+            # La fila ya quedo bloqueada por el UPDATE, el precio leido es consistente
+            cur.execute("SELECT precio_venta FROM juegos_mesa WHERE id = %s", (juego_id,))
+            precio_unitario = float(cur.fetchone()[0])
+            precio_total = cantidad * precio_unitario
 
-        try:
-            cur = conn.cursor()
-            
-            if juego.stock < cantidad:
-                raise Exception("Inventario insuficiente para la venta.")
-            
-            nuevo_stock = juego.stock - cantidad
-            cur.execute("UPDATE juegos_mesa SET stock = %s WHERE id = %s", (nuevo_stock, juego_id))
-            
             query = """
             INSERT INTO ventas (cliente_id, juego_id, cantidad, precio_total) 
             VALUES (%s, %s, %s, %s)
             """
             cur.execute(query, (cliente_id, juego_id, cantidad, precio_total))
-            
-            conn.commit()
-
             venta_id = cur.lastrowid
+            aplicar_ventas(cur, [venta_id])
+
+            conn.commit()
+            cache_juegos.invalidar(juego_id)
             return cls(venta_id, cliente_id, juego_id, cantidad, precio_total, "Ahora")
 
         except Exception as e:
@@ -61,6 +77,87 @@ class Venta:
             cur.close()
             conn.close()
 
+    @classmethod
+    def crear_carrito(cls, cliente_id, items):
+        """
+        Registra varias lineas de venta [(titulo, cantidad), ...] en una sola transaccion.
+        O se vende todo el carrito o no se vende nada.
+        """
+        pedidos = []
+        for titulo, cantidad in items:
+            if cantidad <= 0:
+                raise Exception(f"Cantidad inválida para '{titulo}'.")
+            pedidos.append((titulo, cantidad))
+        if not pedidos:
+            raise Exception("El carrito está vacío.")
+
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+
+            # 1. Resolver todos los titulos con una sola consulta
+            titulos = list({titulo.lower(): titulo for titulo, _ in pedidos}.values())
+            marcadores = ", ".join(["%s"] * len(titulos))
+            cur.execute(
+                f"SELECT id, titulo FROM juegos_mesa WHERE titulo IN ({marcadores})",
+                tuple(titulos),
+            )
+            ids_por_titulo = {r[1].lower(): r[0] for r in cur.fetchall()}
+
+            # Sumar por juego: el mismo titulo con otras mayusculas es la misma linea
+            cantidades = {}
+            for titulo, cantidad in pedidos:
+                juego_id = ids_por_titulo.get(titulo.lower())
+                if juego_id is None:
+                    raise Exception(f"Juego '{titulo}' no encontrado para la venta.")
+                linea = cantidades.setdefault(juego_id, [titulo, 0])
+                linea[1] += cantidad
+            lineas = sorted((juego_id, titulo, cantidad) for juego_id, (titulo, cantidad) in cantidades.items())
+
+            # 2. Bloquear las filas en orden de id: dos carritos nunca se esperan en ciclo
+            marcadores = ", ".join(["%s"] * len(lineas))
+            cur.execute(
+                f"SELECT id, stock, precio_venta FROM juegos_mesa WHERE id IN ({marcadores}) ORDER BY id FOR UPDATE",
+                tuple(l[0] for l in lineas),
+            )
+            bloqueados = {r[0]: (r[1], float(r[2])) for r in cur.fetchall()}
+
+            filas_venta = []
+            for juego_id, titulo, cantidad in lineas:
+                stock, precio_unitario = bloqueados[juego_id]
+                if stock < cantidad:
+                    raise Exception(f"Inventario insuficiente para '{titulo}'.")
+                filas_venta.append((cliente_id, juego_id, cantidad, cantidad * precio_unitario))
+
+            # 3. Descontar stock e insertar todas las lineas en lote
+            cur.executemany(
+                "UPDATE juegos_mesa SET stock = stock - %s WHERE id = %s",
+                [(l[2], l[0]) for l in lineas],
+            )
+            query = """
+            INSERT INTO ventas (cliente_id, juego_id, cantidad, precio_total) 
+            VALUES (%s, %s, %s, %s)
+            """
+            cur.executemany(query, filas_venta)
+            # Un INSERT multi-fila recibe ids consecutivos a partir de lastrowid
+            primer_id = cur.lastrowid
+            aplicar_ventas(cur, range(primer_id, primer_id + len(filas_venta)))
+
+            conn.commit()
+            cache_juegos.invalidar(*bloqueados)
+            return [
+                cls(primer_id + i, f[0], f[1], f[2], f[3], "Ahora")
+                for i, f in enumerate(filas_venta)
+            ]
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error al registrar el carrito: {e}")
+
+        finally:
+            cur.close()
+            conn.close()
+
     @classmethod
     def buscar_por_id(cls, venta_id):
         """
@@ -80,26 +177,72 @@ class Venta:
             conn.close()
 
     @classmethod
-    def listar_por_cliente(cls, cliente_id):
+    def listar_por_cliente(cls, cliente_id, prefetch=None, incluir_archivo=False):
         """
         Retorna todas las ventas realizadas por un cliente.
+        prefetch: relaciones a precargar, por ejemplo ["juego"].
+        incluir_archivo: tambien las ventas movidas a las tablas de archivo.
         """
+        tabla = origen("ventas", incluir_archivo)
         conn = get_conn()
         ventas_lista = []
         try:
             cur = conn.cursor()
-            query = "SELECT id, cliente_id, juego_id, cantidad, precio_total, fecha_venta FROM ventas WHERE cliente_id = %s ORDER BY fecha_venta DESC"
+            query = f"SELECT id, cliente_id, juego_id, cantidad, precio_total, fecha_venta FROM {tabla} WHERE cliente_id = %s ORDER BY fecha_venta DESC"
             cur.execute(query, (cliente_id,))
             rows = cur.fetchall()
 
             for r in rows:
                 ventas_lista.append(cls(r[0], r[1], r[2], r[3], float(r[4]), r[5]))
+        finally:
+            cur.close()
+            conn.close()
 
-            return ventas_lista
+        if prefetch:
+            prefetch_related(ventas_lista, *prefetch)
+        return ventas_lista
+
+    @classmethod
+    def listar_pagina_por_cliente(cls, cliente_id, limite=50, cursor=None, prefetch=None):
+        """
+        Retorna (ventas, siguiente_cursor) de un cliente, de la mas reciente a la
+        mas antigua, paginando por clave (fecha_venta, id).
+        """
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            query = "SELECT id, cliente_id, juego_id, cantidad, precio_total, fecha_venta FROM ventas WHERE cliente_id = %s"
+            params = [cliente_id]
+            if cursor:
+                fecha, venta_id = decodificar_cursor(cursor)
+                query += " AND (fecha_venta < %s OR (fecha_venta = %s AND id < %s))"
+                params += [fecha, fecha, venta_id]
+            query += " ORDER BY fecha_venta DESC, id DESC LIMIT %s"
+            params.append(limite + 1)
+            cur.execute(query, tuple(params))
+            filas, siguiente = paginar(cur.fetchall(), limite, lambda r: (r[5], r[0]))
+            ventas = [cls(r[0], r[1], r[2], r[3], float(r[4]), r[5]) for r in filas]
         finally:
             cur.close()
             conn.close()
 
+        if prefetch:
+            prefetch_related(ventas, *prefetch)
+        return ventas, siguiente
+
+    @classmethod
+    def iterar_por_cliente(cls, cliente_id, tam_lote=500, incluir_archivo=False):
+        """Generador de las ventas de un cliente (mas recientes primero), leidas por bloques."""
+        for filas in cls.bloques_por_cliente(cliente_id, tam_lote, incluir_archivo):
+            for r in filas:
+                yield cls(r[0], r[1], r[2], r[3], float(r[4]), r[5])
+
+    @classmethod
+    def bloques_por_cliente(cls, cliente_id, tam_lote=500, incluir_archivo=False):
+        """Listas de tuplas (orden de CAMPOS) de las ventas de un cliente, sin crear objetos."""
+        query = f"SELECT id, cliente_id, juego_id, cantidad, precio_total, fecha_venta FROM {origen('ventas', incluir_archivo)} WHERE cliente_id = %s ORDER BY fecha_venta DESC, id DESC"
+        return iterar_bloques(query, (cliente_id,), tam_lote)
+
     @classmethod
     def eliminar(cls, venta_id):
         """
@@ -111,23 +254,28 @@ class Venta:
 
             # Obtener los detalles de la venta antes de eliminar
             cur.execute(
-                "SELECT juego_id, cantidad FROM ventas WHERE id = %s", (venta_id,)
+                "SELECT cliente_id, juego_id, cantidad, precio_total, fecha_venta FROM ventas WHERE id = %s",
+                (venta_id,),
             )
             r = cur.fetchone()
             if not r:
                 return False
 
-            juego_id, cantidad = r[0], r[1]
+            cliente_id, juego_id, cantidad, precio_total, fecha_venta = r
 
-            # Eliminar la venta
+            # Eliminar la venta, restarla del resumen y devolver el stock en la misma transaccion
             query = "DELETE FROM ventas WHERE id = %s"
             cur.execute(query, (venta_id,))
+            if cur.rowcount == 0:
+                # Otra terminal la elimino primero: no se cambio nada. Dentro de
+                # transaccion() no se hace rollback, que deshace toda la unidad de trabajo.
+                if not en_transaccion():
+                    conn.rollback()
+                return False
+            restar_venta(cur, fecha_venta, cliente_id, juego_id, cantidad, precio_total)
+            JuegoMesa._sumar_stock(cur, juego_id, cantidad)
             conn.commit()
-
-            # Aumentar el stock (por si se elimina por error)
-            juego = JuegoMesa.buscar_por_id(juego_id)
-            if juego:
-                juego.aumentar_stock(cantidad)
+            cache_juegos.invalidar(juego_id)
 
             return True
 